@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import json
+import time
+from redis.asyncio import Redis
+from app.config.config import settings
+
+
+class AnalysisCache:
+    """
+    Кэш результатов AI-анализа в Redis, адресуемый по содержимому текста.
+
+    Ключ строится по SHA-256 нормализованного текста (нижний регистр, схлопнутые
+    пробелы), поэтому одинаковые шаблонные уведомления анализируются один раз.
+    Записи хранятся с TTL, а их число ограничено `max_entries`: при превышении
+    вытесняются самые старые. Одновременные запросы на анализ одного и того же
+    текста дедуплицируются: внутри процесса через общий Future, между процессами
+    через блокировку в Redis, пока остальные ждут появления результата.
+
+    Атрибуты:
+        ttl (int): Время жизни записи в секундах.
+        max_entries (int): Максимальное число записей в кэше.
+        lock_timeout (int): Время жизни блокировки вычисления в секундах.
+        wait_timeout (float): Сколько секунд ждать результат чужого вычисления.
+        poll_interval (float): Интервал опроса Redis во время ожидания.
+    """
+
+    KEY_PREFIX = "analysis:result:"
+    LOCK_PREFIX = "analysis:lock:"
+    INDEX_KEY = "analysis:index"
+    STATS_KEY = "analysis:stats"
+
+    def __init__(
+        self,
+        ttl: int,
+        max_entries: int,
+        lock_timeout: int,
+        wait_timeout: float,
+        poll_interval: float = 0.05,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._inflight = {}
+
+    @staticmethod
+    def make_digest(text: str) -> str:
+        """
+        Получить хэш нормализованного текста.
+
+        Аргументы:
+            text (str): Исходный текст уведомления.
+
+        Возвращаемое значение:
+            str: Hex-представление SHA-256.
+        """
+        normalized = " ".join(text.lower().split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    async def analyze(self, redis: Redis, text: str, analyzer) -> dict:
+        """
+        Получить результат анализа текста из кэша или вычислить его.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            text (str): Текст для анализа.
+            analyzer: Асинхронная функция анализа, вызываемая при промахе.
+
+        Возвращаемое значение:
+            dict: Результат анализа (category, confidence, keywords).
+        """
+        digest = self.make_digest(text)
+        cached = await redis.get(self.KEY_PREFIX + digest)
+        if cached is not None:
+            await redis.hincrby(self.STATS_KEY, "hits", 1)
+            return json.loads(cached)
+
+        future = self._inflight.get(digest)
+        if future is not None:
+            await redis.hincrby(self.STATS_KEY, "deduplicated", 1)
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        try:
+            result = await self._compute(redis, digest, text, analyzer)
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Ошибку получат ожидающие, если они есть; иначе не шумим в лог
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(digest, None)
+
+    async def analyze_many(self, redis: Redis, texts: list, batch_analyzer) -> list:
+        """
+        Получить результаты анализа пакета текстов, вычислив только отсутствующие в кэше.
+
+        Кэш проверяется одним MGET, а все промахи (без повторов одинаковых
+        текстов) передаются анализатору одним пакетом. На каждый промах
+        берется та же блокировка в Redis, что и в `analyze`: тексты, которые
+        уже анализирует другой процесс, не передаются анализатору, а их
+        результат ожидается до `wait_timeout` секунд и вычисляется, только
+        если так и не появился.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            texts (list): Тексты для анализа.
+            batch_analyzer: Асинхронная функция, принимающая список текстов и
+                возвращающая список результатов; исключение или None на месте
+                результата означает ошибку анализа этого текста.
+
+        Возвращаемое значение:
+            list: Результаты анализа (или ошибки анализатора) в порядке входных текстов.
+        """
+        if not texts:
+            return []
+        digests = [self.make_digest(text) for text in texts]
+        cached = await redis.mget([self.KEY_PREFIX + digest for digest in digests])
+        results = {
+            digest: json.loads(value)
+            for digest, value in zip(digests, cached)
+            if value is not None
+        }
+
+        missing = {}
+        for digest, text in zip(digests, texts):
+            if digest not in results:
+                missing.setdefault(digest, text)
+
+        hits = len(texts) - sum(1 for digest in digests if digest in missing)
+        computed = 0
+        if missing:
+            async with redis.pipeline(transaction=False) as pipe:
+                for digest in missing:
+                    pipe.set(
+                        self.LOCK_PREFIX + digest, "1", nx=True, ex=self.lock_timeout
+                    )
+                locked = await pipe.execute()
+            owned = {
+                digest: text
+                for (digest, text), ok in zip(missing.items(), locked)
+                if ok
+            }
+            try:
+                computed += await self._compute_many(
+                    redis, owned, batch_analyzer, results
+                )
+            finally:
+                if owned:
+                    await redis.delete(*(self.LOCK_PREFIX + digest for digest in owned))
+
+            waiting = [digest for digest in missing if digest not in owned]
+            if waiting:
+                results.update(await self._wait_many(redis, waiting))
+                computed += await self._compute_many(
+                    redis,
+                    {
+                        digest: missing[digest]
+                        for digest in waiting
+                        if digest not in results
+                    },
+                    batch_analyzer,
+                    results,
+                )
+
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(self.STATS_KEY, "hits", hits)
+            pipe.hincrby(self.STATS_KEY, "misses", computed)
+            pipe.hincrby(self.STATS_KEY, "deduplicated", len(texts) - hits - computed)
+            await pipe.execute()
+        return [results.get(digest) for digest in digests]
+
+    async def _compute_many(
+        self, redis: Redis, texts: dict, batch_analyzer, results: dict
+    ) -> int:
+        if not texts:
+            return 0
+        computed = await batch_analyzer(list(texts.values()))
+        for digest, result in zip(texts, computed):
+            results[digest] = result
+            if isinstance(result, dict):
+                await self._store(redis, digest, result)
+        return len(texts)
+
+    async def _wait_many(self, redis: Redis, digests: list) -> dict:
+        found = {}
+        deadline = time.monotonic() + self.wait_timeout
+        while digests and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            cached = await redis.mget([self.KEY_PREFIX + digest for digest in digests])
+            for digest, value in zip(digests, cached):
+                if value is not None:
+                    found[digest] = json.loads(value)
+            digests = [digest for digest in digests if digest not in found]
+            if digests and not await redis.exists(
+                *(self.LOCK_PREFIX + digest for digest in digests)
+            ):
+                break
+        return found
+
+    async def _compute(self, redis: Redis, digest: str, text: str, analyzer) -> dict:
+        key = self.KEY_PREFIX + digest
+        lock_key = self.LOCK_PREFIX + digest
+        locked = await redis.set(lock_key, "1", nx=True, ex=self.lock_timeout)
+        if not locked:
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                cached = await redis.get(key)
+                if cached is not None:
+                    await redis.hincrby(self.STATS_KEY, "deduplicated", 1)
+                    return json.loads(cached)
+                if not await redis.exists(lock_key):
+                    break
+
+        await redis.hincrby(self.STATS_KEY, "misses", 1)
+        try:
+            result = await analyzer(text)
+            await self._store(redis, digest, result)
+        finally:
+            if locked:
+                await redis.delete(lock_key)
+        return result
+
+    async def _store(self, redis: Redis, digest: str, result: dict):
+        now = time.time()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(self.KEY_PREFIX + digest, json.dumps(result), ex=self.ttl)
+            pipe.zadd(self.INDEX_KEY, {digest: now})
+            pipe.zremrangebyscore(self.INDEX_KEY, 0, now - self.ttl)
+            pipe.zcard(self.INDEX_KEY)
+            *_, size = await pipe.execute()
+
+        excess = size - self.max_entries
+        if excess > 0:
+            evicted = await redis.zpopmin(self.INDEX_KEY, excess)
+            if evicted:
+                await redis.delete(*(self.KEY_PREFIX + member for member, _ in evicted))
+
+    async def stats(self, redis: Redis) -> dict:
+        """
+        Получить счетчики попаданий и промахов кэша.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+
+        Возвращаемое значение:
+            dict: hits, misses, deduplicated, entries и hit_ratio — доля запросов,
+            обслуженных без вызова анализатора.
+        """
+        raw = await redis.hgetall(self.STATS_KEY)
+        hits = int(raw.get("hits", 0))
+        misses = int(raw.get("misses", 0))
+        deduplicated = int(raw.get("deduplicated", 0))
+        total = hits + misses + deduplicated
+        return {
+            "hits": hits,
+            "misses": misses,
+            "deduplicated": deduplicated,
+            "entries": await redis.zcard(self.INDEX_KEY),
+            "hit_ratio": (hits + deduplicated) / total if total else 0.0,
+        }
+
+
+analysis_cache = AnalysisCache(
+    ttl=settings.ANALYSIS_CACHE_TTL,
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    lock_timeout=settings.ANALYSIS_CACHE_LOCK_TIMEOUT,
+    wait_timeout=settings.ANALYSIS_CACHE_WAIT_TIMEOUT,
+)
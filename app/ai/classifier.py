@@ -0,0 +1,183 @@
+import asyncio
+import importlib
+import json
+import random
+import re
+from abc import ABC, abstractmethod
+from typing import List
+from app.config.config import settings
+
+
+class AnalyzerBackend(ABC):
+    """
+    Интерфейс движка анализа текста уведомлений.
+
+    Реализация обязана поддерживать пакетный вызов: список текстов на входе,
+    список результатов в том же порядке на выходе. Результат для одного
+    текста — словарь с полями category, confidence и keywords.
+    """
+
+    @abstractmethod
+    async def analyze_batch(self, texts: List[str]) -> List[dict]:
+        """
+        Проанализировать пакет текстов.
+
+        Аргументы:
+            texts (List[str]): Тексты для анализа.
+
+        Возвращаемое значение:
+            List[dict]: Результаты анализа в порядке входных текстов.
+        """
+
+    async def analyze(self, text: str) -> dict:
+        """
+        Проанализировать один текст.
+        """
+        return (await self.analyze_batch([text]))[0]
+
+
+class KeywordClassifier(AnalyzerBackend):
+    """
+    Классификатор по ключевым словам с предварительно скомпилированным шаблоном.
+
+    Все ключевые слова всех категорий собраны в одно регулярное выражение с
+    именованной группой на категорию, поэтому текст просматривается один раз
+    без приведения к нижнему регистру, а не по разу на каждую категорию.
+    Правила проверяются в порядке приоритета: из найденных категорий
+    выбирается первая по списку, как если бы каждое правило искалось в тексте
+    отдельно. Имитация задержки модели выполняется один
+    раз на пакет.
+
+    Атрибуты:
+        rules (list): Правила категорий в порядке приоритета.
+        default (dict): Категория и диапазон уверенности, если ключевых слов нет.
+        latency (tuple): Диапазон имитируемой задержки модели в секундах.
+    """
+
+    def __init__(self, rules: list, default: dict, latency: tuple = (0, 0)):
+        self.rules = rules
+        self.default = default
+        self.latency = latency
+        # Шаблон проверяется в каждой позиции текста (опережающая проверка не
+        # поглощает символы), поэтому совпадение менее приоритетного слова не
+        # скрывает пересекающееся с ним более приоритетное
+        self._pattern = re.compile(
+            "(?="
+            + (
+                "|".join(
+                    f"(?P<r{index}>"
+                    + "|".join(
+                        re.escape(word)
+                        for word in sorted(rule["keywords"], key=len, reverse=True)
+                    )
+                    + ")"
+                    for index, rule in enumerate(rules)
+                    if rule["keywords"]
+                )
+                or "(?!)"
+            )
+            + ")",
+            re.IGNORECASE,
+        )
+
+    @classmethod
+    def from_file(cls, path: str, latency: tuple = (0, 0)) -> "KeywordClassifier":
+        """
+        Создать классификатор по правилам из JSON-файла.
+
+        Аргументы:
+            path (str): Путь к файлу правил.
+            latency (tuple): Диапазон имитируемой задержки модели в секундах.
+
+        Возвращаемое значение:
+            KeywordClassifier: Классификатор.
+        """
+        with open(path, encoding="utf-8") as file:
+            config = json.load(file)
+        return cls(config["rules"], config["default"], latency)
+
+    @classmethod
+    def from_settings(cls) -> "KeywordClassifier":
+        """
+        Создать классификатор по настройкам приложения.
+        """
+        return cls.from_file(
+            settings.AI_RULES_FILE, (settings.AI_LATENCY_MIN, settings.AI_LATENCY_MAX)
+        )
+
+    def classify(self, text: str) -> dict:
+        """
+        Классифицировать один текст без имитации задержки.
+
+        Аргументы:
+            text (str): Текст для анализа.
+
+        Возвращаемое значение:
+            dict: Результат анализа (category, confidence, keywords).
+        """
+        best = None
+        for match in self._pattern.finditer(text):
+            index = int(match.lastgroup[1:])
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        rule = self.default if best is None else self.rules[best]
+
+        tokens = text.split()
+        return {
+            "category": rule["category"],
+            "confidence": random.uniform(*rule["confidence"]),
+            "keywords": random.sample(tokens, min(3, len(tokens))),
+        }
+
+    async def analyze_batch(self, texts: List[str]) -> List[dict]:
+        if self.latency[1] > 0:
+            await asyncio.sleep(random.uniform(*self.latency))
+        return [self.classify(text) for text in texts]
+
+
+# Встроенные движки; любой другой можно подключить через AI_BACKEND
+# в виде "module:factory", где factory возвращает AnalyzerBackend.
+BACKENDS = {
+    "keyword": KeywordClassifier.from_settings,
+}
+
+_analyzer = None
+
+
+def load_backend(name: str) -> AnalyzerBackend:
+    """
+    Создать движок анализа по имени из `BACKENDS` или по пути "module:factory".
+
+    Аргументы:
+        name (str): Имя встроенного движка или путь к фабрике.
+
+    Возвращаемое значение:
+        AnalyzerBackend: Движок анализа.
+    """
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    module_name, _, factory_name = name.partition(":")
+    factory = getattr(importlib.import_module(module_name), factory_name)
+    return factory()
+
+
+def get_analyzer() -> AnalyzerBackend:
+    """
+    Получить движок анализа, выбранный в настройках `AI_BACKEND`.
+
+    Движок создается при первом вызове и переиспользуется. Если включен
+    `AI_RESILIENCE_ENABLED`, он оборачивается в `ResilientAnalyzer`.
+
+    Возвращаемое значение:
+        AnalyzerBackend: Движок анализа.
+    """
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = load_backend(settings.AI_BACKEND)
+        if settings.AI_RESILIENCE_ENABLED:
+            from app.ai.resilience import ResilientAnalyzer
+
+            _analyzer = ResilientAnalyzer.from_settings(_analyzer)
+    return _analyzer
@@ -1,19 +1,47 @@
-import random, asyncio
+import time
+from contextlib import contextmanager
+from typing import List
+from app.ai.classifier import get_analyzer
+from app.monitoring import metrics
+
+
+@contextmanager
+def _timed():
+    if not metrics.ANALYZER:
+        yield
+        return
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        metrics.ANALYZER_SECONDS.labels(outcome).observe(time.perf_counter() - started)
 
 
 async def analyze_text(text: str) -> dict:
-    await asyncio.sleep(random.uniform(1, 3))
-    if any(word in text.lower() for word in ["error", "exception", "failed"]):
-        category = "critical"
-        confidence = random.uniform(0.7, 0.95)
-    elif any(word in text.lower() for word in ["warning", "attention", "careful"]):
-        category = "warning"
-        confidence = random.uniform(0.6, 0.9)
-    else:
-        category = "info"
-        confidence = random.uniform(0.8, 0.99)
-    return {
-        "category": category,
-        "confidence": confidence,
-        "keywords": random.sample(text.split(), min(3, len(text.split()))),
-    }
+    """
+    Проанализировать текст уведомления движком, выбранным в настройках.
+
+    Аргументы:
+        text (str): Текст для анализа.
+
+    Возвращаемое значение:
+        dict: Результат анализа (category, confidence, keywords).
+    """
+    with _timed():
+        return await get_analyzer().analyze(text)
+
+
+async def analyze_texts(texts: List[str]) -> List[dict]:
+    """
+    Проанализировать пакет текстов одним вызовом движка.
+
+    Аргументы:
+        texts (List[str]): Тексты для анализа.
+
+    Возвращаемое значение:
+        List[dict]: Результаты анализа в порядке входных текстов.
+    """
+    with _timed():
+        return await get_analyzer().analyze_batch(texts)
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, deque
+from typing import List, Optional
+from app.ai.classifier import AnalyzerBackend
+from app.config.config import settings
+from app.monitoring import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """
+    Вызов движка анализа отклонен: автомат защиты разомкнут.
+    """
+
+
+class CircuitBreaker:
+    """
+    Автомат защиты для движка анализа.
+
+    После `failure_threshold` ошибок подряд автомат размыкается, и вызовы
+    отклоняются без обращения к движку. Через `reset_timeout` секунд
+    пропускается один пробный вызов: при успехе автомат замыкается, при
+    ошибке снова размыкается. Если пробный вызов прерван (отмена задачи,
+    лимит времени Celery), автомат возвращается в разомкнутое состояние и
+    сразу пропускает новый пробный вызов; пробный вызов, не завершившийся за
+    `reset_timeout` секунд, тоже не блокирует следующий.
+
+    Атрибуты:
+        failure_threshold (int): Число ошибок подряд, размыкающее автомат.
+        reset_timeout (float): Через сколько секунд пропустить пробный вызов.
+        state (str): "closed", "open" или "half_open".
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+
+    def allow(self) -> bool:
+        """
+        Можно ли выполнить вызов.
+        """
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._probe_started_at = time.monotonic()
+            return True
+        # В полуоткрытом состоянии пробный вызов уже выполняется, но зависший
+        # пробный вызов не должен блокировать движок навсегда
+        if time.monotonic() - self._probe_started_at < self.reset_timeout:
+            return False
+        self._probe_started_at = time.monotonic()
+        return True
+
+    def record_success(self):
+        """
+        Учесть успешный вызов.
+        """
+        if self.state != "closed":
+            logger.info("Analyzer circuit breaker closed")
+        self.state = "closed"
+        self._failures = 0
+
+    def abort_probe(self):
+        """
+        Учесть прерванный вызов: пробный вызов не дал результата, и следующий
+        вызов снова становится пробным.
+        """
+        if self.state == "half_open":
+            self.state = "open"
+
+    def record_failure(self):
+        """
+        Учесть неудачный вызов.
+        """
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("Analyzer circuit breaker opened")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """
+    Скользящее окно длительностей успешных вызовов для оценки перцентилей.
+
+    Атрибуты:
+        min_samples (int): Минимальное число замеров для оценки перцентиля.
+    """
+
+    def __init__(self, window: int, min_samples: int):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        """
+        Добавить замер длительности вызова.
+        """
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Получить перцентиль длительности или None, если замеров недостаточно.
+
+        Аргументы:
+            q (float): Перцентиль от 0 до 100.
+        """
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class ResilientAnalyzer(AnalyzerBackend):
+    """
+    Обертка над движком анализа с дедлайнами, повторами, дублирующими
+    запросами и автоматом защиты.
+
+    Каждый вызов движка ограничен `timeout`. Неудачный вызов повторяется до
+    `retries` раз с экспоненциальной задержкой и полным джиттером. Если
+    задан `hedge_percentile`, а вызов не завершился за наблюдаемый перцентиль
+    длительности, запускается второй такой же вызов и используется тот
+    результат, что пришел первым. Пока автомат защиты разомкнут, вызовы
+    сразу завершаются `CircuitOpenError`.
+
+    Атрибуты:
+        backend (AnalyzerBackend): Исходный движок анализа.
+        timeout (float): Дедлайн одного вызова движка в секундах.
+        retries (int): Максимальное число повторов после неудачного вызова.
+        backoff (float): Базовая задержка перед повтором в секундах.
+        backoff_max (float): Максимальная задержка перед повтором в секундах.
+        hedge_percentile (float): Перцентиль длительности, после которого
+            запускается дублирующий вызов; 0 отключает дублирование.
+        breaker (CircuitBreaker): Автомат защиты.
+        latency (LatencyTracker): Замеры длительности успешных вызовов.
+        stats (Counter): Счетчики calls, failures, timeouts, retries,
+            hedged, hedge_wins и short_circuited.
+    """
+
+    def __init__(
+        self,
+        backend: AnalyzerBackend,
+        timeout: float,
+        retries: int,
+        backoff: float,
+        backoff_max: float,
+        hedge_percentile: float,
+        breaker: CircuitBreaker,
+        latency: LatencyTracker,
+    ):
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker
+        self.latency = latency
+        self.stats = Counter()
+
+    @classmethod
+    def from_settings(cls, backend: AnalyzerBackend) -> "ResilientAnalyzer":
+        """
+        Обернуть движок с параметрами из настроек приложения.
+        """
+        return cls(
+            backend,
+            timeout=settings.AI_TIMEOUT,
+            retries=settings.AI_RETRIES,
+            backoff=settings.AI_RETRY_BACKOFF,
+            backoff_max=settings.AI_RETRY_BACKOFF_MAX,
+            hedge_percentile=settings.AI_HEDGE_PERCENTILE,
+            breaker=CircuitBreaker(
+                settings.AI_BREAKER_THRESHOLD, settings.AI_BREAKER_RESET_TIMEOUT
+            ),
+            latency=LatencyTracker(
+                settings.AI_HEDGE_WINDOW, settings.AI_HEDGE_MIN_SAMPLES
+            ),
+        )
+
+    def _count(self, event: str):
+        self.stats[event] += 1
+        if metrics.ANALYZER:
+            metrics.ANALYZER_EVENTS.labels(event).inc()
+
+    async def analyze_batch(self, texts: List[str]) -> List[dict]:
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError("Analyzer circuit breaker is open")
+            try:
+                result = await self._hedged_call(texts)
+            except Exception:
+                self.breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                self._count("retries")
+                delay = min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, delay))
+            except BaseException:
+                self.breaker.abort_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _call(self, texts: List[str]) -> List[dict]:
+        self._count("calls")
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                self.backend.analyze_batch(texts), self.timeout
+            )
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            self._count("failures")
+            raise
+        except Exception:
+            self._count("failures")
+            raise
+        self.latency.observe(time.monotonic() - started)
+        return result
+
+    async def _hedged_call(self, texts: List[str]) -> List[dict]:
+        delay = (
+            self.latency.percentile(self.hedge_percentile)
+            if self.hedge_percentile
+            else None
+        )
+        if delay is None or delay >= self.timeout:
+            return await self._call(texts)
+
+        primary = asyncio.ensure_future(self._call(texts))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count("hedged")
+        hedge = asyncio.ensure_future(self._call(texts))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
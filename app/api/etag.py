@@ -0,0 +1,22 @@
+def etag_matches(if_none_match, etag: str) -> bool:
+    """
+    Совпадает ли ETag ответа с заголовком `If-None-Match`.
+
+    Сравнение слабое, как требует RFC 9110 для `If-None-Match`: префикс `W/`
+    не учитывается. `*` не учитывается: ответ 304 на список отдается до
+    проверки, что данные существуют.
+
+    Аргументы:
+        if_none_match (Optional[str]): Значение заголовка `If-None-Match`.
+        etag (str): ETag текущей версии ответа в кавычках.
+
+    Возвращаемое значение:
+        bool: True, если клиенту можно ответить 304.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.removeprefix("W/") == etag:
+            return True
+    return False
@@ -0,0 +1,72 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Response
+from redis.asyncio import Redis
+from sqlalchemy import func, select
+from app.celery.outbox import outbox_relay
+from app.config.config import settings
+from app.config.redis_conf import get_redis
+from app.db.database import get_shard_router
+from app.db.models import Notification
+from app.db.sharding import ShardRouter
+from app.monitoring import metrics
+
+
+router = APIRouter()
+
+
+async def oldest_pending_age(shards: ShardRouter) -> float:
+    """
+    Получить возраст самого старого уведомления в статусе pending по всем шардам.
+
+    Запрос использует частичный индекс незавершенных уведомлений.
+
+    Аргументы:
+        shards (ShardRouter): Маршрутизатор шардов.
+
+    Возвращаемое значение:
+        float: Возраст в секундах или 0.0, если ожидающих уведомлений нет.
+    """
+    oldest = None
+    for name in shards.names:
+        async with shards.session_maker(name)() as session:
+            shard_oldest = await session.scalar(
+                select(func.min(Notification.created_at)).where(
+                    Notification.processing_status == "pending"
+                )
+            )
+        if shard_oldest is not None and (oldest is None or shard_oldest < oldest):
+            oldest = shard_oldest
+    if oldest is None:
+        return 0.0
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return max((now - oldest).total_seconds(), 0.0)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(
+    shards: ShardRouter = Depends(get_shard_router),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Метрики процесса API в текстовом формате Prometheus.
+
+    Показатели очереди (возраст самого старого ожидающего уведомления и
+    размер outbox) обновляются при каждом опросе, если включен компонент
+    `backlog`.
+
+    Аргументы:
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+        redis (Redis): Экземпляр Redis, передается через Depends.
+
+    Возвращаемое значение:
+        Response: Метрики в формате Prometheus.
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    if metrics.BACKLOG:
+        metrics.PENDING_OLDEST_AGE.set(await oldest_pending_age(shards))
+        outbox = await outbox_relay.stats(shards, redis)
+        metrics.OUTBOX_PENDING.set(outbox["pending"])
+        metrics.OUTBOX_OLDEST_AGE.set(outbox["oldest_pending_age"])
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,41 @@
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, notification_id: UUID) -> str:
+    """
+    Сформировать непрозрачный курсор для следующей страницы списка уведомлений.
+
+    Аргументы:
+        created_at (datetime): Дата создания последнего уведомления на странице.
+        notification_id (UUID): ID последнего уведомления на странице.
+
+    Возвращаемое значение:
+        str: Курсор в виде base64url-строки.
+    """
+    raw = json.dumps([created_at.isoformat(), str(notification_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Разобрать курсор, полученный от клиента.
+
+    Аргументы:
+        cursor (str): Курсор из параметра запроса.
+
+    Возвращаемое значение:
+        tuple: Пара (created_at, id) последнего уведомления предыдущей страницы.
+
+    Исключения:
+        HTTPException: 400, если курсор поврежден.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, notification_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), UUID(notification_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,20 +1,52 @@
-import json
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.encoders import jsonable_encoder
+import asyncio
+import hashlib
+import re
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from pydantic import TypeAdapter, ValidationError
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone
-from app.db.models import Notification
-from app.db.database import get_session
-from app.pydantic_schemas.schemas import NotificationCreate, NotificationRead
-from app.celery.tasks import analyze_notification
+from app.db.models import Notification, NotificationKeyword, OutboxMessage
+from app.db.database import get_shard_router
+from app.db.pool import pool_stats
+from app.db.sharding import ShardRouter
+from app.pydantic_schemas.schemas import (
+    AnalysisCacheStats,
+    BulkCreateResult,
+    BulkItemResult,
+    BulkMarkRead,
+    BulkMarkReadResult,
+    DatabasePoolStats,
+    NotificationCacheStats,
+    NotificationCounts,
+    NotificationCreate,
+    NotificationDigest,
+    NotificationRead,
+    OutboxStats,
+)
+from app.ai.cache import analysis_cache
+from app.api.etag import etag_matches
+from app.api.pagination import decode_cursor, encode_cursor
+from app.cache.counters import notification_counters
+from app.cache.digest import GRANULARITIES, bucket_start, notification_digest
+from app.cache.invalidation import notifications_changed
+from app.cache.item_cache import notification_cache
+from app.cache.list_cache import list_cache
+from app.cache.read_your_writes import read_your_writes
+from app.celery.outbox import outbox_relay
+from app.config.config import settings
+from app.realtime.events import event_hub, format_sse, is_newer, read_missed
 from redis.asyncio import Redis
 from app.config.redis_conf import get_redis
 
 router = APIRouter()
 
+_notification_list = TypeAdapter(List[NotificationRead])
+
 
 @router.post(
     "/create_notification",
@@ -22,29 +54,268 @@ router = APIRouter()
     summary="Создание уведомления",
 )
 async def create_notification(
-    data: NotificationCreate, session: AsyncSession = Depends(get_session)
+    data: NotificationCreate,
+    shards: ShardRouter = Depends(get_shard_router),
+    redis: Redis = Depends(get_redis),
 ):
     """
     Создание нового уведомления.
 
-    Принимает данные для создания уведомления и сохраняет его в базе данных.
-    После сохранения уведомления запускается фоновая задача анализа текста уведомления.
+    Принимает данные для создания уведомления и сохраняет его на шарде
+    пользователя. В той же транзакции в outbox записывается запрос на анализ текста, который
+    ретранслятор затем публикует в брокер. После сохранения инвалидируется кэш
+    списков пользователя и обновляются счетчики.
 
     Аргументы:
         data (NotificationCreate): Данные для создания уведомления.
-        session (AsyncSession): Сессия базы данных, передается через Depends.
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+        redis (Redis): Экземпляр Redis, передается через Depends.
 
     Возвращаемое значение:
         NotificationRead: Данные созданного уведомления.
     """
-    notification = Notification(user_id=data.user_id, title=data.title, text=data.text)
-    session.add(notification)
-    await session.commit()
-    await session.refresh(notification)
-    analyze_notification.delay(notification.id, notification.text)
+    async with shards.session_for_user(data.user_id) as session:
+        notification = Notification(
+            user_id=data.user_id, title=data.title, text=data.text
+        )
+        session.add(notification)
+        await session.flush()
+        session.add(
+            OutboxMessage(notification_id=notification.id, text=notification.text)
+        )
+        await session.commit()
+        await session.refresh(notification)
+    outbox_relay.wake()
+    await notifications_changed(redis, [notification.user_id])
+    await notification_counters.on_created(redis, [notification.user_id])
+    await notification_digest.on_created(
+        redis, [(notification.user_id, notification.created_at)]
+    )
     return notification
 
 
+def _naive_utc(value: datetime) -> datetime:
+    """
+    Привести дату к наивному UTC, в котором хранятся даты в таблице уведомлений.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'body'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+async def _iter_ndjson(request: Request):
+    """
+    Построчно читать тело запроса в формате NDJSON по мере его поступления.
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def _iter_bulk_items(request: Request):
+    """
+    Получить элементы пакетной загрузки с их результатами валидации.
+
+    Выдает тройки (индекс, NotificationCreate или None, текст ошибки или None).
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        index = 0
+        async for line in _iter_ndjson(request):
+            try:
+                yield index, NotificationCreate.model_validate_json(line), None
+            except ValidationError as exc:
+                yield index, None, _format_validation_error(exc)
+            index += 1
+        return
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    for index, item in enumerate(payload):
+        try:
+            yield index, NotificationCreate.model_validate(item), None
+        except ValidationError as exc:
+            yield index, None, _format_validation_error(exc)
+
+
+async def _insert_chunk(
+    session: AsyncSession, redis: Redis, chunk: list, results: list
+):
+    """
+    Сохранить порцию уведомлений одним многострочным INSERT и в той же транзакции
+    записать запросы на их анализ в outbox.
+    """
+    rows = [
+        {"user_id": data.user_id, "title": data.title, "text": data.text}
+        for _, data in chunk
+    ]
+    try:
+        inserted = (
+            await session.execute(
+                insert(Notification).returning(
+                    Notification.id,
+                    Notification.created_at,
+                    sort_by_parameter_order=True,
+                ),
+                rows,
+            )
+        ).all()
+        ids = [row.id for row in inserted]
+        await session.execute(
+            insert(OutboxMessage),
+            [
+                {"notification_id": notification_id, "text": row["text"]}
+                for notification_id, row in zip(ids, rows)
+            ],
+        )
+        await session.commit()
+    except SQLAlchemyError as exc:
+        await session.rollback()
+        for index, _ in chunk:
+            results.append(BulkItemResult(index=index, error=exc.__class__.__name__))
+        return
+
+    for (index, _), notification_id in zip(chunk, ids):
+        results.append(BulkItemResult(index=index, id=notification_id))
+    outbox_relay.wake()
+    await notifications_changed(redis, {row["user_id"] for row in rows})
+    await notification_counters.on_created(redis, [row["user_id"] for row in rows])
+    await notification_digest.on_created(
+        redis,
+        [(row["user_id"], created.created_at) for row, created in zip(rows, inserted)],
+    )
+
+
+async def _insert_sharded(
+    shards: ShardRouter, redis: Redis, chunk: list, results: list
+):
+    """
+    Разложить порцию уведомлений по шардам пользователей и сохранить каждую часть.
+    """
+    groups = shards.group_by_shard(chunk, key=lambda item: item[1].user_id)
+    for name, shard_chunk in groups.items():
+        async with shards.session_maker(name)() as session:
+            await _insert_chunk(session, redis, shard_chunk, results)
+
+
+async def _mark_read_on_shards(shards: ShardRouter, name: str, ids: list, stmt) -> list:
+    """
+    Пометить уведомления прочитанными на их шарде.
+
+    Запрос выполняется на вычисленном по ID шарде только для его ID. Если
+    часть уведомлений на нем не найдена, они ищутся на остальных шардах, как
+    в `ShardRouter.candidates`.
+
+    Аргументы:
+        shards (ShardRouter): Маршрутизатор шардов.
+        name (str): Имя вычисленного шарда.
+        ids (list): ID уведомлений этого шарда.
+        stmt: `UPDATE ... RETURNING` без условия по ID.
+
+    Возвращаемое значение:
+        list: Строки помеченных уведомлений.
+    """
+    rows = []
+    missing = set(ids)
+    for other in [name] + [other for other in shards.names if other != name]:
+        if not missing:
+            break
+        async with shards.session_maker(other)() as session:
+            updated = (
+                await session.execute(stmt.where(Notification.id.in_(missing)))
+            ).all()
+            rows.extend(updated)
+            missing -= {row.id for row in updated}
+            if missing:
+                missing -= set(
+                    await session.scalars(
+                        select(Notification.id).where(Notification.id.in_(missing))
+                    )
+                )
+            await session.commit()
+    return rows
+
+
+@router.post(
+    "/notifications/bulk",
+    response_model=BulkCreateResult,
+    summary="Пакетное создание уведомлений",
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/NotificationCreate"},
+                    }
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+            "required": True,
+        }
+    },
+)
+async def create_notifications_bulk(
+    request: Request,
+    shards: ShardRouter = Depends(get_shard_router),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Пакетное создание уведомлений.
+
+    Принимает JSON-массив объектов `NotificationCreate` или поток NDJSON
+    (`Content-Type: application/x-ndjson`, один объект на строку). Поток
+    читается по мере поступления, поэтому размер загрузки не ограничен памятью.
+    Элементы сохраняются порциями по `BULK_INSERT_CHUNK_SIZE`: каждая порция
+    раскладывается по шардам пользователей и записывается многострочным
+    INSERT ... RETURNING вместе с запросами на анализ в outbox.
+    Невалидные элементы не прерывают загрузку, а попадают в ответ с описанием
+    ошибки.
+
+    Аргументы:
+        request (Request): Запрос с телом в формате JSON или NDJSON.
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+        redis (Redis): Экземпляр Redis, передается через Depends.
+
+    Возвращаемое значение:
+        BulkCreateResult: Количество созданных и отклоненных элементов и результат по каждому.
+    """
+    results = []
+    chunk = []
+    async for index, data, error in _iter_bulk_items(request):
+        if error is not None:
+            results.append(BulkItemResult(index=index, error=error))
+            continue
+        chunk.append((index, data))
+        if len(chunk) >= settings.BULK_INSERT_CHUNK_SIZE:
+            await _insert_sharded(shards, redis, chunk, results)
+            chunk = []
+    if chunk:
+        await _insert_sharded(shards, redis, chunk, results)
+
+    results.sort(key=lambda item: item.index)
+    created = sum(1 for item in results if item.id is not None)
+    return BulkCreateResult(
+        created=created, failed=len(results) - created, items=results
+    )
+
+
 @router.get(
     "/notification_list",
     response_model=List[NotificationRead],
@@ -54,47 +325,346 @@ async def list_notifications(
     user_id: UUID,
     skip: int = 0,
     limit: int = 10,
-    session: AsyncSession = Depends(get_session),
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    keyword: Optional[str] = None,
+    is_read: Optional[bool] = None,
+    if_none_match: Optional[str] = Header(None),
+    shards: ShardRouter = Depends(get_shard_router),
     redis: Redis = Depends(get_redis),
 ):
     """
     Получение списка уведомлений для указанного пользователя.
 
-    Если данные уже закешированы в Redis, они извлекаются оттуда. В противном случае выполняется запрос к базе данных
-    и результат сохраняется в кэш Redis на 60 секунд.
+    Уведомления возвращаются от новых к старым (сортировка по `created_at` и `id`).
+    Для постраничного обхода используется курсор: курсор следующей страницы
+    передается в заголовке ответа `X-Next-Cursor`, а клиент присылает его в
+    параметре `cursor`. Выборка по курсору идет по индексу
+    `(user_id, created_at DESC, id DESC)`, поэтому любая страница стоит столько же,
+    сколько первая. Параметр `skip` поддерживается для совместимости и
+    игнорируется, если передан `cursor`.
+
+    Список можно отфильтровать по категории, ключевому слову AI-анализа и
+    признаку прочтения. Каждый фильтр разрешается через свой индекс:
+    `(user_id, category, created_at DESC, id DESC)`, инвертированный индекс
+    `notification_keywords` и частичный индекс непрочитанных, поэтому вся
+    история пользователя не просматривается.
+
+    Страницы кэшируются в Redis в рамках поколения кэша пользователя, которое
+    увеличивается при каждом изменении его уведомлений. При истечении страницы
+    ее пересобирает из базы данных только один запрос, остальные получают
+    предыдущую копию или дожидаются результата.
+
+    В кэше хранится готовое тело ответа, сериализованное pydantic-core при
+    сборке страницы, поэтому при попадании оно отдается как есть, без
+    повторной валидации и кодирования через `response_model`.
+
+    Страница собирается с реплики шарда пользователя, а в течение
+    `READ_YOUR_WRITES_TTL` секунд после изменения его уведомлений — с
+    основной базы.
+
+    В заголовке `ETag` возвращается поколение кэша пользователя вместе с
+    хэшем параметров страницы. Если он совпадает с `If-None-Match`, ответ
+    `304` отдается после чтения одного счетчика поколения, без обращения к
+    кэшу страниц и базе данных. Счетчик поколения хранится в Redis без
+    срока жизни; если он будет потерян (например, при очистке Redis),
+    поколение начнется заново, и до следующей записи клиент с ETag того же
+    номера поколения может получить `304` для измененного списка.
 
     Аргументы:
         user_id (UUID): ID пользователя, для которого нужно получить уведомления.
         skip (int): Количество пропускаемых уведомлений для пагинации (по умолчанию 0).
         limit (int): Максимальное количество уведомлений в ответе (по умолчанию 10).
-        session (AsyncSession): Сессия базы данных, передается через Depends.
+        cursor (Optional[str]): Курсор, полученный в `X-Next-Cursor` предыдущей страницы.
+        category (Optional[str]): Вернуть только уведомления этой категории.
+        keyword (Optional[str]): Вернуть только уведомления с этим ключевым словом анализа.
+        is_read (Optional[bool]): Вернуть только прочитанные (true) или непрочитанные (false).
+        if_none_match (Optional[str]): ETag ранее полученной страницы.
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
         redis (Redis): Экземпляр Redis, передается через Depends.
 
     Возвращаемое значение:
-        List[NotificationRead]: Список уведомлений пользователя.
+        Response: JSON-массив `NotificationRead` уведомлений пользователя или
+        `304 Not Modified`.
     """
-    key = f"notifications:{user_id}:{skip}:{limit}"
-    cached = await redis.get(key)
-    if cached:
-        return [NotificationRead(**item) for item in json.loads(cached)]
+    if cursor:
+        cursor_key = decode_cursor(cursor)
+    if keyword is not None:
+        keyword = NotificationKeyword.normalize(keyword)
+        if not keyword:
+            raise HTTPException(status_code=400, detail="Invalid keyword")
+
+    params = ("json", skip, limit, cursor, category, keyword, is_read)
+    generation = await list_cache.get_generation(redis, user_id)
+    etag = '"{}-{}"'.format(
+        generation, hashlib.blake2b(repr(params).encode(), digest_size=8).hexdigest()
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    async def build() -> str:
+        stmt = (
+            select(Notification)
+            .order_by(Notification.created_at.desc(), Notification.id.desc())
+            .limit(limit)
+        )
+        if keyword is not None:
+            # Выборка начинается с индекса ключевых слов, который уже
+            # ограничен пользователем, а уведомления читаются по первичному ключу
+            stmt = stmt.join(
+                NotificationKeyword,
+                NotificationKeyword.notification_id == Notification.id,
+            ).where(
+                NotificationKeyword.keyword == keyword,
+                NotificationKeyword.user_id == user_id,
+            )
+        else:
+            stmt = stmt.where(Notification.user_id == user_id)
+        if category is not None:
+            stmt = stmt.where(Notification.category == category)
+        if is_read is not None:
+            stmt = stmt.where(
+                Notification.read_at.is_not(None)
+                if is_read
+                else Notification.read_at.is_(None)
+            )
+        if cursor:
+            created_at, last_id = cursor_key
+            stmt = stmt.where(
+                or_(
+                    Notification.created_at < created_at,
+                    and_(
+                        Notification.created_at == created_at,
+                        Notification.id < last_id,
+                    ),
+                )
+            )
+        elif skip:
+            stmt = stmt.offset(skip)
+        primary = await read_your_writes.pinned(redis, user_id=user_id)
+        async with shards.read_session_for_user(user_id, primary) as session:
+            result = await session.execute(stmt)
+            notifications = result.scalars().all()
+
+        next_cursor = ""
+        if notifications and len(notifications) == limit:
+            last = notifications[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        items = _notification_list.dump_json(
+            _notification_list.validate_python(notifications, from_attributes=True)
+        )
+        return next_cursor + "\n" + items.decode()
+
+    page = await list_cache.get_or_build(redis, user_id, params, build, generation)
+    next_cursor, _, items = page.partition("\n")
+    headers = {"ETag": etag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=items, media_type="application/json", headers=headers)
 
+
+@router.get(
+    "/notifications/export",
+    response_class=StreamingResponse,
+    summary="Потоковая выгрузка уведомлений пользователя в NDJSON",
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def export_notifications(
+    user_id: UUID,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    category: Optional[str] = None,
+    is_read: Optional[bool] = None,
+    shards: ShardRouter = Depends(get_shard_router),
+):
+    """
+    Потоковая выгрузка всех уведомлений пользователя в формате NDJSON.
+
+    Уведомления читаются из базы данных серверным курсором порциями по
+    `EXPORT_YIELD_PER` строк и отправляются клиенту по мере чтения (от новых
+    к старым), поэтому потребление памяти не зависит от числа уведомлений.
+    Выгрузка идет с реплики шарда пользователя, если она настроена.
+
+    Аргументы:
+        user_id (UUID): ID пользователя.
+        created_from (Optional[datetime]): Выгружать уведомления, созданные не раньше этого момента.
+        created_to (Optional[datetime]): Выгружать уведомления, созданные раньше этого момента.
+        category (Optional[str]): Выгружать только уведомления этой категории.
+        is_read (Optional[bool]): Выгружать только прочитанные (true) или непрочитанные (false).
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+
+    Возвращаемое значение:
+        StreamingResponse: Поток NDJSON, по одному уведомлению `NotificationRead` на строку.
+    """
     stmt = (
         select(Notification)
         .where(Notification.user_id == user_id)
-        .offset(skip)
-        .limit(limit)
+        .order_by(Notification.created_at.desc(), Notification.id.desc())
+        .execution_options(yield_per=settings.EXPORT_YIELD_PER)
     )
-    result = await session.execute(stmt)
-    notifications = result.scalars().all()
-
-    await redis.set(
-        key,
-        json.dumps(
-            jsonable_encoder([NotificationRead.from_orm(n) for n in notifications])
-        ),
-        ex=60,
+    if created_from is not None:
+        stmt = stmt.where(Notification.created_at >= _naive_utc(created_from))
+    if created_to is not None:
+        stmt = stmt.where(Notification.created_at < _naive_utc(created_to))
+    if category is not None:
+        stmt = stmt.where(Notification.category == category)
+    if is_read is not None:
+        stmt = stmt.where(
+            Notification.read_at.is_not(None)
+            if is_read
+            else Notification.read_at.is_(None)
+        )
+
+    async def lines():
+        async with shards.read_session_for_user(user_id) as session:
+            result = await session.stream_scalars(stmt)
+            async for partition in result.partitions():
+                yield "".join(
+                    NotificationRead.model_validate(n).model_dump_json() + "\n"
+                    for n in partition
+                )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/notifications/events",
+    response_class=StreamingResponse,
+    summary="Поток изменений статуса уведомлений (SSE)",
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def notification_events(
+    request: Request,
+    user_id: UUID,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Поток Server-Sent Events об изменении статуса обработки и категории
+    уведомлений пользователя.
+
+    Воркер публикует события в Redis, а процесс API раздает их всем
+    подключенным клиентам через одну общую подписку. Клиент может возобновить
+    поток после разрыва, передав ID последнего полученного события в заголовке
+    `Last-Event-ID` (браузерный EventSource делает это сам) или в параметре
+    `last_event_id`: пропущенные события дочитываются из потока Redis.
+
+    Аргументы:
+        request (Request): Входящий запрос.
+        user_id (UUID): ID пользователя.
+        last_event_id (Optional[str]): ID последнего полученного события.
+        last_event_id_header (Optional[str]): То же, из заголовка `Last-Event-ID`.
+        redis (Redis): Экземпляр Redis, передается через Depends.
+
+    Возвращаемое значение:
+        StreamingResponse: Поток `text/event-stream`.
+    """
+    last_event_id = last_event_id_header or last_event_id
+    if last_event_id and not re.fullmatch(r"\d+-\d+", last_event_id):
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    subscription = event_hub.subscribe(redis, user_id)
+
+    async def stream():
+        last = last_event_id
+        try:
+            if last:
+                for event_id, data in await read_missed(redis, user_id, last):
+                    yield format_sse(event_id, data)
+                    last = event_id
+            while not subscription.overflowed:
+                try:
+                    event_id, data = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        timeout=settings.EVENTS_HEARTBEAT_INTERVAL,
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if is_newer(event_id, last):
+                    yield format_sse(event_id, data)
+                    last = event_id
+        finally:
+            event_hub.unsubscribe(user_id, subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return notifications
+
+
+@router.get(
+    "/notifications/counts",
+    response_model=NotificationCounts,
+    summary="Счетчики уведомлений пользователя",
+)
+async def get_notification_counts(user_id: UUID, redis: Redis = Depends(get_redis)):
+    """
+    Получение счетчиков уведомлений пользователя: всего, непрочитанных,
+    по категориям (всего и непрочитанных) и по статусам обработки.
+
+    Счетчики хранятся в Redis и обновляются при записи, поэтому запрос не
+    обращается к базе данных и не зависит от числа уведомлений пользователя.
+
+    Аргументы:
+        user_id (UUID): ID пользователя.
+        redis (Redis): Экземпляр Redis, передается через Depends.
+
+    Возвращаемое значение:
+        NotificationCounts: Счетчики уведомлений.
+    """
+    return await notification_counters.get(redis, user_id)
+
+
+@router.get(
+    "/notifications/digest",
+    response_model=NotificationDigest,
+    summary="Сводка уведомлений пользователя по интервалам",
+)
+async def get_notification_digest(
+    user_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "day",
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Получение сводки уведомлений пользователя по часам или суткам: количество
+    по категориям, средняя уверенность анализа и доля прочитанных.
+
+    Агрегаты по интервалам хранятся в Redis и обновляются при записи, поэтому
+    стоимость запроса пропорциональна числу интервалов периода, а не числу
+    уведомлений пользователя.
+
+    Аргументы:
+        user_id (UUID): ID пользователя.
+        start (Optional[datetime]): Начало периода; по умолчанию последние 7 суток
+            (для "hour" — 24 часа), включая текущий интервал.
+        end (Optional[datetime]): Конец периода (не включительно); по умолчанию текущий момент.
+        granularity (str): Детализация: "hour" или "day" (по умолчанию).
+        redis (Redis): Экземпляр Redis, передается через Depends.
+
+    Возвращаемое значение:
+        NotificationDigest: Агрегаты по интервалам периода.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Unknown granularity")
+    _, step = GRANULARITIES[granularity]
+    end = _naive_utc(end or datetime.now(timezone.utc))
+    if start is None:
+        periods = 7 if granularity == "day" else 24
+        start = bucket_start(end, granularity) - step * (periods - 1)
+    start = _naive_utc(start)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start) / step > settings.DIGEST_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail="Too many buckets requested")
+    buckets = await notification_digest.get(redis, user_id, start, end, granularity)
+    return NotificationDigest(user_id=user_id, granularity=granularity, buckets=buckets)
 
 
 @router.get(
@@ -103,22 +673,52 @@ async def list_notifications(
     summary="Получение уведомления по ID",
 )
 async def get_notification(
-    notification_id: UUID, session: AsyncSession = Depends(get_session)
+    notification_id: UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    shards: ShardRouter = Depends(get_shard_router),
+    redis: Redis = Depends(get_redis),
 ):
     """
     Получение уведомления по его ID.
 
+    Уведомление ищется в двухуровневом кэше (память процесса, затем Redis),
+    и только при промахе на обоих уровнях запрашивается с шарда, вычисленного
+    по ID уведомления: с его реплики, а в течение `READ_YOUR_WRITES_TTL`
+    секунд после изменения уведомления — с основной базы.
+
+    В заголовке `ETag` возвращается хэш уведомления, сохраненный вместе с ним
+    в кэше. Если он совпадает с `If-None-Match`, отдается ответ `304`; при
+    попадании в кэш в памяти процесса для этого не нужно обращаться ни к
+    Redis, ни к базе данных.
+
     Аргументы:
         notification_id (UUID): ID уведомления для получения.
-        session (AsyncSession): Сессия базы данных, передается через Depends.
+        response (Response): Ответ, в который добавляется заголовок `ETag`.
+        if_none_match (Optional[str]): ETag ранее полученного уведомления.
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+        redis (Redis): Экземпляр Redis, передается через Depends.
 
     Возвращаемое значение:
-        NotificationRead: Уведомление с указанным ID.
+        NotificationRead: Уведомление с указанным ID или `304 Not Modified`.
     """
-    notification = await session.get(Notification, notification_id)
-    if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
-    return notification
+    cached = await notification_cache.get(redis, notification_id)
+    if cached is not None:
+        etag, result = cached
+    else:
+        primary = await read_your_writes.pinned(redis, notification_id=notification_id)
+        async with shards.notification_session(
+            Notification, notification_id, read_only=not primary
+        ) as (_, notification):
+            if not notification:
+                raise HTTPException(status_code=404, detail="Notification not found")
+            result = NotificationRead.model_validate(notification)
+        etag = await notification_cache.set(redis, result)
+
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return result
 
 
 @router.post(
@@ -126,23 +726,203 @@ async def get_notification(
     response_model=NotificationRead,
     summary="Отметить уведомление как прочитанное",
 )
-async def mark_as_read(id: UUID, session: AsyncSession = Depends(get_session)):
+async def mark_as_read(
+    id: UUID,
+    shards: ShardRouter = Depends(get_shard_router),
+    redis: Redis = Depends(get_redis),
+):
     """
     Отметить уведомление как прочитанное.
 
-    Обновляет поле `read_at` уведомления и сохраняет изменения в базе данных.
+    Устанавливает `read_at` условным `UPDATE ... WHERE read_at IS NULL
+    RETURNING`, поэтому из параллельных запросов уведомление помечает только
+    один. Кэши и счетчики непрочитанных обновляются, только если уведомление
+    было непрочитанным; для уже прочитанного возвращается его текущее
+    состояние.
 
     Аргументы:
         id (UUID): ID уведомления для пометки как прочитанное.
-        session (AsyncSession): Сессия базы данных, передается через Depends.
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+        redis (Redis): Экземпляр Redis, передается через Depends.
 
     Возвращаемое значение:
         NotificationRead: Обновленное уведомление.
     """
-    notification = await session.get(Notification, id)
-    if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
-    notification.read_at = datetime.now(timezone.utc)
-    await session.commit()
-    await session.refresh(notification)
+    async with shards.notification_session(Notification, id) as (
+        session,
+        notification,
+    ):
+        if not notification:
+            raise HTTPException(status_code=404, detail="Notification not found")
+        marked = await session.scalar(
+            update(Notification)
+            .where(Notification.id == id, Notification.read_at.is_(None))
+            .values(read_at=datetime.now(timezone.utc))
+            .returning(Notification.id)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        await session.refresh(notification)
+    if marked is not None:
+        await notifications_changed(redis, [notification.user_id], [notification.id])
+        await notification_counters.on_read(
+            redis, [(notification.user_id, notification.category)]
+        )
+        await notification_digest.on_read(
+            redis, [(notification.user_id, notification.created_at)]
+        )
     return notification
+
+
+@router.post(
+    "/notifications/bulk_mark_read",
+    response_model=BulkMarkReadResult,
+    summary="Пакетная пометка уведомлений как прочитанных",
+)
+async def mark_as_read_bulk(
+    data: BulkMarkRead,
+    shards: ShardRouter = Depends(get_shard_router),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Пометить как прочитанные несколько уведомлений одним запросом.
+
+    Выполняет один `UPDATE ... WHERE read_at IS NULL ... RETURNING` по списку ID
+    и/или по пользователю с необязательной границей `created_before`. Уже
+    прочитанные уведомления не изменяются. Кэши и счетчики обновляются один
+    раз на всю операцию. Если указан пользователь, запрос выполняется только
+    на его шарде, иначе ID раскладываются по шардам и каждый шард обновляет
+    только свои уведомления.
+
+    Аргументы:
+        data (BulkMarkRead): Условия выбора уведомлений.
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+        redis (Redis): Экземпляр Redis, передается через Depends.
+
+    Возвращаемое значение:
+        BulkMarkReadResult: Количество и ID помеченных уведомлений.
+    """
+    stmt = (
+        update(Notification)
+        .where(Notification.read_at.is_(None))
+        .values(read_at=datetime.now(timezone.utc))
+        .returning(
+            Notification.id,
+            Notification.user_id,
+            Notification.category,
+            Notification.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if data.user_id is not None:
+        stmt = stmt.where(Notification.user_id == data.user_id)
+    if data.created_before is not None:
+        created_before = data.created_before
+        if created_before.tzinfo is not None:
+            created_before = created_before.astimezone(timezone.utc).replace(
+                tzinfo=None
+            )
+        stmt = stmt.where(Notification.created_at < created_before)
+
+    rows = []
+    if data.user_id is not None:
+        if data.ids:
+            stmt = stmt.where(Notification.id.in_(data.ids))
+        async with shards.session_for_user(data.user_id) as session:
+            rows.extend((await session.execute(stmt)).all())
+            await session.commit()
+    else:
+        for name, shard_ids in shards.group_notifications(set(data.ids)).items():
+            rows.extend(await _mark_read_on_shards(shards, name, shard_ids, stmt))
+
+    ids = [row.id for row in rows]
+    if ids:
+        await notifications_changed(redis, {row.user_id for row in rows}, ids)
+        await notification_counters.on_read(
+            redis, [(row.user_id, row.category) for row in rows]
+        )
+        await notification_digest.on_read(
+            redis, [(row.user_id, row.created_at) for row in rows]
+        )
+    return BulkMarkReadResult(updated=len(ids), ids=ids)
+
+
+@router.get(
+    "/analysis_cache_stats",
+    response_model=AnalysisCacheStats,
+    summary="Статистика кэша AI-анализа",
+)
+async def get_analysis_cache_stats(redis: Redis = Depends(get_redis)):
+    """
+    Получение счетчиков попаданий и промахов кэша результатов AI-анализа.
+
+    Аргументы:
+        redis (Redis): Экземпляр Redis, передается через Depends.
+
+    Возвращаемое значение:
+        AnalysisCacheStats: Статистика кэша.
+    """
+    return await analysis_cache.stats(redis)
+
+
+@router.get(
+    "/notifications/cache_stats",
+    response_model=NotificationCacheStats,
+    summary="Статистика кэша уведомлений",
+)
+async def get_notification_cache_stats():
+    """
+    Получение счетчиков попаданий и промахов двухуровневого кэша уведомлений
+    в текущем процессе API.
+
+    Возвращаемое значение:
+        NotificationCacheStats: Статистика кэша по уровням.
+    """
+    return notification_cache.get_stats()
+
+
+@router.get(
+    "/notifications/outbox_stats",
+    response_model=OutboxStats,
+    summary="Статистика outbox запросов на анализ",
+)
+async def get_outbox_stats(
+    shards: ShardRouter = Depends(get_shard_router),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Получение размера очереди outbox (по всем шардам) и задержки публикации
+    запросов на анализ в брокер.
+
+    Аргументы:
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+        redis (Redis): Экземпляр Redis, передается через Depends.
+
+    Возвращаемое значение:
+        OutboxStats: Статистика outbox.
+    """
+    return await outbox_relay.stats(shards, redis)
+
+
+@router.get(
+    "/notifications/db_pool_stats",
+    response_model=List[DatabasePoolStats],
+    summary="Статистика пулов соединений с базами данных",
+)
+async def get_db_pool_stats(shards: ShardRouter = Depends(get_shard_router)):
+    """
+    Получение занятости пулов соединений и времени ожидания соединения
+    для основных баз и реплик всех шардов в текущем процессе API.
+
+    Аргументы:
+        shards (ShardRouter): Маршрутизатор шардов, передается через Depends.
+
+    Возвращаемое значение:
+        List[DatabasePoolStats]: Статистика по каждому движку.
+    """
+    result = []
+    for name, (role, engine) in shards.named_engines().items():
+        stats = pool_stats(engine)
+        if stats is not None:
+            result.append(DatabasePoolStats(name=name, role=role, **stats))
+    return result
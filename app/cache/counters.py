@@ -0,0 +1,258 @@
+import uuid
+from collections import Counter
+from redis.asyncio import Redis
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Notification
+from app.db.sharding import ShardRouter
+
+
+class NotificationCounters:
+    """
+    Счетчики уведомлений пользователя в хэше Redis.
+
+    Хэш `notifications:counts:{user_id}` хранит поля:
+    `total`, `unread`, `category:{c}`, `unread_category:{c}` и `status:{s}`.
+    Счетчики обновляются инкрементально операциями записи, поэтому чтение
+    всех счетчиков пользователя — один HGETALL по небольшому хэшу, независимо
+    от числа уведомлений. Периодическая сверка `rebuild` пересчитывает их из
+    таблицы `notifications`, устраняя накопившиеся расхождения, а `prune`
+    удаляет счетчики пользователей, у которых не осталось уведомлений.
+    """
+
+    KEY = "notifications:counts:{user_id}"
+    REBUILD_KEY = "notifications:counts_rebuild:{user_id}"
+    REBUILD_CHUNK_SIZE = 500
+
+    def _key(self, user_id) -> str:
+        return self.KEY.format(user_id=user_id)
+
+    async def on_created(self, redis: Redis, user_ids):
+        """
+        Учесть новые уведомления (непрочитанные, в статусе pending).
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            user_ids (Iterable[UUID]): ID пользователя для каждого созданного уведомления.
+
+        Возвращаемое значение:
+            None
+        """
+        per_user = Counter(user_ids)
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id, count in per_user.items():
+                key = self._key(user_id)
+                pipe.hincrby(key, "total", count)
+                pipe.hincrby(key, "unread", count)
+                pipe.hincrby(key, "status:pending", count)
+            await pipe.execute()
+
+    async def on_read(self, redis: Redis, rows):
+        """
+        Учесть пометку уведомлений как прочитанных.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            rows (Iterable[tuple]): Пары (user_id, category) для уведомлений,
+                которые до этого были непрочитанными.
+
+        Возвращаемое значение:
+            None
+        """
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id, category in rows:
+                key = self._key(user_id)
+                pipe.hincrby(key, "unread", -1)
+                if category:
+                    pipe.hincrby(key, f"unread_category:{category}", -1)
+            await pipe.execute()
+
+    async def on_status_changed(self, redis: Redis, changes):
+        """
+        Учесть смену статуса обработки и категории уведомлений.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            changes (Iterable[tuple]): Кортежи (user_id, old_status, new_status,
+                old_category, new_category, unread).
+
+        Возвращаемое значение:
+            None
+        """
+        async with redis.pipeline(transaction=False) as pipe:
+            for (
+                user_id,
+                old_status,
+                new_status,
+                old_category,
+                new_category,
+                unread,
+            ) in changes:
+                key = self._key(user_id)
+                if old_status != new_status:
+                    pipe.hincrby(key, f"status:{old_status}", -1)
+                    pipe.hincrby(key, f"status:{new_status}", 1)
+                if old_category == new_category:
+                    continue
+                for category, delta in ((old_category, -1), (new_category, 1)):
+                    if not category:
+                        continue
+                    pipe.hincrby(key, f"category:{category}", delta)
+                    if unread:
+                        pipe.hincrby(key, f"unread_category:{category}", delta)
+            await pipe.execute()
+
+    async def get(self, redis: Redis, user_id) -> dict:
+        """
+        Получить счетчики пользователя.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            user_id (UUID): ID пользователя.
+
+        Возвращаемое значение:
+            dict: total, unread, by_category, unread_by_category, by_status.
+        """
+        raw = await redis.hgetall(self._key(user_id))
+        counts = {
+            "total": int(raw.get("total", 0)),
+            "unread": int(raw.get("unread", 0)),
+            "by_category": {},
+            "unread_by_category": {},
+            "by_status": {},
+        }
+        groups = {
+            "category": "by_category",
+            "unread_category": "unread_by_category",
+            "status": "by_status",
+        }
+        for field, value in raw.items():
+            prefix, _, name = field.partition(":")
+            if prefix in groups and int(value):
+                counts[groups[prefix]][name] = int(value)
+        return counts
+
+    async def rebuild(self, redis: Redis, session: AsyncSession, user_id=None) -> int:
+        """
+        Пересчитать счетчики из таблицы `notifications`.
+
+        Счетчики считаются агрегатным запросом `GROUP BY`, результат которого
+        читается потоком в порядке пользователей, поэтому в памяти находятся
+        счетчики только одного пользователя. Хэш каждого пользователя
+        собирается во временном ключе и заменяет текущий одной командой
+        `RENAME`: читатели не видят пустой или частично заполненный хэш, а
+        старые поля исчезают вместе с прежним хэшем.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            session (AsyncSession): Сессия базы данных.
+            user_id (Optional[UUID]): Пересчитать только этого пользователя; по умолчанию всех.
+
+        Возвращаемое значение:
+            int: Количество пользователей, для которых пересчитаны счетчики.
+        """
+        unread = Notification.read_at.is_(None).label("unread")
+        stmt = (
+            select(
+                Notification.user_id,
+                unread,
+                Notification.category,
+                Notification.processing_status,
+                func.count().label("count"),
+            )
+            .group_by(
+                Notification.user_id,
+                unread,
+                Notification.category,
+                Notification.processing_status,
+            )
+            .order_by(Notification.user_id)
+        )
+        if user_id is not None:
+            stmt = stmt.where(Notification.user_id == user_id)
+
+        rebuilt = 0
+        current, fields = None, Counter()
+        async with redis.pipeline(transaction=False) as pipe:
+            result = await session.stream(stmt)
+            async for row in result:
+                if row.user_id != current:
+                    if current is not None:
+                        self._queue_replace(pipe, current, fields)
+                        rebuilt += 1
+                        if rebuilt % self.REBUILD_CHUNK_SIZE == 0:
+                            await pipe.execute()
+                    current, fields = row.user_id, Counter()
+                fields["total"] += row.count
+                fields[f"status:{row.processing_status}"] += row.count
+                if row.unread:
+                    fields["unread"] += row.count
+                if row.category:
+                    fields[f"category:{row.category}"] += row.count
+                    if row.unread:
+                        fields[f"unread_category:{row.category}"] += row.count
+            if current is not None:
+                self._queue_replace(pipe, current, fields)
+                rebuilt += 1
+            elif user_id is not None:
+                pipe.delete(self._key(user_id))
+            await pipe.execute()
+        return rebuilt
+
+    def _queue_replace(self, pipe, user_id, fields: Counter):
+        key = self._key(user_id)
+        temp_key = self.REBUILD_KEY.format(user_id=user_id)
+        pipe.delete(temp_key)
+        pipe.hset(temp_key, mapping={"unread": 0, **fields})
+        pipe.rename(temp_key, key)
+
+    async def prune(self, redis: Redis, shards: ShardRouter) -> int:
+        """
+        Удалить счетчики пользователей, у которых не осталось уведомлений.
+
+        Ключи счетчиков просматриваются через SCAN порциями; для каждой
+        порции шарды пользователей проверяются одним запросом на шард.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            shards (ShardRouter): Маршрутизатор шардов.
+
+        Возвращаемое значение:
+            int: Количество удаленных ключей.
+        """
+        deleted = 0
+        prefix = self.KEY.format(user_id="")
+        batch = []
+        async for key in redis.scan_iter(
+            match=prefix + "*", count=self.REBUILD_CHUNK_SIZE
+        ):
+            try:
+                batch.append(uuid.UUID(key[len(prefix) :]))
+            except ValueError:
+                continue
+            if len(batch) >= self.REBUILD_CHUNK_SIZE:
+                deleted += await self._prune_batch(redis, shards, batch)
+                batch = []
+        if batch:
+            deleted += await self._prune_batch(redis, shards, batch)
+        return deleted
+
+    async def _prune_batch(self, redis: Redis, shards: ShardRouter, user_ids) -> int:
+        missing = set(user_ids)
+        for name, shard_users in shards.group_by_shard(
+            user_ids, key=lambda user_id: user_id
+        ).items():
+            async with shards.session_maker(name)() as session:
+                missing -= set(
+                    await session.scalars(
+                        select(Notification.user_id)
+                        .where(Notification.user_id.in_(shard_users))
+                        .distinct()
+                    )
+                )
+        if missing:
+            await redis.delete(*(self._key(user_id) for user_id in missing))
+        return len(missing)
+
+
+notification_counters = NotificationCounters()
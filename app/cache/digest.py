@@ -0,0 +1,285 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.config import settings
+from app.db.models import Notification
+
+
+GRANULARITIES = {
+    "hour": ("%Y-%m-%dT%H", timedelta(hours=1)),
+    "day": ("%Y-%m-%d", timedelta(days=1)),
+}
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    """
+    Получить начало интервала, в который попадает момент времени (UTC).
+
+    Аргументы:
+        value (datetime): Момент времени.
+        granularity (str): "hour" или "day".
+
+    Возвращаемое значение:
+        datetime: Начало часа или суток.
+    """
+    value = _naive_utc(value).replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        value = value.replace(hour=0)
+    return value
+
+
+class NotificationDigest:
+    """
+    Агрегаты уведомлений пользователя по часовым и суточным интервалам в Redis.
+
+    Для каждого интервала времени создания уведомлений хранится хэш
+    `notifications:digest:{user_id}:{granularity}:{bucket}` с полями `total`,
+    `read`, `category:{c}`, `confidence_sum` и `confidence_count`. Операции
+    записи обновляют оба хэша (часовой и суточный) инкрементально, поэтому
+    сводка за период читается одним HGETALL на интервал, независимо от числа
+    уведомлений пользователя. `rebuild` пересчитывает агрегаты из таблицы
+    `notifications`.
+
+    Атрибуты:
+        ttl (dict): Время жизни хэша интервала в секундах по детализации.
+    """
+
+    KEY = "notifications:digest:{user_id}:{granularity}:{bucket}"
+    REBUILD_YIELD_PER = 1000
+
+    def __init__(self, hourly_ttl: int, daily_ttl: int):
+        self.ttl = {"hour": hourly_ttl, "day": daily_ttl}
+
+    def _keys(self, user_id, created_at: datetime):
+        for granularity, (fmt, _) in GRANULARITIES.items():
+            bucket = bucket_start(created_at, granularity)
+            key = self.KEY.format(
+                user_id=user_id, granularity=granularity, bucket=bucket.strftime(fmt)
+            )
+            yield granularity, key, bucket
+
+    async def _apply(self, redis: Redis, deltas: dict):
+        async with redis.pipeline(transaction=False) as pipe:
+            for (user_id, created_at), fields in deltas.items():
+                for granularity, key, _ in self._keys(user_id, created_at):
+                    for field, delta in fields.items():
+                        if isinstance(delta, float):
+                            pipe.hincrbyfloat(key, field, delta)
+                        elif delta:
+                            pipe.hincrby(key, field, delta)
+                    pipe.expire(key, self.ttl[granularity])
+            await pipe.execute()
+
+    async def on_created(self, redis: Redis, rows):
+        """
+        Учесть новые уведомления.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            rows (Iterable[tuple]): Пары (user_id, created_at).
+
+        Возвращаемое значение:
+            None
+        """
+        deltas = defaultdict(Counter)
+        for user_id, created_at in rows:
+            deltas[user_id, bucket_start(created_at, "hour")]["total"] += 1
+        await self._apply(redis, deltas)
+
+    async def on_read(self, redis: Redis, rows):
+        """
+        Учесть пометку уведомлений как прочитанных.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            rows (Iterable[tuple]): Пары (user_id, created_at) для уведомлений,
+                которые до этого были непрочитанными.
+
+        Возвращаемое значение:
+            None
+        """
+        deltas = defaultdict(Counter)
+        for user_id, created_at in rows:
+            deltas[user_id, bucket_start(created_at, "hour")]["read"] += 1
+        await self._apply(redis, deltas)
+
+    async def on_classified(self, redis: Redis, rows):
+        """
+        Учесть смену категории и уверенности уведомлений после анализа.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            rows (Iterable[tuple]): Кортежи (user_id, created_at, old_category,
+                new_category, old_confidence, new_confidence).
+
+        Возвращаемое значение:
+            None
+        """
+        deltas = defaultdict(dict)
+        for (
+            user_id,
+            created_at,
+            old_category,
+            new_category,
+            old_confidence,
+            new_confidence,
+        ) in rows:
+            fields = deltas[user_id, bucket_start(created_at, "hour")]
+            if old_category != new_category:
+                for category, delta in ((old_category, -1), (new_category, 1)):
+                    if category:
+                        field = f"category:{category}"
+                        fields[field] = fields.get(field, 0) + delta
+            if old_confidence != new_confidence:
+                for confidence, sign in ((old_confidence, -1), (new_confidence, 1)):
+                    if confidence is not None:
+                        fields["confidence_sum"] = (
+                            fields.get("confidence_sum", 0.0) + sign * confidence
+                        )
+                        fields["confidence_count"] = (
+                            fields.get("confidence_count", 0) + sign
+                        )
+        await self._apply(redis, deltas)
+
+    async def get(
+        self, redis: Redis, user_id, start: datetime, end: datetime, granularity: str
+    ) -> list:
+        """
+        Получить агрегаты пользователя по интервалам периода.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            user_id (UUID): ID пользователя.
+            start (datetime): Начало периода (включительно).
+            end (datetime): Конец периода (не включительно).
+            granularity (str): "hour" или "day".
+
+        Возвращаемое значение:
+            list: Для каждого интервала словарь start, total, read, read_rate,
+            by_category и avg_confidence.
+        """
+        fmt, step = GRANULARITIES[granularity]
+        buckets = []
+        current = bucket_start(start, granularity)
+        end = _naive_utc(end)
+        while current < end:
+            buckets.append(current)
+            current += step
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for bucket in buckets:
+                pipe.hgetall(
+                    self.KEY.format(
+                        user_id=user_id,
+                        granularity=granularity,
+                        bucket=bucket.strftime(fmt),
+                    )
+                )
+            raws = await pipe.execute()
+
+        result = []
+        for bucket, raw in zip(buckets, raws):
+            total = int(raw.get("total", 0))
+            read = int(raw.get("read", 0))
+            confidence_count = int(raw.get("confidence_count", 0))
+            result.append(
+                {
+                    "start": bucket,
+                    "total": total,
+                    "read": read,
+                    "read_rate": read / total if total else 0.0,
+                    "by_category": {
+                        field.partition(":")[2]: int(value)
+                        for field, value in raw.items()
+                        if field.startswith("category:") and int(value)
+                    },
+                    "avg_confidence": (
+                        float(raw["confidence_sum"]) / confidence_count
+                        if confidence_count
+                        else None
+                    ),
+                }
+            )
+        return result
+
+    async def rebuild(self, redis: Redis, session: AsyncSession, user_id=None) -> int:
+        """
+        Пересчитать агрегаты из таблицы `notifications`.
+
+        Уведомления читаются потоком, упорядоченными по пользователю, и
+        агрегаты каждого пользователя записываются в Redis целиком, заменяя
+        прежние значения интервалов.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            session (AsyncSession): Сессия базы данных.
+            user_id (Optional[UUID]): Пересчитать только этого пользователя; по умолчанию всех.
+
+        Возвращаемое значение:
+            int: Количество пользователей, для которых пересчитаны агрегаты.
+        """
+        stmt = (
+            select(
+                Notification.user_id,
+                Notification.created_at,
+                Notification.read_at,
+                Notification.category,
+                Notification.confidence,
+            )
+            .order_by(Notification.user_id, Notification.created_at)
+            .execution_options(yield_per=self.REBUILD_YIELD_PER)
+        )
+        if user_id is not None:
+            stmt = stmt.where(Notification.user_id == user_id)
+
+        users = 0
+        current_user, buckets = None, defaultdict(Counter)
+        result = await session.stream(stmt)
+        async for row in result:
+            if row.user_id != current_user:
+                if current_user is not None:
+                    await self._replace(redis, current_user, buckets)
+                    users += 1
+                current_user, buckets = row.user_id, defaultdict(Counter)
+            fields = buckets[bucket_start(row.created_at, "hour")]
+            fields["total"] += 1
+            if row.read_at is not None:
+                fields["read"] += 1
+            if row.category:
+                fields[f"category:{row.category}"] += 1
+            if row.confidence is not None:
+                fields["confidence_sum"] += row.confidence
+                fields["confidence_count"] += 1
+        if current_user is not None:
+            await self._replace(redis, current_user, buckets)
+            users += 1
+        return users
+
+    async def _replace(self, redis: Redis, user_id, hourly: dict):
+        # Интервалы, которые уже истекли бы по TTL, не восстанавливаются
+        now = _naive_utc(datetime.now(timezone.utc))
+        per_key = defaultdict(Counter)
+        for created_at, fields in hourly.items():
+            for granularity, key, bucket in self._keys(user_id, created_at):
+                if bucket + timedelta(seconds=self.ttl[granularity]) > now:
+                    per_key[granularity, key].update(fields)
+        async with redis.pipeline(transaction=True) as pipe:
+            for (granularity, key), fields in per_key.items():
+                pipe.delete(key)
+                pipe.hset(key, mapping=dict(fields))
+                pipe.expire(key, self.ttl[granularity])
+            await pipe.execute()
+
+
+notification_digest = NotificationDigest(
+    hourly_ttl=settings.DIGEST_HOURLY_TTL,
+    daily_ttl=settings.DIGEST_DAILY_TTL,
+)
@@ -0,0 +1,31 @@
+from redis.asyncio import Redis
+from app.cache.item_cache import notification_cache
+from app.cache.list_cache import list_cache
+from app.cache.read_your_writes import read_your_writes
+
+
+async def notifications_changed(redis: Redis, user_ids=(), notification_ids=()):
+    """
+    Инвалидировать кэши после изменения уведомлений.
+
+    Отмечает запись, чтобы следующие чтения этих данных шли с основной базы,
+    а не с отстающей реплики, увеличивает поколение кэша списков для каждого
+    пользователя (от него же зависит ETag списков) и удаляет измененные
+    уведомления из кэша отдельных уведомлений на всех процессах. Все команды
+    отправляются в Redis одним pipeline.
+
+    Аргументы:
+        redis (Redis): Асинхронный клиент Redis.
+        user_ids (Iterable[UUID]): ID пользователей, чьи уведомления изменились.
+        notification_ids (Iterable[UUID]): ID измененных уведомлений.
+
+    Возвращаемое значение:
+        None
+    """
+    user_ids, notification_ids = list(user_ids), list(notification_ids)
+    async with redis.pipeline(transaction=False) as pipe:
+        read_your_writes.queue_pin(pipe, user_ids, notification_ids)
+        list_cache.queue_bump(pipe, *user_ids)
+        notification_cache.queue_invalidate(pipe, *notification_ids)
+        if len(pipe):
+            await pipe.execute()
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from redis.asyncio import Redis
+from app.config.config import settings
+from app.pydantic_schemas.schemas import NotificationRead
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRU:
+    """
+    Ограниченный по размеру LRU-кэш в памяти процесса с временем жизни записей.
+
+    Атрибуты:
+        max_size (int): Максимальное число записей.
+        ttl (float): Время жизни записи в секундах.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key):
+        """
+        Получить значение по ключу или None, если записи нет или она истекла.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """
+        Сохранить значение, вытеснив самую давно использованную запись при переполнении.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Удалить запись, если она есть.
+        """
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class NotificationCache:
+    """
+    Двухуровневый read-through кэш отдельных уведомлений.
+
+    Первый уровень — LRU в памяти процесса с коротким TTL, второй — Redis.
+    Уведомления с завершенной обработкой хранятся дольше, чем ожидающие анализа.
+    При изменении уведомления ключ в Redis удаляется, а его ID публикуется в
+    канал `CHANNEL`; каждый процесс API слушает канал и удаляет запись из своего
+    первого уровня.
+
+    Вместе с уведомлением хранится его ETag — хэш сериализованного
+    уведомления, поэтому условный запрос проверяется по той же записи кэша,
+    что отдала бы тело ответа, без отдельных ключей версий.
+
+    Атрибуты:
+        local (LocalLRU): Первый уровень кэша.
+        pending_ttl (int): Время жизни в Redis для уведомлений в статусе pending/processing.
+        final_ttl (int): Время жизни в Redis для уведомлений с завершенной обработкой.
+        stats (dict): Счетчики попаданий и промахов по уровням в текущем процессе.
+    """
+
+    KEY_PREFIX = "notification:"
+    CHANNEL = "notifications:invalidate"
+    FINAL_STATUSES = ("completed", "failed")
+
+    def __init__(
+        self, local_size: int, local_ttl: float, pending_ttl: int, final_ttl: int
+    ):
+        self.local = LocalLRU(local_size, local_ttl)
+        self.pending_ttl = pending_ttl
+        self.final_ttl = final_ttl
+        self.stats = {
+            "local_hits": 0,
+            "local_misses": 0,
+            "redis_hits": 0,
+            "redis_misses": 0,
+        }
+
+    def _ttl(self, notification: NotificationRead) -> int:
+        if notification.processing_status in self.FINAL_STATUSES:
+            return self.final_ttl
+        return self.pending_ttl
+
+    async def get(
+        self, redis: Redis, notification_id
+    ) -> Optional[Tuple[str, NotificationRead]]:
+        """
+        Найти уведомление в кэше: сначала в памяти процесса, затем в Redis.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            notification_id (UUID): ID уведомления.
+
+        Возвращаемое значение:
+            Optional[Tuple[str, NotificationRead]]: ETag и уведомление или None
+            при промахе на обоих уровнях.
+        """
+        key = str(notification_id)
+        entry = self.local.get(key)
+        if entry is not None:
+            self.stats["local_hits"] += 1
+            return entry
+        self.stats["local_misses"] += 1
+
+        cached = await redis.get(self.KEY_PREFIX + key)
+        etag, _, payload = (cached or "").partition("\n")
+        if not payload:
+            self.stats["redis_misses"] += 1
+            return None
+        self.stats["redis_hits"] += 1
+        notification = NotificationRead.model_validate_json(payload)
+        self.local.set(key, (etag, notification), self._ttl(notification))
+        return etag, notification
+
+    async def set(self, redis: Redis, notification: NotificationRead) -> str:
+        """
+        Сохранить уведомление на обоих уровнях кэша.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            notification (NotificationRead): Уведомление для сохранения.
+
+        Возвращаемое значение:
+            str: ETag уведомления.
+        """
+        key = str(notification.id)
+        ttl = self._ttl(notification)
+        payload = notification.model_dump_json()
+        etag = '"{}"'.format(
+            hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+        )
+        self.local.set(key, (etag, notification), ttl)
+        await redis.set(self.KEY_PREFIX + key, etag + "\n" + payload, ex=ttl)
+        return etag
+
+    def queue_invalidate(self, pipe, *notification_ids):
+        """
+        Удалить уведомления из кэша в памяти процесса и добавить в pipeline
+        их удаление из Redis и оповещение остальных процессов.
+
+        Аргументы:
+            pipe (Pipeline): Pipeline Redis, который выполнит вызывающий код.
+            *notification_ids (UUID): ID измененных уведомлений.
+
+        Возвращаемое значение:
+            None
+        """
+        if not notification_ids:
+            return
+        keys = [str(notification_id) for notification_id in notification_ids]
+        for key in keys:
+            self.local.delete(key)
+        pipe.delete(*(self.KEY_PREFIX + key for key in keys))
+        pipe.publish(self.CHANNEL, ",".join(keys))
+
+    async def invalidate(self, redis: Redis, *notification_ids):
+        """
+        Удалить уведомления из кэша и оповестить остальные процессы.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            *notification_ids (UUID): ID измененных уведомлений.
+
+        Возвращаемое значение:
+            None
+        """
+        if not notification_ids:
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            self.queue_invalidate(pipe, *notification_ids)
+            await pipe.execute()
+
+    async def listen(self, redis: Redis):
+        """
+        Слушать канал инвалидации и удалять записи из кэша в памяти процесса.
+
+        Работает до отмены задачи; при обрыве соединения переподключается.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+
+        Возвращаемое значение:
+            None
+        """
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        for key in message["data"].split(","):
+                            self.local.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification cache invalidation listener failed")
+                await asyncio.sleep(1)
+
+    def get_stats(self) -> dict:
+        """
+        Получить счетчики и долю попаданий по уровням кэша в текущем процессе.
+
+        Возвращаемое значение:
+            dict: Счетчики, hit ratio каждого уровня и размер кэша в памяти.
+        """
+        local_total = self.stats["local_hits"] + self.stats["local_misses"]
+        redis_total = self.stats["redis_hits"] + self.stats["redis_misses"]
+        return {
+            **self.stats,
+            "local_hit_ratio": (
+                self.stats["local_hits"] / local_total if local_total else 0.0
+            ),
+            "redis_hit_ratio": (
+                self.stats["redis_hits"] / redis_total if redis_total else 0.0
+            ),
+            "local_size": len(self.local),
+        }
+
+
+notification_cache = NotificationCache(
+    local_size=settings.ITEM_CACHE_LOCAL_SIZE,
+    local_ttl=settings.ITEM_CACHE_LOCAL_TTL,
+    pending_ttl=settings.ITEM_CACHE_PENDING_TTL,
+    final_ttl=settings.ITEM_CACHE_FINAL_TTL,
+)
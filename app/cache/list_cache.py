@@ -0,0 +1,176 @@
+import asyncio
+import time
+from typing import Optional
+from redis.asyncio import Redis
+from app.config.config import settings
+from app.monitoring import metrics
+
+
+def _count(outcome: str):
+    if metrics.CACHE:
+        metrics.LIST_CACHE_REQUESTS.labels(outcome).inc()
+
+
+def _observe(operation: str, started: float):
+    if metrics.CACHE:
+        metrics.LIST_CACHE_REDIS_SECONDS.labels(operation).observe(
+            time.perf_counter() - started
+        )
+
+
+class ListCache:
+    """
+    Кэш страниц списка уведомлений пользователя с версионированием по поколениям.
+
+    У каждого пользователя есть счетчик поколения `notifications:gen:{user_id}`,
+    который входит в ключ каждой закешированной страницы. Операции записи
+    увеличивают счетчик одним INCR, и все страницы пользователя сразу
+    становятся недоступны, независимо от параметров пагинации.
+
+    При истечении ключа страницу пересобирает только один запрос (блокировка
+    SET NX). Остальные получают копию этой же страницы того же поколения,
+    которая живет дольше основной (`stale_ttl`), либо ждут результат. После
+    инвалидации поколение меняется, поэтому устаревшие копии прежнего
+    поколения никогда не отдаются.
+
+    Атрибуты:
+        ttl (int): Время жизни страницы в секундах.
+        stale_ttl (int): Время жизни резервной копии страницы в секундах.
+        lock_timeout (int): Время жизни блокировки пересборки в секундах.
+        wait_timeout (float): Сколько секунд ждать чужую пересборку.
+        poll_interval (float): Интервал опроса Redis во время ожидания.
+    """
+
+    GEN_KEY = "notifications:gen:{user_id}"
+
+    def __init__(
+        self,
+        ttl: int,
+        stale_ttl: int,
+        lock_timeout: int,
+        wait_timeout: float,
+        poll_interval: float = 0.05,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    async def get_generation(self, redis: Redis, user_id) -> int:
+        """
+        Получить текущее поколение кэша пользователя.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            user_id (UUID): ID пользователя.
+
+        Возвращаемое значение:
+            int: Номер поколения (0, если записей еще не было).
+        """
+        return int(await redis.get(self.GEN_KEY.format(user_id=user_id)) or 0)
+
+    def queue_bump(self, pipe, *user_ids):
+        """
+        Добавить в pipeline инвалидацию всех закешированных страниц пользователей.
+
+        Аргументы:
+            pipe (Pipeline): Pipeline Redis, который выполнит вызывающий код.
+            *user_ids (UUID): ID пользователей, данные которых изменились.
+
+        Возвращаемое значение:
+            None
+        """
+        for user_id in set(user_ids):
+            pipe.incr(self.GEN_KEY.format(user_id=user_id))
+
+    async def bump(self, redis: Redis, *user_ids):
+        """
+        Инвалидировать все закешированные страницы пользователей.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            *user_ids (UUID): ID пользователей, данные которых изменились.
+
+        Возвращаемое значение:
+            None
+        """
+        if not user_ids:
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            self.queue_bump(pipe, *user_ids)
+            await pipe.execute()
+
+    async def get_or_build(
+        self,
+        redis: Redis,
+        user_id,
+        params: tuple,
+        build,
+        generation: Optional[int] = None,
+    ) -> str:
+        """
+        Получить страницу из кэша или собрать ее, защищаясь от лавины запросов.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            user_id (UUID): ID пользователя.
+            params (tuple): Параметры страницы, входящие в ключ (skip, limit, cursor и т.п.).
+            build: Асинхронная функция без аргументов, возвращающая сериализованную страницу.
+            generation (Optional[int]): Уже прочитанное поколение кэша пользователя.
+
+        Возвращаемое значение:
+            str: Сериализованная страница.
+        """
+        started = time.perf_counter()
+        if generation is None:
+            generation = await self.get_generation(redis, user_id)
+        key = f"notifications:{user_id}:v{generation}:" + ":".join(
+            "" if param is None else str(param) for param in params
+        )
+        stale_key = key + ":stale"
+        lock_key = key + ":lock"
+
+        cached, stale = await redis.mget(key, stale_key)
+        _observe("lookup", started)
+        if cached is not None:
+            _count("hit")
+            return cached
+
+        if await redis.set(lock_key, "1", nx=True, ex=self.lock_timeout):
+            try:
+                _count("miss")
+                value = await build()
+                started = time.perf_counter()
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.set(key, value, ex=self.ttl)
+                    pipe.set(stale_key, value, ex=self.stale_ttl)
+                    await pipe.execute()
+                _observe("store", started)
+                return value
+            finally:
+                await redis.delete(lock_key)
+
+        if stale is not None:
+            _count("stale")
+            return stale
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            cached = await redis.get(key)
+            if cached is not None:
+                _count("waited")
+                return cached
+            if not await redis.exists(lock_key):
+                break
+        _count("fallback")
+        return await build()
+
+
+list_cache = ListCache(
+    ttl=settings.LIST_CACHE_TTL,
+    stale_ttl=settings.LIST_CACHE_STALE_TTL,
+    lock_timeout=settings.LIST_CACHE_LOCK_TIMEOUT,
+    wait_timeout=settings.LIST_CACHE_WAIT_TIMEOUT,
+)
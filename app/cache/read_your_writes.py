@@ -0,0 +1,95 @@
+from redis.asyncio import Redis
+from app.config.config import settings
+from app.db.database import shard_router
+
+
+class ReadYourWrites:
+    """
+    Отметки о недавних записях, после которых чтение идет с основной базы.
+
+    Реплики отстают от основной базы, поэтому сразу после записи (например,
+    `mark_as_read`) чтение с реплики может вернуть прежние данные и положить
+    их в кэш. Каждая запись ставит ключи `db:pin:user:{user_id}` и
+    `db:pin:notification:{notification_id}` со временем жизни `ttl`, и пока
+    ключ существует, данные пользователя или уведомления читаются с основной
+    базы. `ttl` должен превышать задержку репликации.
+
+    Без настроенных реплик отметки не ставятся и не проверяются.
+
+    Атрибуты:
+        ttl (float): Время жизни отметки в секундах.
+        enabled (bool): Настроены ли реплики для чтения.
+    """
+
+    USER_KEY = "db:pin:user:{user_id}"
+    NOTIFICATION_KEY = "db:pin:notification:{notification_id}"
+
+    def __init__(self, ttl: float, enabled: bool):
+        self.ttl = ttl
+        self.enabled = enabled
+
+    def queue_pin(self, pipe, user_ids=(), notification_ids=()):
+        """
+        Добавить в pipeline отметки о записи данных пользователей и уведомлений.
+
+        Аргументы:
+            pipe (Pipeline): Pipeline Redis, который выполнит вызывающий код.
+            user_ids (Iterable[UUID]): ID пользователей, чьи уведомления изменились.
+            notification_ids (Iterable[UUID]): ID измененных уведомлений.
+
+        Возвращаемое значение:
+            None
+        """
+        if not self.enabled:
+            return
+        keys = [self.USER_KEY.format(user_id=user_id) for user_id in set(user_ids)]
+        keys += [
+            self.NOTIFICATION_KEY.format(notification_id=notification_id)
+            for notification_id in set(notification_ids)
+        ]
+        ttl = max(1, int(self.ttl * 1000))
+        for key in keys:
+            pipe.set(key, 1, px=ttl)
+
+    async def pin(self, redis: Redis, user_ids=(), notification_ids=()):
+        """
+        Отметить запись данных пользователей и уведомлений.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            user_ids (Iterable[UUID]): ID пользователей, чьи уведомления изменились.
+            notification_ids (Iterable[UUID]): ID измененных уведомлений.
+
+        Возвращаемое значение:
+            None
+        """
+        async with redis.pipeline(transaction=False) as pipe:
+            self.queue_pin(pipe, user_ids, notification_ids)
+            if len(pipe):
+                await pipe.execute()
+
+    async def pinned(self, redis: Redis, user_id=None, notification_id=None) -> bool:
+        """
+        Нужно ли читать данные пользователя или уведомления с основной базы.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            user_id (Optional[UUID]): ID пользователя.
+            notification_id (Optional[UUID]): ID уведомления.
+
+        Возвращаемое значение:
+            bool: True, если недавно была запись.
+        """
+        if not self.enabled:
+            return False
+        keys = []
+        if user_id is not None:
+            keys.append(self.USER_KEY.format(user_id=user_id))
+        if notification_id is not None:
+            keys.append(self.NOTIFICATION_KEY.format(notification_id=notification_id))
+        return bool(keys) and await redis.exists(*keys) > 0
+
+
+read_your_writes = ReadYourWrites(
+    ttl=settings.READ_YOUR_WRITES_TTL, enabled=shard_router.has_replicas
+)
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from redis.asyncio import Redis
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.celery.tasks import enqueue_analysis_many
+from app.config.config import settings
+from app.db.models import OutboxMessage
+from app.db.sharding import ShardRouter
+from app.monitoring import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class OutboxRelay:
+    """
+    Ретранслятор транзакционного outbox в брокер задач.
+
+    Обработчики API записывают запрос на анализ в таблицу `notification_outbox`
+    шарда пользователя в той же транзакции, что и само уведомление, и не
+    обращаются к брокеру. Ретранслятор по очереди обходит шарды, забирает
+    неотправленные сообщения пачками, публикует их одной группой через
+    `enqueue_analysis_many` (в отдельном потоке, не блокируя event loop) и
+    помечает отправленными. Если публикация не удалась, сообщения
+    остаются в outbox и будут отправлены на следующем проходе (доставка
+    «не менее одного раза»).
+
+    Для каждой пачки в хэш Redis `STATS_KEY` записывается задержка от создания
+    сообщения до его публикации.
+
+    Атрибуты:
+        batch_size (int): Максимальное число сообщений за один проход.
+        poll_interval (float): Интервал опроса outbox, когда новых сообщений нет.
+        retention (int): Сколько секунд хранить отправленные сообщения.
+    """
+
+    STATS_KEY = "outbox:stats"
+    PRUNE_INTERVAL = 300
+
+    def __init__(self, batch_size: int, poll_interval: float, retention: int):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        """
+        Разбудить ретранслятор, работающий в текущем процессе, сразу после записи в outbox.
+        """
+        self._wakeup.set()
+
+    async def drain_once(
+        self, session_maker: async_sessionmaker, redis: Redis, publish=None
+    ) -> int:
+        """
+        Опубликовать одну пачку неотправленных сообщений.
+
+        Аргументы:
+            session_maker (async_sessionmaker): Фабрика сессий базы данных.
+            redis (Redis): Асинхронный клиент Redis для статистики.
+            publish: Функция публикации списка пар (ID уведомления, текст);
+                по умолчанию `enqueue_analysis_many`.
+
+        Возвращаемое значение:
+            int: Количество опубликованных сообщений.
+        """
+        publish = publish or enqueue_analysis_many
+        async with session_maker() as session:
+            messages = (
+                await session.scalars(
+                    select(OutboxMessage)
+                    .where(OutboxMessage.sent_at.is_(None))
+                    .order_by(OutboxMessage.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not messages:
+                return 0
+
+            await asyncio.to_thread(
+                publish,
+                [(message.notification_id, message.text) for message in messages],
+            )
+            sent_at = _utcnow()
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_([message.id for message in messages]))
+                .values(sent_at=sent_at)
+            )
+            await session.commit()
+
+        lags = [(sent_at - message.created_at).total_seconds() for message in messages]
+        if metrics.BROKER:
+            for lag in lags:
+                metrics.OUTBOX_PUBLISH_LAG_SECONDS.observe(lag)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(self.STATS_KEY, "published", len(messages))
+            pipe.hincrby(self.STATS_KEY, "batches", 1)
+            pipe.hincrbyfloat(self.STATS_KEY, "lag_sum", sum(lags))
+            pipe.hset(
+                self.STATS_KEY,
+                mapping={"last_lag": max(lags), "last_published_at": time.time()},
+            )
+            await pipe.execute()
+        return len(messages)
+
+    async def prune(self, session_maker: async_sessionmaker) -> int:
+        """
+        Удалить отправленные сообщения старше `retention` секунд.
+
+        Аргументы:
+            session_maker (async_sessionmaker): Фабрика сессий базы данных.
+
+        Возвращаемое значение:
+            int: Количество удаленных сообщений.
+        """
+        threshold = _utcnow() - timedelta(seconds=self.retention)
+        async with session_maker() as session:
+            result = await session.execute(
+                delete(OutboxMessage).where(
+                    OutboxMessage.sent_at.is_not(None),
+                    OutboxMessage.sent_at < threshold,
+                )
+            )
+            await session.commit()
+        return result.rowcount
+
+    async def run(self, shards: ShardRouter, redis: Redis):
+        """
+        Публиковать сообщения outbox всех шардов до отмены задачи.
+
+        Пока на каком-либо шарде пачки заполняются целиком, следующий проход
+        начинается сразу; иначе ретранслятор ждет вызова `wake` или истечения
+        `poll_interval`.
+
+        Аргументы:
+            shards (ShardRouter): Маршрутизатор шардов.
+            redis (Redis): Асинхронный клиент Redis для статистики.
+
+        Возвращаемое значение:
+            None
+        """
+        last_prune = 0.0
+        while True:
+            self._wakeup.clear()
+            full = False
+            prune = time.monotonic() - last_prune > self.PRUNE_INTERVAL
+            for name in shards.names:
+                session_maker = shards.session_maker(name)
+                try:
+                    published = await self.drain_once(session_maker, redis)
+                    full = full or published >= self.batch_size
+                    if prune:
+                        await self.prune(session_maker)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Outbox relay failed on shard %s", name)
+            if prune:
+                last_prune = time.monotonic()
+            if full:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stats(self, shards: ShardRouter, redis: Redis) -> dict:
+        """
+        Получить размер очереди outbox всех шардов и задержку публикации.
+
+        Аргументы:
+            shards (ShardRouter): Маршрутизатор шардов.
+            redis (Redis): Асинхронный клиент Redis.
+
+        Возвращаемое значение:
+            dict: pending, oldest_pending_age, published, batches, avg_lag и last_lag
+            (задержки в секундах).
+        """
+        pending, oldest = 0, None
+        for name in shards.names:
+            async with shards.session_maker(name)() as session:
+                count, shard_oldest = (
+                    await session.execute(
+                        select(func.count(), func.min(OutboxMessage.created_at)).where(
+                            OutboxMessage.sent_at.is_(None)
+                        )
+                    )
+                ).one()
+            pending += count
+            if shard_oldest is not None and (oldest is None or shard_oldest < oldest):
+                oldest = shard_oldest
+        raw = await redis.hgetall(self.STATS_KEY)
+        published = int(raw.get("published", 0))
+        return {
+            "pending": pending,
+            "oldest_pending_age": (
+                (_utcnow() - oldest).total_seconds() if oldest else 0.0
+            ),
+            "published": published,
+            "batches": int(raw.get("batches", 0)),
+            "avg_lag": (float(raw.get("lag_sum", 0)) / published if published else 0.0),
+            "last_lag": float(raw.get("last_lag", 0)),
+        }
+
+
+outbox_relay = OutboxRelay(
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    retention=settings.OUTBOX_RETENTION,
+)
+
+
+async def _main():
+    from app.config.redis_conf import redis
+    from app.db.database import shard_router
+
+    try:
+        await outbox_relay.run(shard_router, redis)
+    finally:
+        await shard_router.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
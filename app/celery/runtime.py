@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from redis.asyncio import Redis
+from app.config.config import settings
+from app.config.redis_conf import redis
+from app.db.database import create_shard_router, shard_router
+from app.db.sharding import ShardRouter
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRuntime:
+    """
+    Долгоживущий event loop, async-движки шардов базы данных и клиент Redis для процесса воркера.
+
+    Loop работает в отдельном потоке и создается один раз при старте процесса,
+    поэтому пулы соединений используются повторно между задачами, а не
+    пересоздаются на каждый `asyncio.run()`. Число одновременно выполняемых
+    корутин ограничено `max_in_flight`: при заполнении лимита `submit` блокирует
+    вызывающий поток до освобождения слота.
+
+    Атрибуты:
+        max_in_flight (int): Максимальное число корутин, выполняемых одновременно.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._loop = None
+        self._thread = None
+        self._shards = None
+        self._redis = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Запущен ли loop рантайма.
+        """
+        return self._loop is not None and self._loop.is_running()
+
+    @property
+    def shards(self) -> ShardRouter:
+        """
+        Маршрутизатор шардов с движками, привязанными к loop рантайма.
+        """
+        return self._shards
+
+    @property
+    def redis(self) -> Redis:
+        """
+        Клиент Redis, соединения которого привязаны к loop рантайма.
+        """
+        return self._redis
+
+    def start(self):
+        """
+        Запустить event loop в фоновом потоке, создать движки шардов и клиент Redis.
+
+        Возвращаемое значение:
+            None
+        """
+        if self.running:
+            return
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._loop.call_soon(started.set)
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="async-runtime", daemon=True
+        )
+        self._thread.start()
+        started.wait()
+
+        self._shards = create_shard_router(share_default=False)
+        self._redis = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+    def submit(self, coro_fn, *args) -> Future:
+        """
+        Отправить корутину на выполнение в loop рантайма.
+
+        Блокирует вызывающий поток, пока число выполняющихся корутин не станет
+        меньше `max_in_flight`. Ошибки корутины логируются.
+
+        Аргументы:
+            coro_fn: Асинхронная функция.
+            *args: Аргументы для `coro_fn`.
+
+        Возвращаемое значение:
+            Future: Результат выполнения корутины.
+        """
+        self._slots.acquire()
+        try:
+            future = asyncio.run_coroutine_threadsafe(coro_fn(*args), self._loop)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future):
+        self._slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Async runtime task failed", exc_info=future.exception())
+
+    def stop(self, timeout: float = 30):
+        """
+        Дождаться выполняющихся корутин, закрыть движки и клиент Redis, остановить loop.
+
+        Аргументы:
+            timeout (float): Сколько секунд ждать завершения выполняющихся корутин.
+
+        Возвращаемое значение:
+            None
+        """
+        if not self.running:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+        self._shards = None
+        self._redis = None
+
+    async def _shutdown(self, timeout: float):
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        await self._shards.dispose()
+        await self._redis.aclose()
+
+
+def get_shard_router(runtime: AsyncRuntime) -> ShardRouter:
+    """
+    Получить маршрутизатор шардов для текущего режима работы воркера.
+
+    Если рантайм запущен, возвращается его маршрутизатор, иначе общий
+    `shard_router` из `app.db.database`.
+
+    Аргументы:
+        runtime (AsyncRuntime): Рантайм процесса воркера.
+
+    Возвращаемое значение:
+        ShardRouter: Маршрутизатор шардов.
+    """
+    if runtime.running:
+        return runtime.shards
+    return shard_router
+
+
+def get_redis(runtime: AsyncRuntime) -> Redis:
+    """
+    Получить клиент Redis для текущего режима работы воркера.
+
+    Если рантайм запущен, возвращается его клиент, иначе общий клиент из
+    `app.config.redis_conf`.
+
+    Аргументы:
+        runtime (AsyncRuntime): Рантайм процесса воркера.
+
+    Возвращаемое значение:
+        Redis: Асинхронный клиент Redis.
+    """
+    if runtime.running:
+        return runtime.redis
+    return redis
@@ -1,15 +1,170 @@
-from celery import Celery
+from celery import Celery, group
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy import delete, insert, or_, select, update
 from app.config.config import settings
-from app.ai.mock_ai import analyze_text
-from app.db.database import async_session_maker
-from app.db.models import Notification
+from app.config.redis_conf import sync_redis
+from app.ai.cache import analysis_cache
+from app.ai.mock_ai import analyze_text, analyze_texts
+from app.ai.resilience import CircuitOpenError
+from app.cache.counters import notification_counters
+from app.cache.digest import notification_digest
+from app.cache.invalidation import notifications_changed
+from app.monitoring import metrics
+from app.monitoring import worker as worker_metrics  # noqa: F401
+from app.realtime.events import publish_status_events
+from app.celery.runtime import AsyncRuntime, get_redis, get_shard_router
+from app.config.redis_conf import redis
+from app.db.database import shard_router
+from app.db.models import Notification, NotificationKeyword
+from typing import NamedTuple, Optional
+from datetime import datetime, timedelta, timezone
 import asyncio
+import logging
+import uuid
 
 
+logger = logging.getLogger(__name__)
+
 celery = Celery(
     __name__, broker=settings.BROKER_URL, backend=settings.CELERY_RESULT_BACKEND
 )
 
+# Список Redis, в котором копятся ID уведомлений для пакетной обработки
+PENDING_QUEUE_KEY = "analysis:pending"
+
+celery.conf.beat_schedule = {
+    "reconcile-counters": {
+        "task": "app.celery.tasks.reconcile_counters",
+        "schedule": settings.COUNTERS_RECONCILE_INTERVAL,
+    },
+    "reap-stuck-notifications": {
+        "task": "app.celery.tasks.reap_stuck_notifications",
+        "schedule": settings.STUCK_JOB_SWEEP_INTERVAL,
+    },
+}
+
+# Статусы, из которых уведомление еще должно перейти в completed или failed
+UNFINISHED_STATUSES = ("pending", "processing")
+
+runtime = AsyncRuntime(settings.WORKER_MAX_IN_FLIGHT)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@worker_process_init.connect
+def _start_runtime(**kwargs):
+    """
+    Запустить долгоживущий event loop при старте дочернего процесса воркера.
+    """
+    if settings.WORKER_ASYNC_RUNTIME:
+        runtime.start()
+
+
+@worker_process_shutdown.connect
+def _stop_runtime(**kwargs):
+    """
+    Дождаться выполняющихся задач и закрыть рантайм при остановке процесса воркера.
+    """
+    runtime.stop()
+
+
+def _run(coro_fn, *args):
+    """
+    Выполнить асинхронную обработку из синхронной задачи Celery.
+
+    Если в процессе запущен рантайм (`WORKER_ASYNC_RUNTIME`), корутина
+    отправляется в его loop, и задача завершается сразу после постановки, так
+    что один процесс держит в работе до `WORKER_MAX_IN_FLIGHT` обработок.
+    Иначе корутина выполняется через `asyncio.run()`, после чего пулы соединений
+    общих движков шардов и клиента Redis закрываются, чтобы соединения не переходили
+    в следующий loop.
+
+    Аргументы:
+        coro_fn: Асинхронная функция обработки.
+        *args: Аргументы для `coro_fn`.
+
+    Возвращаемое значение:
+        None
+    """
+    if runtime.running:
+        runtime.submit(coro_fn, *args)
+        return
+
+    async def run_once():
+        try:
+            await coro_fn(*args)
+        finally:
+            await shard_router.dispose()
+            await redis.connection_pool.disconnect()
+
+    asyncio.run(run_once())
+
+
+def enqueue_analysis(notification_id, text: str):
+    """
+    Поставить уведомление в очередь на анализ.
+
+    В обычном режиме отправляет отдельную задачу `analyze_notification`.
+    В пакетном режиме (`ANALYSIS_BATCH_MODE`) добавляет ID в список Redis и
+    планирует задачу `flush_analysis_batch`: по истечении окна накопления для
+    первого элемента пакета или сразу, когда набран полный пакет.
+
+    Аргументы:
+        notification_id (UUID | str): ID уведомления.
+        text (str): Текст уведомления (используется только в обычном режиме).
+
+    Возвращаемое значение:
+        None
+    """
+    if not settings.ANALYSIS_BATCH_MODE:
+        analyze_notification.delay(notification_id, text)
+        return
+
+    size = sync_redis.rpush(PENDING_QUEUE_KEY, str(notification_id))
+    if size % settings.ANALYSIS_BATCH_SIZE == 0:
+        flush_analysis_batch.delay()
+    elif size == 1:
+        flush_analysis_batch.apply_async(countdown=settings.ANALYSIS_BATCH_WINDOW)
+
+
+def enqueue_analysis_many(items: list):
+    """
+    Поставить в очередь на анализ сразу несколько уведомлений.
+
+    В обычном режиме все задачи публикуются одной группой Celery через одно
+    соединение с брокером. В пакетном режиме все ID добавляются в список Redis
+    одной командой RPUSH, и на каждый набранный полный пакет планируется
+    `flush_analysis_batch`.
+
+    Аргументы:
+        items (list): Пары (ID уведомления, текст).
+
+    Возвращаемое значение:
+        None
+    """
+    if not items:
+        return
+    if not settings.ANALYSIS_BATCH_MODE:
+        group(
+            analyze_notification.s(notification_id, text)
+            for notification_id, text in items
+        ).apply_async()
+        return
+
+    size = sync_redis.rpush(
+        PENDING_QUEUE_KEY, *(str(notification_id) for notification_id, _ in items)
+    )
+    previous = size - len(items)
+    full_batches = (
+        size // settings.ANALYSIS_BATCH_SIZE - previous // settings.ANALYSIS_BATCH_SIZE
+    )
+    for _ in range(full_batches):
+        flush_analysis_batch.delay()
+    if previous == 0 and not full_batches:
+        flush_analysis_batch.apply_async(countdown=settings.ANALYSIS_BATCH_WINDOW)
+
 
 @celery.task
 def analyze_notification(notification_id: str, text: str):
@@ -26,7 +181,308 @@ def analyze_notification(notification_id: str, text: str):
     Возвращаемое значение:
         None
     """
-    asyncio.run(_process(notification_id, text))
+    _run(_process, notification_id, text)
+
+
+@celery.task
+def reconcile_counters(user_id: str = None):
+    """
+    Задача Celery для сверки счетчиков уведомлений с базой данных.
+
+    Пересчитывает счетчики в Redis по таблице `notifications` для одного
+    пользователя или для всех, устраняя возможные расхождения. При сверке
+    всех пользователей удаляются счетчики пользователей без уведомлений.
+    Запускается периодически через Celery beat.
+
+    Аргументы:
+        user_id (str): ID пользователя; если не указан, пересчитываются все.
+
+    Возвращаемое значение:
+        None
+    """
+    _run(_reconcile_counters, user_id)
+
+
+@celery.task
+def rebuild_digest(user_id: str = None):
+    """
+    Задача Celery для пересчета сводок уведомлений по истории.
+
+    Заново строит часовые и суточные агрегаты в Redis по таблице
+    `notifications` для одного пользователя или для всех. Используется для
+    первоначального заполнения и после сбоев Redis, например:
+    `celery -A app.celery.tasks call app.celery.tasks.rebuild_digest`.
+
+    Аргументы:
+        user_id (str): ID пользователя; если не указан, пересчитываются все.
+
+    Возвращаемое значение:
+        None
+    """
+    _run(_rebuild_digest, user_id)
+
+
+@celery.task
+def flush_analysis_batch():
+    """
+    Задача Celery для пакетной обработки накопленных уведомлений.
+
+    Забирает из Redis до `ANALYSIS_BATCH_SIZE` ID уведомлений и обрабатывает их
+    одним пакетом. Если в очереди остались элементы, планирует следующий запуск.
+
+    Возвращаемое значение:
+        None
+    """
+    ids = sync_redis.lpop(PENDING_QUEUE_KEY, settings.ANALYSIS_BATCH_SIZE)
+    if not ids:
+        return
+
+    remaining = sync_redis.llen(PENDING_QUEUE_KEY)
+    if remaining >= settings.ANALYSIS_BATCH_SIZE:
+        flush_analysis_batch.delay()
+    elif remaining:
+        flush_analysis_batch.apply_async(countdown=settings.ANALYSIS_BATCH_WINDOW)
+
+    _run(_process_batch, ids)
+
+
+@celery.task
+def reap_stuck_notifications():
+    """
+    Задача Celery для повторной постановки зависших уведомлений на анализ.
+
+    Находит уведомления, которые дольше `STUCK_JOB_THRESHOLD` секунд остаются
+    в статусе pending/processing без новой попытки обработки (воркер упал
+    между коммитами или брокер потерял сообщение), и пачками ставит их в
+    очередь заново. После `STUCK_JOB_MAX_ATTEMPTS` попыток уведомление
+    получает статус "failed". Запускается периодически через Celery beat.
+
+    Возвращаемое значение:
+        None
+    """
+    _run(_reap_stuck)
+
+
+def _failure_status(error, attempts: int) -> str:
+    """
+    Получить статус уведомления после неудачного анализа.
+
+    Разомкнутый автомат защиты и истечение времени ожидания означают
+    временную недоступность движка анализа: уведомление остается в статусе
+    "pending" с отметкой времени попытки, и его повторно ставит в очередь
+    `reap_stuck_notifications`. Прочие ошибки и исчерпание
+    `STUCK_JOB_MAX_ATTEMPTS` попыток дают "failed".
+
+    Аргументы:
+        error (BaseException): Ошибка анализа.
+        attempts (int): Число попыток обработки, включая текущую.
+
+    Возвращаемое значение:
+        str: "pending" или "failed".
+    """
+    if (
+        isinstance(error, (CircuitOpenError, asyncio.TimeoutError))
+        and attempts < settings.STUCK_JOB_MAX_ATTEMPTS
+    ):
+        return "pending"
+    return "failed"
+
+
+async def _analyze_chunks(texts: list) -> list:
+    """
+    Проанализировать тексты пакетными вызовами движка анализа.
+
+    Тексты делятся на порции по `AI_BATCH_SIZE`, одновременно выполняется не
+    более `ANALYSIS_CONCURRENCY` вызовов. Ошибка вызова ставится на место
+    результатов только текстов своей порции.
+
+    Аргументы:
+        texts (list): Тексты для анализа.
+
+    Возвращаемое значение:
+        list: Результаты анализа (или исключение при ошибке) в порядке входных текстов.
+    """
+    semaphore = asyncio.Semaphore(settings.ANALYSIS_CONCURRENCY)
+
+    async def analyze(chunk: list) -> list:
+        async with semaphore:
+            try:
+                return await analyze_texts(chunk)
+            except Exception as exc:
+                return [exc] * len(chunk)
+
+    chunks = [
+        texts[start : start + settings.AI_BATCH_SIZE]
+        for start in range(0, len(texts), settings.AI_BATCH_SIZE)
+    ]
+    results = await asyncio.gather(*(analyze(chunk) for chunk in chunks))
+    return [result for chunk_results in results for result in chunk_results]
+
+
+async def _analyze_many(texts: list) -> list:
+    """
+    Проанализировать пакет текстов, используя кэш результатов, если он включен.
+
+    Аргументы:
+        texts (list): Тексты для анализа.
+
+    Возвращаемое значение:
+        list: Результаты анализа (или исключение при ошибке) в порядке входных текстов.
+    """
+    if settings.ANALYSIS_CACHE_ENABLED:
+        return await analysis_cache.analyze_many(
+            get_redis(runtime), texts, _analyze_chunks
+        )
+    return await _analyze_chunks(texts)
+
+
+async def _analyze(text: str) -> dict:
+    """
+    Проанализировать текст, используя кэш результатов, если он включен.
+
+    Аргументы:
+        text (str): Текст для анализа.
+
+    Возвращаемое значение:
+        dict: Результат анализа (category, confidence, keywords).
+    """
+    if settings.ANALYSIS_CACHE_ENABLED:
+        return await analysis_cache.analyze(get_redis(runtime), text, analyze_text)
+    return await analyze_text(text)
+
+
+async def _replace_keywords(session, analyzed: list):
+    """
+    Заменить ключевые слова уведомлений в инвертированном индексе.
+
+    Прежние ключевые слова уведомлений удаляются (при повторном анализе), а
+    новые, приведенные через `NotificationKeyword.normalize`, вставляются
+    одним многострочным INSERT. Коммит остается за вызывающим, поэтому
+    индекс меняется в той же транзакции, что и результат анализа.
+
+    Аргументы:
+        session (AsyncSession): Сессия базы данных.
+        analyzed (list): Тройки (ID уведомления, ID пользователя, список ключевых слов).
+
+    Возвращаемое значение:
+        None
+    """
+    if not analyzed:
+        return
+    await session.execute(
+        delete(NotificationKeyword).where(
+            NotificationKeyword.notification_id.in_(
+                [notification_id for notification_id, _, _ in analyzed]
+            )
+        )
+    )
+    rows = [
+        {"keyword": keyword, "user_id": user_id, "notification_id": notification_id}
+        for notification_id, user_id, keywords in analyzed
+        for keyword in {
+            NotificationKeyword.normalize(keyword) for keyword in keywords or ()
+        }
+        if keyword
+    ]
+    if rows:
+        await session.execute(insert(NotificationKeyword), rows)
+
+
+class StatusChange(NamedTuple):
+    """
+    Изменение статуса обработки одного уведомления.
+
+    Атрибуты:
+        notification_id (UUID): ID уведомления.
+        user_id (UUID): ID пользователя.
+        old_status (str): Статус до изменения.
+        new_status (str): Статус после изменения.
+        old_category (Optional[str]): Категория до изменения.
+        new_category (Optional[str]): Категория после изменения.
+        unread (bool): Уведомление не прочитано.
+        created_at (Optional[datetime]): Время создания уведомления (интервал сводки).
+        old_confidence (Optional[float]): Уверенность анализа до изменения.
+        new_confidence (Optional[float]): Уверенность анализа после изменения.
+    """
+
+    notification_id: uuid.UUID
+    user_id: uuid.UUID
+    old_status: str
+    new_status: str
+    old_category: Optional[str]
+    new_category: Optional[str]
+    unread: bool
+    created_at: Optional[datetime] = None
+    old_confidence: Optional[float] = None
+    new_confidence: Optional[float] = None
+
+
+async def _status_changed(redis_client, changes: list):
+    """
+    Отразить зафиксированные в базе изменения статуса во всех производных данных.
+
+    Инвалидирует кэши, обновляет счетчики и сводки пользователей и публикует
+    события для клиентов, подписанных на изменения статуса.
+
+    Аргументы:
+        redis_client (Redis): Асинхронный клиент Redis.
+        changes (list): Список `StatusChange`.
+
+    Возвращаемое значение:
+        None
+    """
+    await notifications_changed(
+        redis_client,
+        {change.user_id for change in changes},
+        [change.notification_id for change in changes],
+    )
+    await notification_counters.on_status_changed(
+        redis_client,
+        [
+            (
+                change.user_id,
+                change.old_status,
+                change.new_status,
+                change.old_category,
+                change.new_category,
+                change.unread,
+            )
+            for change in changes
+        ],
+    )
+    await notification_digest.on_classified(
+        redis_client,
+        [
+            (
+                change.user_id,
+                change.created_at,
+                change.old_category,
+                change.new_category,
+                change.old_confidence,
+                change.new_confidence,
+            )
+            for change in changes
+            if change.created_at is not None
+        ],
+    )
+    await publish_status_events(
+        redis_client,
+        [
+            {
+                "notification_id": change.notification_id,
+                "user_id": change.user_id,
+                "processing_status": change.new_status,
+                "category": change.new_category,
+            }
+            for change in changes
+        ],
+    )
+    if metrics.ANALYZER:
+        for change in changes:
+            if change.new_status in ("completed", "failed"):
+                metrics.ANALYSIS_RESULTS.labels(
+                    change.new_status, change.new_category or "none"
+                ).inc()
 
 
 async def _process(notification_id: str, text: str):
@@ -35,7 +491,8 @@ async def _process(notification_id: str, text: str):
 
     В этой функции происходит обновление статуса уведомления, выполнение анализа
     текста с использованием AI, а затем обновление дополнительных полей уведомления
-    (категория, уверенность и статус обработки).
+    (категория, уверенность и статус обработки). После каждого изменения статуса
+    обновляются кэши, счетчики и публикуется событие для подписанных клиентов.
 
     Аргументы:
         notification_id (str): ID уведомления для обновления.
@@ -44,18 +501,375 @@ async def _process(notification_id: str, text: str):
     Возвращаемое значение:
         None
     """
-    async with async_session_maker() as session:
-        notification = await session.get(Notification, notification_id)
+    async with get_shard_router(runtime).notification_session(
+        Notification, uuid.UUID(str(notification_id))
+    ) as (session, notification):
         if not notification:
             return
+        redis_client = get_redis(runtime)
+        unread = notification.read_at is None
+        old_status = notification.processing_status
+        old_category = notification.category
+        old_confidence = notification.confidence
+
         notification.processing_status = "processing"
+        notification.attempts = (notification.attempts or 0) + 1
+        notification.last_attempt_at = _utcnow()
         await session.commit()
+        await _status_changed(
+            redis_client,
+            [
+                StatusChange(
+                    notification.id,
+                    notification.user_id,
+                    old_status,
+                    "processing",
+                    old_category,
+                    old_category,
+                    unread,
+                )
+            ],
+        )
 
         try:
-            result = await analyze_text(text)
+            result = await _analyze(text)
             notification.category = result["category"]
             notification.confidence = result["confidence"]
             notification.processing_status = "completed"
-        except:
-            notification.processing_status = "failed"
+        except Exception as exc:
+            result = None
+            notification.processing_status = _failure_status(exc, notification.attempts)
+        if result is not None:
+            await _replace_keywords(
+                session,
+                [(notification.id, notification.user_id, result.get("keywords"))],
+            )
         await session.commit()
+        await _status_changed(
+            redis_client,
+            [
+                StatusChange(
+                    notification.id,
+                    notification.user_id,
+                    "processing",
+                    notification.processing_status,
+                    old_category,
+                    notification.category,
+                    unread,
+                    notification.created_at,
+                    old_confidence,
+                    notification.confidence,
+                )
+            ],
+        )
+
+
+async def _process_batch(notification_ids: list):
+    """
+    Асинхронная обработка пакета уведомлений.
+
+    Загружает все уведомления пакета одним запросом `SELECT ... WHERE id IN (...)`,
+    переводит их в статус "processing", анализирует тексты пакетными вызовами
+    движка анализа (не более `ANALYSIS_CONCURRENCY` одновременных вызовов) и
+    записывает результаты одним пакетным UPDATE. Статус каждого уведомления определяется отдельно: ошибка
+    анализа одного текста меняет статус только его (см. `_failure_status`). Кэши, счетчики и
+    события обновляются одной операцией на пакет, а не на каждое уведомление.
+
+    Уведомления пакета раскладываются по шардам, вычисленным по их ID, и
+    каждая часть обрабатывается на своем шарде; не найденные там уведомления
+    ищутся на остальных шардах. Повторы ID в пакете обрабатываются один раз,
+    а уведомления с уже завершенной обработкой пропускаются.
+
+    Аргументы:
+        notification_ids (list): ID уведомлений пакета.
+
+    Возвращаемое значение:
+        None
+    """
+    shards = get_shard_router(runtime)
+    ids = list(
+        dict.fromkeys(
+            uuid.UUID(str(notification_id)) for notification_id in notification_ids
+        )
+    )
+    for name, shard_ids in shards.group_notifications(ids).items():
+        found = await _process_shard_batch(shards.session_maker(name), shard_ids)
+        missing = set(shard_ids) - found
+        for other in shards.names:
+            if not missing:
+                break
+            if other != name:
+                missing -= await _process_shard_batch(
+                    shards.session_maker(other), list(missing)
+                )
+
+
+async def _process_shard_batch(session_maker, ids: list) -> set:
+    """
+    Обработать часть пакета уведомлений на одном шарде.
+
+    Аргументы:
+        session_maker (async_sessionmaker): Фабрика сессий шарда.
+        ids (list): ID уведомлений.
+
+    Возвращаемое значение:
+        set: ID найденных на шарде уведомлений, включая пропущенные завершенные.
+    """
+    async with session_maker() as session:
+        result = await session.execute(
+            select(
+                Notification.id,
+                Notification.user_id,
+                Notification.text,
+                Notification.read_at,
+                Notification.category,
+                Notification.confidence,
+                Notification.created_at,
+                Notification.processing_status,
+                Notification.attempts,
+            ).where(Notification.id.in_(ids))
+        )
+        found = result.all()
+        rows = [row for row in found if row.processing_status in UNFINISHED_STATUSES]
+        if not rows:
+            return {row.id for row in found}
+        redis_client = get_redis(runtime)
+
+        await session.execute(
+            update(Notification)
+            .where(Notification.id.in_([row.id for row in rows]))
+            .values(
+                processing_status="processing",
+                attempts=Notification.attempts + 1,
+                last_attempt_at=_utcnow(),
+            )
+        )
+        await session.commit()
+        await _status_changed(
+            redis_client,
+            [
+                StatusChange(
+                    row.id,
+                    row.user_id,
+                    row.processing_status,
+                    "processing",
+                    row.category,
+                    row.category,
+                    row.read_at is None,
+                )
+                for row in rows
+            ],
+        )
+
+        results = await _analyze_many([row.text for row in rows])
+        updates = [
+            (
+                {
+                    "id": row.id,
+                    "category": result["category"],
+                    "confidence": result["confidence"],
+                    "processing_status": "completed",
+                }
+                if isinstance(result, dict)
+                else {
+                    "id": row.id,
+                    "processing_status": _failure_status(
+                        result, (row.attempts or 0) + 1
+                    ),
+                }
+            )
+            for row, result in zip(rows, results)
+        ]
+        await session.execute(update(Notification), updates)
+        await _replace_keywords(
+            session,
+            [
+                (row.id, row.user_id, result.get("keywords"))
+                for row, result in zip(rows, results)
+                if isinstance(result, dict)
+            ],
+        )
+        await session.commit()
+        await _status_changed(
+            redis_client,
+            [
+                StatusChange(
+                    row.id,
+                    row.user_id,
+                    "processing",
+                    values["processing_status"],
+                    row.category,
+                    values.get("category", row.category),
+                    row.read_at is None,
+                    row.created_at,
+                    row.confidence,
+                    values.get("confidence", row.confidence),
+                )
+                for row, values in zip(rows, updates)
+            ],
+        )
+    return {row.id for row in found}
+
+
+async def _reconcile_counters(user_id: str = None):
+    """
+    Асинхронный пересчет счетчиков уведомлений из базы данных.
+
+    Аргументы:
+        user_id (str): ID пользователя; если не указан, пересчитываются все.
+
+    Возвращаемое значение:
+        None
+    """
+    shards = get_shard_router(runtime)
+    if user_id:
+        user_id = uuid.UUID(str(user_id))
+        names = [shards.shard_for_user(user_id)]
+    else:
+        names = shards.names
+    for name in names:
+        async with shards.session_maker(name)() as session:
+            await notification_counters.rebuild(get_redis(runtime), session, user_id)
+    if not user_id:
+        await notification_counters.prune(get_redis(runtime), shards)
+
+
+async def _rebuild_digest(user_id: str = None):
+    """
+    Асинхронный пересчет сводок уведомлений из базы данных.
+
+    Аргументы:
+        user_id (str): ID пользователя; если не указан, пересчитываются все.
+
+    Возвращаемое значение:
+        None
+    """
+    shards = get_shard_router(runtime)
+    if user_id:
+        user_id = uuid.UUID(str(user_id))
+        names = [shards.shard_for_user(user_id)]
+    else:
+        names = shards.names
+    for name in names:
+        async with shards.session_maker(name)() as session:
+            await notification_digest.rebuild(get_redis(runtime), session, user_id)
+
+
+async def _reap_stuck() -> dict:
+    """
+    Асинхронный поиск и повторная постановка зависших уведомлений.
+
+    Кандидаты выбираются по частичному индексу
+    `ix_notifications_unfinished_status_created`, который содержит только
+    незавершенные уведомления, поэтому стоимость поиска не зависит от числа
+    обработанных. Уведомление считается зависшим, если и создание, и последняя
+    попытка обработки старше порога. Уведомления, исчерпавшие попытки,
+    переводятся в "failed", остальные возвращаются в "pending" с отметкой
+    времени попытки и ставятся в очередь одной группой на пачку. Шарды
+    обходятся по очереди.
+
+    Возвращаемое значение:
+        dict: Количество повторно поставленных (requeued) и завершенных с ошибкой (failed).
+    """
+    totals = {"requeued": 0, "failed": 0}
+    shards = get_shard_router(runtime)
+    cutoff = _utcnow() - timedelta(seconds=settings.STUCK_JOB_THRESHOLD)
+    for name in shards.names:
+        await _reap_shard(shards.session_maker(name), cutoff, totals)
+
+    if totals["failed"] or totals["requeued"]:
+        logger.warning(
+            "Stuck notifications: %(requeued)d requeued, %(failed)d failed", totals
+        )
+    return totals
+
+
+async def _reap_shard(session_maker, cutoff: datetime, totals: dict):
+    """
+    Повторно поставить зависшие уведомления одного шарда.
+
+    Аргументы:
+        session_maker (async_sessionmaker): Фабрика сессий шарда.
+        cutoff (datetime): Порог времени создания и последней попытки.
+        totals (dict): Счетчики requeued и failed, увеличиваемые на месте.
+
+    Возвращаемое значение:
+        None
+    """
+    redis_client = get_redis(runtime)
+    while True:
+        async with session_maker() as session:
+            rows = (
+                await session.execute(
+                    select(
+                        Notification.id,
+                        Notification.user_id,
+                        Notification.text,
+                        Notification.read_at,
+                        Notification.category,
+                        Notification.processing_status,
+                        Notification.attempts,
+                    )
+                    .where(
+                        Notification.processing_status.in_(UNFINISHED_STATUSES),
+                        Notification.created_at < cutoff,
+                        or_(
+                            Notification.last_attempt_at.is_(None),
+                            Notification.last_attempt_at < cutoff,
+                        ),
+                    )
+                    .order_by(Notification.created_at)
+                    .limit(settings.STUCK_JOB_BATCH_SIZE)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not rows:
+                break
+
+            now = _utcnow()
+            exhausted = [
+                row for row in rows if row.attempts >= settings.STUCK_JOB_MAX_ATTEMPTS
+            ]
+            retry = [
+                row for row in rows if row.attempts < settings.STUCK_JOB_MAX_ATTEMPTS
+            ]
+            await session.execute(
+                update(Notification),
+                [{"id": row.id, "processing_status": "failed"} for row in exhausted]
+                + [
+                    {
+                        "id": row.id,
+                        "processing_status": "pending",
+                        "last_attempt_at": now,
+                    }
+                    for row in retry
+                ],
+            )
+            await session.commit()
+
+        await _status_changed(
+            redis_client,
+            [
+                StatusChange(
+                    row.id,
+                    row.user_id,
+                    row.processing_status,
+                    new_status,
+                    row.category,
+                    row.category,
+                    row.read_at is None,
+                )
+                for new_status, group_rows in (
+                    ("failed", exhausted),
+                    ("pending", retry),
+                )
+                for row in group_rows
+            ],
+        )
+        await asyncio.to_thread(
+            enqueue_analysis_many, [(str(row.id), row.text) for row in retry]
+        )
+        totals["failed"] += len(exhausted)
+        totals["requeued"] += len(retry)
+        if len(rows) < settings.STUCK_JOB_BATCH_SIZE:
+            break
@@ -1,10 +1,52 @@
 import os
+import re
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
 
+def _get_bool(name: str, default: bool = False) -> bool:
+    """
+    Прочитать булеву переменную окружения ("1", "true", "yes" считаются истиной).
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes")
+
+
+# Параметры пула соединений: суффикс переменной окружения и преобразование значения
+POOL_VARIABLES = {
+    "POOL_SIZE": int,
+    "MAX_OVERFLOW": int,
+    "POOL_TIMEOUT": float,
+    "POOL_RECYCLE": int,
+    "POOL_PRE_PING": lambda value: value.strip().lower() in ("1", "true", "yes"),
+}
+
+
+def _pool_overrides() -> dict:
+    """
+    Прочитать переопределения параметров пула из переменных `DB_<ОБЛАСТЬ>_<ПАРАМЕТР>`.
+
+    Областью служит `REPLICA` (все реплики) или имя движка в верхнем регистре
+    с "_" вместо не буквенно-цифровых символов (например, `DEFAULT_REPLICA1`).
+    Пустые значения не учитываются.
+
+    Возвращаемое значение:
+        dict: Значения параметров по областям: {область: {параметр: значение}}.
+    """
+    pattern = re.compile(r"DB_(\w+)_(" + "|".join(POOL_VARIABLES) + ")")
+    overrides = {}
+    for name, value in os.environ.items():
+        match = pattern.fullmatch(name)
+        if match and value:
+            scope, variable = match.groups()
+            overrides.setdefault(scope, {})[variable] = POOL_VARIABLES[variable](value)
+    return overrides
+
+
 class Settings:
     """
     Класс настроек для приложения.
@@ -17,6 +59,70 @@ class Settings:
         REDIS_BACKEND (str): URL для бэкенда Redis.
         BROKER_URL (str): URL брокера сообщений (по умолчанию REDIS_URL).
         CELERY_RESULT_BACKEND (str): URL для бэкенда результатов Celery (по умолчанию REDIS_BACKEND).
+        ANALYSIS_BATCH_MODE (bool): Включить пакетную обработку уведомлений в воркере.
+        ANALYSIS_BATCH_SIZE (int): Максимальный размер пакета уведомлений.
+        ANALYSIS_BATCH_WINDOW (float): Окно накопления пакета в секундах.
+        ANALYSIS_CONCURRENCY (int): Максимальное число одновременных вызовов анализа внутри пакета.
+        WORKER_ASYNC_RUNTIME (bool): Держать один event loop и async-движок на процесс воркера.
+        WORKER_MAX_IN_FLIGHT (int): Максимальное число обработок, одновременно выполняемых рантаймом воркера.
+        ANALYSIS_CACHE_ENABLED (bool): Кэшировать результаты анализа по содержимому текста.
+        ANALYSIS_CACHE_TTL (int): Время жизни результата анализа в кэше в секундах.
+        ANALYSIS_CACHE_MAX_ENTRIES (int): Максимальное число результатов в кэше.
+        ANALYSIS_CACHE_LOCK_TIMEOUT (int): Время жизни блокировки вычисления в секундах.
+        ANALYSIS_CACHE_WAIT_TIMEOUT (float): Сколько секунд ждать результат анализа, выполняемого другим процессом.
+        LIST_CACHE_TTL (int): Время жизни страницы списка уведомлений в кэше в секундах.
+        LIST_CACHE_STALE_TTL (int): Время жизни резервной копии страницы для защиты от лавины запросов.
+        LIST_CACHE_LOCK_TIMEOUT (int): Время жизни блокировки пересборки страницы в секундах.
+        LIST_CACHE_WAIT_TIMEOUT (float): Сколько секунд ждать пересборку страницы другим запросом.
+        ITEM_CACHE_LOCAL_SIZE (int): Максимальное число уведомлений в кэше в памяти процесса.
+        ITEM_CACHE_LOCAL_TTL (float): Время жизни уведомления в кэше в памяти процесса в секундах.
+        ITEM_CACHE_PENDING_TTL (int): Время жизни в Redis уведомления, ожидающего анализа.
+        ITEM_CACHE_FINAL_TTL (int): Время жизни в Redis уведомления с завершенной обработкой.
+        BULK_INSERT_CHUNK_SIZE (int): Размер порции при пакетной загрузке уведомлений.
+        COUNTERS_RECONCILE_INTERVAL (float): Период сверки счетчиков уведомлений с базой данных в секундах.
+        EXPORT_YIELD_PER (int): Размер порции строк при потоковой выгрузке уведомлений.
+        EVENTS_STREAM_MAXLEN (int): Максимальная длина потока событий пользователя в Redis.
+        EVENTS_STREAM_TTL (int): Время жизни потока событий пользователя в секундах.
+        EVENTS_QUEUE_SIZE (int): Размер очереди событий одного подключенного клиента.
+        EVENTS_HEARTBEAT_INTERVAL (float): Интервал служебных сообщений в потоке SSE в секундах.
+        AI_BACKEND (str): Движок анализа текста: имя встроенного ("keyword") или путь "module:factory".
+        AI_RULES_FILE (str): Путь к JSON-файлу с ключевыми словами категорий.
+        AI_LATENCY_MIN (float): Минимальная имитируемая задержка модели на пакет в секундах.
+        AI_LATENCY_MAX (float): Максимальная имитируемая задержка модели на пакет в секундах.
+        AI_BATCH_SIZE (int): Максимальное число текстов в одном вызове движка анализа.
+        AI_RESILIENCE_ENABLED (bool): Оборачивать движок анализа дедлайнами, повторами и автоматом защиты.
+        AI_TIMEOUT (float): Дедлайн одного вызова движка анализа в секундах.
+        AI_RETRIES (int): Максимальное число повторов неудачного вызова движка анализа.
+        AI_RETRY_BACKOFF (float): Базовая задержка перед повтором в секундах (удваивается с каждой попыткой).
+        AI_RETRY_BACKOFF_MAX (float): Максимальная задержка перед повтором в секундах.
+        AI_HEDGE_PERCENTILE (float): Перцентиль длительности вызова, после которого запускается дублирующий вызов (0 — не дублировать).
+        AI_HEDGE_WINDOW (int): Число последних замеров длительности для оценки перцентиля.
+        AI_HEDGE_MIN_SAMPLES (int): Минимальное число замеров, после которого включается дублирование.
+        AI_BREAKER_THRESHOLD (int): Число ошибок подряд, после которого вызовы движка прекращаются.
+        AI_BREAKER_RESET_TIMEOUT (float): Через сколько секунд после размыкания автомата выполнить пробный вызов.
+        OUTBOX_RELAY_ENABLED (bool): Запускать ретранслятор outbox внутри процесса API.
+        OUTBOX_BATCH_SIZE (int): Максимальное число сообщений outbox, публикуемых за один проход.
+        OUTBOX_POLL_INTERVAL (float): Интервал опроса outbox в секундах, когда новых записей нет.
+        OUTBOX_RETENTION (int): Сколько секунд хранить отправленные сообщения outbox.
+        STUCK_JOB_THRESHOLD (int): Через сколько секунд без продвижения уведомление в статусе pending/processing считается зависшим.
+        STUCK_JOB_MAX_ATTEMPTS (int): Число попыток обработки, после которого зависшее уведомление получает статус failed.
+        STUCK_JOB_BATCH_SIZE (int): Размер пачки зависших уведомлений, обрабатываемой за один запрос.
+        STUCK_JOB_SWEEP_INTERVAL (float): Период поиска зависших уведомлений в секундах.
+        DIGEST_HOURLY_TTL (int): Время хранения часовых агрегатов уведомлений в секундах.
+        DIGEST_DAILY_TTL (int): Время хранения суточных агрегатов уведомлений в секундах.
+        DIGEST_MAX_BUCKETS (int): Максимальное число интервалов в одном запросе сводки.
+        DATABASE_REPLICAS (str): Реплики для чтения: "shard=url,shard=url" (несколько реплик шарда — повтором имени).
+        DATABASE_REPLICA_STRATEGY (str): Выбор реплики: "round_robin" или "least_connections".
+        READ_YOUR_WRITES_TTL (float): Сколько секунд после записи читать данные пользователя и уведомления с основной базы, а не с реплики.
+        DB_POOL_SIZE (int): Размер пула соединений движка.
+        DB_MAX_OVERFLOW (int): Сколько соединений можно открыть сверх размера пула.
+        DB_POOL_TIMEOUT (float): Сколько секунд ждать свободное соединение пула.
+        DB_POOL_RECYCLE (int): Через сколько секунд пересоздавать соединение пула.
+        DB_POOL_PRE_PING (bool): Проверять соединение перед выдачей из пула.
+        DB_POOL_OVERRIDES (dict): Параметры пула для реплик (`DB_REPLICA_*`) и отдельных движков (`DB_<ИМЯ>_*`).
+        METRICS_ENABLED (bool): Собирать метрики Prometheus.
+        METRICS_COMPONENTS (set): Инструментируемые компоненты: http, db, cache, broker, tasks, analyzer, backlog.
+        METRICS_WORKER_PORT (int): Порт HTTP-сервера метрик воркера Celery (0 — не запускать).
     """
 
     REDIS_URL = os.getenv("REDIS_URL")
@@ -24,5 +130,96 @@ class Settings:
     BROKER_URL = REDIS_URL
     CELERY_RESULT_BACKEND = REDIS_BACKEND
 
+    ANALYSIS_BATCH_MODE = _get_bool("ANALYSIS_BATCH_MODE")
+    ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "50"))
+    ANALYSIS_BATCH_WINDOW = float(os.getenv("ANALYSIS_BATCH_WINDOW", "0.5"))
+    ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "20"))
+
+    WORKER_ASYNC_RUNTIME = _get_bool("WORKER_ASYNC_RUNTIME")
+    WORKER_MAX_IN_FLIGHT = int(os.getenv("WORKER_MAX_IN_FLIGHT", "50"))
+
+    ANALYSIS_CACHE_ENABLED = _get_bool("ANALYSIS_CACHE_ENABLED", True)
+    ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", "86400"))
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "100000"))
+    ANALYSIS_CACHE_LOCK_TIMEOUT = int(os.getenv("ANALYSIS_CACHE_LOCK_TIMEOUT", "30"))
+    ANALYSIS_CACHE_WAIT_TIMEOUT = float(os.getenv("ANALYSIS_CACHE_WAIT_TIMEOUT", "10"))
+
+    LIST_CACHE_TTL = int(os.getenv("LIST_CACHE_TTL", "60"))
+    LIST_CACHE_STALE_TTL = int(os.getenv("LIST_CACHE_STALE_TTL", "300"))
+    LIST_CACHE_LOCK_TIMEOUT = int(os.getenv("LIST_CACHE_LOCK_TIMEOUT", "5"))
+    LIST_CACHE_WAIT_TIMEOUT = float(os.getenv("LIST_CACHE_WAIT_TIMEOUT", "2"))
+
+    ITEM_CACHE_LOCAL_SIZE = int(os.getenv("ITEM_CACHE_LOCAL_SIZE", "10000"))
+    ITEM_CACHE_LOCAL_TTL = float(os.getenv("ITEM_CACHE_LOCAL_TTL", "5"))
+    ITEM_CACHE_PENDING_TTL = int(os.getenv("ITEM_CACHE_PENDING_TTL", "5"))
+    ITEM_CACHE_FINAL_TTL = int(os.getenv("ITEM_CACHE_FINAL_TTL", "600"))
+
+    BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "1000"))
+
+    COUNTERS_RECONCILE_INTERVAL = float(
+        os.getenv("COUNTERS_RECONCILE_INTERVAL", "3600")
+    )
+
+    EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "500"))
+
+    EVENTS_STREAM_MAXLEN = int(os.getenv("EVENTS_STREAM_MAXLEN", "1000"))
+    EVENTS_STREAM_TTL = int(os.getenv("EVENTS_STREAM_TTL", "86400"))
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+    EVENTS_HEARTBEAT_INTERVAL = float(os.getenv("EVENTS_HEARTBEAT_INTERVAL", "15"))
+
+    AI_BACKEND = os.getenv("AI_BACKEND", "keyword")
+    AI_RULES_FILE = os.getenv(
+        "AI_RULES_FILE",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "ai", "rules.json"),
+    )
+    AI_LATENCY_MIN = float(os.getenv("AI_LATENCY_MIN", "1"))
+    AI_LATENCY_MAX = float(os.getenv("AI_LATENCY_MAX", "3"))
+    AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "32"))
+    AI_RESILIENCE_ENABLED = _get_bool("AI_RESILIENCE_ENABLED", True)
+    AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "10"))
+    AI_RETRIES = int(os.getenv("AI_RETRIES", "2"))
+    AI_RETRY_BACKOFF = float(os.getenv("AI_RETRY_BACKOFF", "0.5"))
+    AI_RETRY_BACKOFF_MAX = float(os.getenv("AI_RETRY_BACKOFF_MAX", "5"))
+    AI_HEDGE_PERCENTILE = float(os.getenv("AI_HEDGE_PERCENTILE", "0"))
+    AI_HEDGE_WINDOW = int(os.getenv("AI_HEDGE_WINDOW", "200"))
+    AI_HEDGE_MIN_SAMPLES = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+    AI_BREAKER_THRESHOLD = int(os.getenv("AI_BREAKER_THRESHOLD", "5"))
+    AI_BREAKER_RESET_TIMEOUT = float(os.getenv("AI_BREAKER_RESET_TIMEOUT", "30"))
+
+    OUTBOX_RELAY_ENABLED = _get_bool("OUTBOX_RELAY_ENABLED", True)
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+    OUTBOX_RETENTION = int(os.getenv("OUTBOX_RETENTION", "86400"))
+
+    STUCK_JOB_THRESHOLD = int(os.getenv("STUCK_JOB_THRESHOLD", "600"))
+    STUCK_JOB_MAX_ATTEMPTS = int(os.getenv("STUCK_JOB_MAX_ATTEMPTS", "3"))
+    STUCK_JOB_BATCH_SIZE = int(os.getenv("STUCK_JOB_BATCH_SIZE", "500"))
+    STUCK_JOB_SWEEP_INTERVAL = float(os.getenv("STUCK_JOB_SWEEP_INTERVAL", "60"))
+
+    DIGEST_HOURLY_TTL = int(os.getenv("DIGEST_HOURLY_TTL", str(14 * 86400)))
+    DIGEST_DAILY_TTL = int(os.getenv("DIGEST_DAILY_TTL", str(400 * 86400)))
+    DIGEST_MAX_BUCKETS = int(os.getenv("DIGEST_MAX_BUCKETS", "1000"))
+
+    DATABASE_REPLICAS = os.getenv("DATABASE_REPLICAS")
+    DATABASE_REPLICA_STRATEGY = os.getenv("DATABASE_REPLICA_STRATEGY", "round_robin")
+    READ_YOUR_WRITES_TTL = float(os.getenv("READ_YOUR_WRITES_TTL", "5"))
+
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or "5")
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW") or "10")
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT") or "30")
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE") or "1800")
+    DB_POOL_PRE_PING = _get_bool("DB_POOL_PRE_PING", True)
+    DB_POOL_OVERRIDES = _pool_overrides()
+
+    METRICS_ENABLED = _get_bool("METRICS_ENABLED", True)
+    METRICS_COMPONENTS = {
+        component.strip()
+        for component in os.getenv(
+            "METRICS_COMPONENTS", "http,db,cache,broker,tasks,analyzer,backlog"
+        ).split(",")
+        if component.strip()
+    }
+    METRICS_WORKER_PORT = int(os.getenv("METRICS_WORKER_PORT", "9808"))
+
 
 settings = Settings()
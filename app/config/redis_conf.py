@@ -1,9 +1,13 @@
+from redis import Redis as SyncRedis
 from redis.asyncio import Redis
 from app.config.config import settings
 
 
 redis = Redis.from_url(settings.REDIS_URL, decode_responses=True)
 
+# Синхронный клиент для кода, который выполняется вне event loop (Celery-задачи)
+sync_redis = SyncRedis.from_url(settings.REDIS_URL, decode_responses=True)
+
 
 async def get_redis() -> Redis:
     """
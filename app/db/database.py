@@ -1,20 +1,116 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
 import os
+import re
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import declarative_base
 from dotenv import load_dotenv
+from app.config.config import settings
+from app.db.pool import create_engine
+from app.db.sharding import ShardRouter, parse_replica_urls, parse_shard_urls
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_async_engine(DATABASE_URL)
+# Шарды таблицы уведомлений: "name=url,name=url"; по умолчанию один шард DATABASE_URL
+SHARD_URLS = parse_shard_urls(os.getenv("DATABASE_SHARDS"), DATABASE_URL)
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", "64"))
+REPLICA_URLS = parse_replica_urls(settings.DATABASE_REPLICAS)
+
+# Параметры create_async_engine по суффиксам переменных пула
+POOL_OPTIONS = {
+    "POOL_SIZE": "pool_size",
+    "MAX_OVERFLOW": "max_overflow",
+    "POOL_TIMEOUT": "pool_timeout",
+    "POOL_RECYCLE": "pool_recycle",
+    "POOL_PRE_PING": "pool_pre_ping",
+}
+
+
+def pool_options(name: str, role: str = "primary") -> dict:
+    """
+    Получить параметры пула соединений движка из настроек.
+
+    Значение берется сначала из параметров движка `DB_<ИМЯ>_<ПАРАМЕТР>` (имя
+    шарда или реплики вида "shard/replica1" в верхнем регистре, не буквенно-
+    цифровые символы заменены на "_"), для реплик затем из `DB_REPLICA_<ПАРАМЕТР>`,
+    и наконец из общего `DB_<ПАРАМЕТР>`.
+
+    Аргументы:
+        name (str): Имя движка.
+        role (str): "primary" или "replica".
+
+    Возвращаемое значение:
+        dict: Параметры `create_async_engine`.
+    """
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    scopes = ["REPLICA"] if role == "replica" else []
+    scopes.append(re.sub(r"\W", "_", name).upper())
+    for scope in scopes:
+        for variable, value in settings.DB_POOL_OVERRIDES.get(scope, {}).items():
+            options[POOL_OPTIONS[variable]] = value
+    return options
+
+
+_DEFAULT_SHARD = next(
+    (name for name, url in SHARD_URLS.items() if url == DATABASE_URL), "default"
+)
+
+engine = create_engine(DATABASE_URL, pool_options(_DEFAULT_SHARD), _DEFAULT_SHARD)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 Base = declarative_base()
 
 
-async def get_session():
+def create_shard_router(share_default: bool = True) -> ShardRouter:
+    """
+    Создать маршрутизатор шардов и реплик по настройкам `DATABASE_SHARDS` и
+    `DATABASE_REPLICAS`.
+
+    Аргументы:
+        share_default (bool): Использовать общий движок `engine` для шарда
+            с адресом `DATABASE_URL`; воркер создает собственные движки.
+
+    Возвращаемое значение:
+        ShardRouter: Маршрутизатор.
+    """
+
+    def maker(name: str, url: str, role: str = "primary") -> async_sessionmaker:
+        return async_sessionmaker(
+            create_engine(url, pool_options(name, role), name), expire_on_commit=False
+        )
+
+    return ShardRouter(
+        {
+            name: (
+                async_session_maker
+                if share_default and url == DATABASE_URL
+                else maker(name, url)
+            )
+            for name, url in SHARD_URLS.items()
+        },
+        SHARD_VNODES,
+        replica_makers={
+            name: [
+                maker(f"{name}/replica{index}", url, "replica")
+                for index, url in enumerate(urls, 1)
+            ]
+            for name, urls in REPLICA_URLS.items()
+            if name in SHARD_URLS
+        },
+        strategy=settings.DATABASE_REPLICA_STRATEGY,
+    )
+
+
+shard_router = create_shard_router()
+
+
+def get_shard_router() -> ShardRouter:
     """
-    Зависимость FastAPI: возвращает асинхронную сессию базы данных.
+    Зависимость FastAPI: возвращает маршрутизатор шардов таблицы уведомлений.
     """
-    async with async_session_maker() as session:
-        yield session
+    return shard_router
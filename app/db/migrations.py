@@ -0,0 +1,88 @@
+import asyncio
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from app.db.models import Base
+from app.db.sharding import ShardRouter
+
+
+# Индексы, замененные индексами с другим определением: имя таблицы и индекса
+DROPPED_INDEXES = (
+    ("notifications", "ix_notifications_user_created_id"),
+    ("notifications", "ix_notifications_user_category_created_id"),
+    ("notifications", "ix_notifications_user_status_created_id"),
+    ("notifications", "ix_notifications_user_unread_created_id"),
+)
+
+
+def upgrade_schema(connection):
+    """
+    Привести схему существующей базы к моделям.
+
+    `create_all` создает только отсутствующие таблицы и не меняет уже
+    существующие. Здесь в существующие таблицы добавляются новые столбцы
+    (`ALTER TABLE ... ADD COLUMN`) и недостающие индексы (`CREATE INDEX`), а
+    индексы из `DROPPED_INDEXES` удаляются.
+    Операция идемпотентна и выполняется после `create_all`.
+
+    Аргументы:
+        connection (Connection): Синхронное соединение SQLAlchemy.
+
+    Возвращаемое значение:
+        None
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(
+                    f"Cannot add NOT NULL column {table.name}.{column.name} "
+                    "without a server default"
+                )
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(
+                text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+            )
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    for table_name, index_name in DROPPED_INDEXES:
+        if not inspector.has_table(table_name):
+            continue
+        if index_name in {index["name"] for index in inspector.get_indexes(table_name)}:
+            connection.execute(text(f"DROP INDEX {preparer.quote(index_name)}"))
+
+
+async def upgrade_shards(shards: ShardRouter):
+    """
+    Создать недостающие таблицы и обновить схему на всех шардах.
+
+    Вызывается при запуске приложения; вручную — `python -m app.db.migrations`.
+
+    Аргументы:
+        shards (ShardRouter): Маршрутизатор шардов.
+
+    Возвращаемое значение:
+        None
+    """
+    for shard_engine in shards.engines:
+        async with shard_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade_schema)
+
+
+async def _main():
+    from app.db.database import shard_router
+
+    try:
+        await upgrade_shards(shard_router)
+    finally:
+        await shard_router.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
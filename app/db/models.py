@@ -1,21 +1,142 @@
-import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, DateTime, Float
+from sqlalchemy import BigInteger, Column, String, DateTime, Float, Index, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from app.db.database import Base
+from app.db.sharding import new_notification_id
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _notification_id(context):
+    # ID несет позицию пользователя на кольце шардов (см. new_notification_id)
+    return new_notification_id(context.get_current_parameters()["user_id"])
 
 
 class Notification(Base):
     __tablename__ = "notifications"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=_notification_id)
     user_id = Column(UUID(as_uuid=True), nullable=False)
     title = Column(String, nullable=False)
     text = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=_utcnow)
     read_at = Column(DateTime, nullable=True)
 
     # Результаты AI-анализа
     category = Column(String, nullable=True)
     confidence = Column(Float, nullable=True)
     processing_status = Column(String, default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_attempt_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Курсорная пагинация списка уведомлений пользователя (новые первыми)
+        Index(
+            "ix_notifications_user_created_id_desc",
+            user_id,
+            created_at.desc(),
+            id.desc(),
+        ),
+        # Фильтры списка по категории и статусу обработки с той же сортировкой
+        Index(
+            "ix_notifications_user_category_created_id_desc",
+            user_id,
+            category,
+            created_at.desc(),
+            id.desc(),
+        ),
+        Index(
+            "ix_notifications_user_status_created_id_desc",
+            user_id,
+            processing_status,
+            created_at.desc(),
+            id.desc(),
+        ),
+        # Фильтр непрочитанных: индекс содержит только непрочитанные
+        Index(
+            "ix_notifications_user_unread_created_id_desc",
+            user_id,
+            created_at.desc(),
+            id.desc(),
+            postgresql_where=read_at.is_(None),
+            sqlite_where=read_at.is_(None),
+        ),
+        # Поиск зависших уведомлений: индекс содержит только незавершенные
+        Index(
+            "ix_notifications_unfinished_status_created",
+            processing_status,
+            created_at,
+            postgresql_where=processing_status.in_(("pending", "processing")),
+            sqlite_where=processing_status.in_(("pending", "processing")),
+        ),
+    )
+
+
+class NotificationKeyword(Base):
+    """
+    Инвертированный индекс ключевых слов AI-анализа.
+
+    Одна строка на пару (ключевое слово, уведомление); первичный ключ
+    `(keyword, user_id, notification_id)` позволяет найти уведомления
+    пользователя по ключевому слову, не просматривая его историю.
+    """
+
+    __tablename__ = "notification_keywords"
+
+    MAX_LENGTH = 64
+    PUNCTUATION = ".,:;!?\"'()[]{}<>«»"
+
+    keyword = Column(String(MAX_LENGTH), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    notification_id = Column(UUID(as_uuid=True), primary_key=True)
+
+    __table_args__ = (
+        # Удаление ключевых слов уведомления при повторном анализе
+        Index("ix_notification_keywords_notification_id", notification_id),
+    )
+
+    @classmethod
+    def normalize(cls, keyword: str) -> str:
+        """
+        Привести ключевое слово к виду, в котором оно хранится в индексе.
+
+        Аргументы:
+            keyword (str): Ключевое слово.
+
+        Возвращаемое значение:
+            str: Слово в нижнем регистре без окружающей пунктуации (может быть пустым).
+        """
+        return keyword.strip().strip(cls.PUNCTUATION).lower()[: cls.MAX_LENGTH]
+
+
+class OutboxMessage(Base):
+    """
+    Сообщение транзакционного outbox: запрос на анализ уведомления.
+
+    Записывается в той же транзакции, что и уведомление, и публикуется в
+    брокер фоновым ретранслятором, который затем заполняет `sent_at`.
+    """
+
+    __tablename__ = "notification_outbox"
+
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    notification_id = Column(UUID(as_uuid=True), nullable=False)
+    text = Column(String, nullable=False)
+    created_at = Column(DateTime, default=_utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Выборка неотправленных сообщений ретранслятором
+        Index(
+            "ix_notification_outbox_unsent",
+            id,
+            postgresql_where=sent_at.is_(None),
+            sqlite_where=sent_at.is_(None),
+        ),
+    )
@@ -0,0 +1,149 @@
+import time
+from collections import deque
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.monitoring.metrics import instrument_engine
+
+
+class PoolStats:
+    """
+    Статистика выдачи соединений пула: время ожидания и занятость.
+
+    Атрибуты:
+        checkouts (int): Число выданных соединений.
+        timeouts (int): Число запросов, не дождавшихся соединения за `pool_timeout`.
+        wait_sum (float): Суммарное время ожидания соединения в секундах.
+        wait_max (float): Максимальное время ожидания соединения в секундах.
+        peak_checked_out (int): Максимальное число одновременно выданных соединений.
+        on_wait: Необязательный обработчик времени ожидания каждой выдачи.
+        on_timeout: Необязательный обработчик истечения ожидания соединения.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.peak_checked_out = 0
+        self.on_wait = None
+        self.on_timeout = None
+        self._waits = deque(maxlen=window)
+
+    def observe(self, wait: float, checked_out: int):
+        """
+        Учесть выдачу соединения.
+
+        Аргументы:
+            wait (float): Время ожидания соединения в секундах.
+            checked_out (int): Число выданных соединений после выдачи.
+        """
+        self.checkouts += 1
+        self.wait_sum += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+        self._waits.append(wait)
+        if self.on_wait is not None:
+            self.on_wait(wait)
+
+    def record_timeout(self):
+        """
+        Учесть запрос, не дождавшийся соединения.
+        """
+        self.timeouts += 1
+        if self.on_timeout is not None:
+            self.on_timeout()
+
+    def snapshot(self, pool) -> dict:
+        """
+        Получить статистику вместе с текущим состоянием пула.
+
+        Аргументы:
+            pool (MonitoredPool): Пул соединений.
+
+        Возвращаемое значение:
+            dict: size, max_overflow, checked_out, utilization, peak_checked_out,
+            checkouts, timeouts, wait_avg, wait_p95 и wait_max (время в секундах).
+        """
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        waits = sorted(self._waits)
+        return {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": checked_out,
+            "utilization": checked_out / capacity if capacity else 0.0,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg": self.wait_sum / self.checkouts if self.checkouts else 0.0,
+            "wait_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "wait_max": self.wait_max,
+        }
+
+
+class MonitoredPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который замеряет время ожидания каждой выдачи соединения.
+
+    Время включает ожидание свободного соединения и установку нового, если
+    пул еще не заполнен. Статистика переносится в пул, пересоздаваемый при
+    `engine.dispose()`.
+    """
+
+    stats = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.stats is not None:
+                self.stats.record_timeout()
+            raise
+        if self.stats is not None:
+            self.stats.observe(time.perf_counter() - started, self.checkedout())
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def create_engine(url: str, options: dict, name: str = None) -> AsyncEngine:
+    """
+    Создать async-движок с настроенным пулом соединений и статистикой пула.
+
+    Для SQLite в памяти SQLAlchemy использует один общий коннект, поэтому
+    такой движок создается без настроек пула.
+
+    Аргументы:
+        url (str): URL базы данных.
+        options (dict): pool_size, max_overflow, pool_timeout, pool_recycle и pool_pre_ping.
+        name (Optional[str]): Имя движка; если указано, к движку подключаются метрики Prometheus.
+
+    Возвращаемое значение:
+        AsyncEngine: Движок.
+    """
+    if url.startswith("sqlite") and ":memory:" in url:
+        return create_async_engine(url)
+    engine = create_async_engine(url, poolclass=MonitoredPool, **options)
+    engine.pool.stats = PoolStats()
+    if name is not None:
+        instrument_engine(
+            name,
+            engine,
+            options.get("pool_size", 5) + max(options.get("max_overflow", 10), 0),
+        )
+    return engine
+
+
+def pool_stats(engine: AsyncEngine):
+    """
+    Получить статистику пула движка или None, если пул не отслеживается.
+    """
+    pool = engine.pool
+    if not isinstance(pool, MonitoredPool) or pool.stats is None:
+        return None
+    return pool.stats.snapshot(pool)
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import logging
+from collections import Counter
+from sqlalchemy import delete, func, insert, select
+from app.db.models import Notification, NotificationKeyword, OutboxMessage
+from app.db.sharding import ShardRouter
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _misplaced_users(shards: ShardRouter, name: str) -> list:
+    async with shards.session_maker(name)() as session:
+        result = await session.stream_scalars(
+            select(Notification.user_id).distinct().order_by(Notification.user_id)
+        )
+        return [
+            user_id
+            async for user_id in result
+            if shards.shard_for_user(user_id) != name
+        ]
+
+
+async def _move_batch(
+    shards: ShardRouter, source: str, target: str, user_id, batch_size: int
+) -> int:
+    notifications = Notification.__table__
+    keywords = NotificationKeyword.__table__
+    outbox = OutboxMessage.__table__
+
+    async with shards.session_maker(source)() as source_session:
+        rows = [
+            dict(row._mapping)
+            for row in await source_session.execute(
+                select(notifications)
+                .where(notifications.c.user_id == user_id)
+                .order_by(notifications.c.id)
+                .limit(batch_size)
+            )
+        ]
+        if not rows:
+            return 0
+        ids = [row["id"] for row in rows]
+        keyword_rows = [
+            dict(row._mapping)
+            for row in await source_session.execute(
+                select(keywords).where(keywords.c.notification_id.in_(ids))
+            )
+        ]
+        outbox_rows = [
+            {
+                "notification_id": row.notification_id,
+                "text": row.text,
+                "created_at": row.created_at,
+            }
+            for row in await source_session.execute(
+                select(outbox).where(
+                    outbox.c.notification_id.in_(ids), outbox.c.sent_at.is_(None)
+                )
+            )
+        ]
+
+        # Сначала данные фиксируются на целевом шарде: если перенос прервется
+        # после этого, повторный запуск пропустит уже скопированные строки
+        async with shards.session_maker(target)() as target_session:
+            existing = set(
+                await target_session.scalars(
+                    select(notifications.c.id).where(notifications.c.id.in_(ids))
+                )
+            )
+            fresh = [row for row in rows if row["id"] not in existing]
+            if fresh:
+                await target_session.execute(insert(notifications), fresh)
+                fresh_ids = {row["id"] for row in fresh}
+                fresh_keywords = [
+                    row for row in keyword_rows if row["notification_id"] in fresh_ids
+                ]
+                if fresh_keywords:
+                    await target_session.execute(insert(keywords), fresh_keywords)
+                fresh_outbox = [
+                    row for row in outbox_rows if row["notification_id"] in fresh_ids
+                ]
+                if fresh_outbox:
+                    await target_session.execute(insert(outbox), fresh_outbox)
+            await target_session.commit()
+
+        for table, column in (
+            (outbox, outbox.c.notification_id),
+            (keywords, keywords.c.notification_id),
+            (notifications, notifications.c.id),
+        ):
+            await source_session.execute(delete(table).where(column.in_(ids)))
+        await source_session.commit()
+    return len(rows)
+
+
+async def rebalance(
+    shards: ShardRouter, batch_size: int = 1000, dry_run: bool = False
+) -> Counter:
+    """
+    Перенести уведомления на шарды, которые им назначает текущее кольцо.
+
+    После добавления шарда в `DATABASE_SHARDS` часть пользователей
+    назначается на новый шард. Для каждого такого пользователя уведомления,
+    их ключевые слова и неотправленные сообщения outbox пачками копируются на
+    целевой шард и затем удаляются с исходного. Уже скопированные строки
+    пропускаются, поэтому прерванный перенос можно запустить повторно. Пока
+    перенос идет, уведомления по ID находятся перебором шардов, а списки
+    перенесенного пользователя могут быть неполными.
+
+    Аргументы:
+        shards (ShardRouter): Маршрутизатор с новым набором шардов.
+        batch_size (int): Количество уведомлений в одной пачке переноса.
+        dry_run (bool): Только подсчитать уведомления, которые нужно перенести.
+
+    Возвращаемое значение:
+        Counter: Количество перенесенных уведомлений по парам (исходный шард, целевой шард).
+    """
+    moved = Counter()
+    for source in shards.names:
+        for user_id in await _misplaced_users(shards, source):
+            target = shards.shard_for_user(user_id)
+            if dry_run:
+                async with shards.session_maker(source)() as session:
+                    moved[source, target] += await session.scalar(
+                        select(func.count())
+                        .select_from(Notification)
+                        .where(Notification.user_id == user_id)
+                    )
+                continue
+            while True:
+                count = await _move_batch(shards, source, target, user_id, batch_size)
+                moved[source, target] += count
+                if count < batch_size:
+                    break
+            logger.info("Moved user %s from shard %s to %s", user_id, source, target)
+    return moved
+
+
+async def _main(batch_size: int, dry_run: bool):
+    from app.db.database import shard_router
+
+    try:
+        moved = await rebalance(shard_router, batch_size, dry_run)
+    finally:
+        await shard_router.dispose()
+    for (source, target), count in sorted(moved.items()):
+        print(f"{source} -> {target}: {count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Перенести уведомления на шарды по текущему DATABASE_SHARDS"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args.batch_size, args.dry_run))
@@ -0,0 +1,365 @@
+import bisect
+import hashlib
+import itertools
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+
+def key_position(key: uuid.UUID) -> int:
+    """
+    Получить позицию UUID на кольце консистентного хэширования (32 бита).
+
+    Аргументы:
+        key (UUID): ID пользователя.
+
+    Возвращаемое значение:
+        int: Позиция от 0 до 2**32 - 1.
+    """
+    return int.from_bytes(hashlib.md5(key.bytes).digest()[:4], "big")
+
+
+def new_notification_id(user_id) -> uuid.UUID:
+    """
+    Сгенерировать ID уведомления, по которому можно найти шард пользователя.
+
+    Первые 32 бита случайного UUID4 заменяются позицией пользователя на
+    кольце, поэтому шард уведомления вычисляется по его ID без справочника,
+    в том числе после перебалансировки. Остальные биты (и версия UUID)
+    остаются случайными.
+
+    Аргументы:
+        user_id (UUID): ID пользователя, которому принадлежит уведомление.
+
+    Возвращаемое значение:
+        UUID: ID уведомления.
+    """
+    if not isinstance(user_id, uuid.UUID):
+        user_id = uuid.UUID(str(user_id))
+    prefix = key_position(user_id).to_bytes(4, "big")
+    return uuid.UUID(bytes=prefix + uuid.uuid4().bytes[4:])
+
+
+def notification_position(notification_id: uuid.UUID) -> int:
+    """
+    Получить позицию на кольце, записанную в ID уведомления.
+    """
+    return int.from_bytes(notification_id.bytes[:4], "big")
+
+
+class HashRing:
+    """
+    Кольцо консистентного хэширования имен шардов.
+
+    Каждый шард представлен на кольце `vnodes` виртуальными точками, поэтому
+    ключи распределяются равномерно, а при добавлении шарда к нему переходит
+    только около 1/N ключей.
+
+    Атрибуты:
+        names (List[str]): Имена шардов.
+        vnodes (int): Число виртуальных точек на шард.
+    """
+
+    def __init__(self, names: List[str], vnodes: int = 64):
+        self.names = list(names)
+        self.vnodes = vnodes
+        points = sorted(
+            (
+                int.from_bytes(
+                    hashlib.md5(f"{name}#{index}".encode()).digest()[:4], "big"
+                ),
+                name,
+            )
+            for name in self.names
+            for index in range(vnodes)
+        )
+        self._positions = [position for position, _ in points]
+        self._owners = [name for _, name in points]
+
+    def get(self, position: int) -> str:
+        """
+        Получить шард, владеющий позицией на кольце.
+
+        Аргументы:
+            position (int): Позиция от 0 до 2**32 - 1.
+
+        Возвращаемое значение:
+            str: Имя шарда.
+        """
+        index = bisect.bisect_right(self._positions, position) % len(self._positions)
+        return self._owners[index]
+
+
+class ShardRouter:
+    """
+    Маршрутизатор запросов к шардам таблицы уведомлений по `user_id`.
+
+    Уведомления пользователя целиком хранятся на одном шарде, выбранном по
+    кольцу консистентного хэширования. Шард уведомления по его ID
+    определяется по позиции, записанной в ID (`new_notification_id`); для ID,
+    созданных до шардирования, шарды перебираются по очереди.
+
+    У шарда могут быть реплики для чтения. Читающие запросы получают сессию
+    реплики, выбранной по кругу (`round_robin`) или по наименьшему числу
+    выданных соединений пула (`least_connections`), если вызывающий код не
+    требует чтения с основной базы. Запись всегда идет в основную базу шарда.
+
+    Атрибуты:
+        session_makers (Dict[str, async_sessionmaker]): Фабрики сессий по именам шардов.
+        replica_makers (Dict[str, List[async_sessionmaker]]): Фабрики сессий реплик по именам шардов.
+        strategy (str): Способ выбора реплики: "round_robin" или "least_connections".
+        ring (HashRing): Кольцо консистентного хэширования.
+    """
+
+    STRATEGIES = ("round_robin", "least_connections")
+
+    def __init__(
+        self,
+        session_makers: Dict[str, async_sessionmaker],
+        vnodes: int = 64,
+        replica_makers: Dict[str, List[async_sessionmaker]] = None,
+        strategy: str = "round_robin",
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.session_makers = dict(session_makers)
+        self.replica_makers = {
+            name: list(makers)
+            for name, makers in (replica_makers or {}).items()
+            if makers
+        }
+        self.strategy = strategy
+        self.ring = HashRing(list(self.session_makers), vnodes)
+        self._turns = {name: itertools.count() for name in self.replica_makers}
+
+    @classmethod
+    def from_urls(cls, urls: Dict[str, str], vnodes: int = 64, **engine_kwargs):
+        """
+        Создать маршрутизатор с отдельным движком на каждый URL.
+
+        Аргументы:
+            urls (Dict[str, str]): URL баз данных по именам шардов.
+            vnodes (int): Число виртуальных точек на шард.
+            **engine_kwargs: Параметры `create_async_engine`.
+
+        Возвращаемое значение:
+            ShardRouter: Маршрутизатор.
+        """
+        return cls(
+            {
+                name: async_sessionmaker(
+                    create_async_engine(url, **engine_kwargs), expire_on_commit=False
+                )
+                for name, url in urls.items()
+            },
+            vnodes,
+        )
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.session_makers)
+
+    @property
+    def engines(self) -> list:
+        """
+        Движки основных баз шардов.
+        """
+        return [maker.kw["bind"] for maker in self.session_makers.values()]
+
+    @property
+    def has_replicas(self) -> bool:
+        """
+        Есть ли реплики для чтения хотя бы у одного шарда.
+        """
+        return bool(self.replica_makers)
+
+    def named_engines(self) -> Dict[str, tuple]:
+        """
+        Получить все движки маршрутизатора, включая реплики.
+
+        Возвращаемое значение:
+            Dict[str, tuple]: Пары (роль "primary" или "replica", движок) по
+            именам вида "shard" и "shard/replica1".
+        """
+        engines = {}
+        for name, maker in self.session_makers.items():
+            engines[name] = ("primary", maker.kw["bind"])
+            for index, replica in enumerate(self.replica_makers.get(name, ()), 1):
+                engines[f"{name}/replica{index}"] = ("replica", replica.kw["bind"])
+        return engines
+
+    def shard_for_user(self, user_id) -> str:
+        """
+        Получить имя шарда пользователя.
+        """
+        if not isinstance(user_id, uuid.UUID):
+            user_id = uuid.UUID(str(user_id))
+        return self.ring.get(key_position(user_id))
+
+    def shard_for_notification(self, notification_id) -> str:
+        """
+        Получить имя шарда, на котором должно находиться уведомление.
+        """
+        if not isinstance(notification_id, uuid.UUID):
+            notification_id = uuid.UUID(str(notification_id))
+        return self.ring.get(notification_position(notification_id))
+
+    def candidates(self, notification_id) -> List[str]:
+        """
+        Получить шарды для поиска уведомления: сначала вычисленный по ID, затем остальные.
+        """
+        first = self.shard_for_notification(notification_id)
+        return [first] + [name for name in self.session_makers if name != first]
+
+    def session_maker(self, name: str) -> async_sessionmaker:
+        """
+        Получить фабрику сессий шарда.
+        """
+        return self.session_makers[name]
+
+    def session_for_user(self, user_id) -> AsyncSession:
+        """
+        Открыть сессию шарда пользователя.
+        """
+        return self.session_makers[self.shard_for_user(user_id)]()
+
+    def read_session_maker(
+        self, name: str, primary: bool = False
+    ) -> async_sessionmaker:
+        """
+        Получить фабрику сессий для чтения с шарда.
+
+        Аргументы:
+            name (str): Имя шарда.
+            primary (bool): Читать с основной базы, даже если у шарда есть реплики.
+
+        Возвращаемое значение:
+            async_sessionmaker: Фабрика сессий реплики или основной базы.
+        """
+        replicas = self.replica_makers.get(name)
+        if primary or not replicas:
+            return self.session_makers[name]
+        turn = next(self._turns[name]) % len(replicas)
+        replicas = replicas[turn:] + replicas[:turn]
+        if self.strategy == "least_connections":
+            return min(replicas, key=_checked_out)
+        return replicas[0]
+
+    def read_session_for_user(self, user_id, primary: bool = False) -> AsyncSession:
+        """
+        Открыть сессию для чтения с шарда пользователя.
+        """
+        return self.read_session_maker(self.shard_for_user(user_id), primary)()
+
+    def group_by_shard(self, items, key) -> Dict[str, list]:
+        """
+        Разложить элементы по шардам.
+
+        Аргументы:
+            items (Iterable): Элементы.
+            key: Функция, возвращающая ID пользователя элемента.
+
+        Возвращаемое значение:
+            Dict[str, list]: Элементы по именам шардов.
+        """
+        groups = {}
+        for item in items:
+            groups.setdefault(self.shard_for_user(key(item)), []).append(item)
+        return groups
+
+    def group_notifications(self, notification_ids) -> Dict[str, list]:
+        """
+        Разложить ID уведомлений по вычисленным шардам.
+        """
+        groups = {}
+        for notification_id in notification_ids:
+            groups.setdefault(self.shard_for_notification(notification_id), []).append(
+                notification_id
+            )
+        return groups
+
+    @asynccontextmanager
+    async def notification_session(
+        self, model, notification_id, read_only: bool = False
+    ):
+        """
+        Найти уведомление на шардах и открыть сессию его шарда.
+
+        При `read_only` уведомление сначала ищется на реплике вычисленного
+        шарда; если реплика его еще не получила, поиск продолжается по
+        основным базам.
+
+        Аргументы:
+            model: ORM-модель уведомления.
+            notification_id (UUID): ID уведомления.
+            read_only (bool): Сессия нужна только для чтения.
+
+        Возвращаемое значение:
+            tuple: (AsyncSession, объект модели или None, если уведомление не найдено).
+        """
+        names = self.candidates(notification_id)
+        makers = [self.session_makers[name] for name in names]
+        if read_only and names[0] in self.replica_makers:
+            makers.insert(0, self.read_session_maker(names[0]))
+        for index, maker in enumerate(makers):
+            async with maker() as session:
+                instance = await session.get(model, notification_id)
+                if instance is not None or index == len(makers) - 1:
+                    yield session, instance
+                    return
+
+    async def dispose(self):
+        """
+        Закрыть пулы соединений всех шардов и реплик.
+        """
+        for _, engine in self.named_engines().values():
+            await engine.dispose()
+
+
+def _checked_out(maker: async_sessionmaker) -> int:
+    checkedout = getattr(maker.kw["bind"].pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+def parse_shard_urls(value: str, default_url: str) -> Dict[str, str]:
+    """
+    Разобрать описание шардов вида "name=url,name=url".
+
+    Аргументы:
+        value (str): Значение настройки; пустое означает один шард "default".
+        default_url (str): URL базы данных по умолчанию.
+
+    Возвращаемое значение:
+        Dict[str, str]: URL по именам шардов.
+    """
+    urls = {}
+    for item in (value or "").split(","):
+        name, _, url = item.strip().partition("=")
+        if name and url:
+            urls[name.strip()] = url.strip()
+    return urls or {"default": default_url}
+
+
+def parse_replica_urls(value: str) -> Dict[str, List[str]]:
+    """
+    Разобрать описание реплик вида "shard=url,shard=url".
+
+    Для одного шарда можно указать несколько реплик, повторив его имя.
+
+    Аргументы:
+        value (str): Значение настройки; пустое означает, что реплик нет.
+
+    Возвращаемое значение:
+        Dict[str, List[str]]: URL реплик по именам шардов.
+    """
+    replicas = {}
+    for item in (value or "").split(","):
+        name, _, url = item.strip().partition("=")
+        if name and url:
+            replicas.setdefault(name.strip(), []).append(url.strip())
+    return replicas
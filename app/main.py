@@ -1,7 +1,16 @@
+import asyncio
 from fastapi import FastAPI
-from app.db.database import engine
-from app.db.models import Base
+from app.cache.item_cache import notification_cache
+from app.celery.outbox import outbox_relay
+from app.config.config import settings
+from app.config.redis_conf import redis
+from app.db.database import shard_router
+from app.db.migrations import upgrade_shards
+from app.monitoring import metrics
+from app.monitoring.metrics import MetricsMiddleware
+from app.realtime.events import event_hub
 from contextlib import asynccontextmanager
+from app.api.metrics import router as metrics_router
 from app.api.routes import router as ai_router
 
 
@@ -9,15 +18,28 @@ from app.api.routes import router as ai_router
 async def lifespan(app: FastAPI):
     """
     Контекст жизненного цикла приложения:
-    - создание таблиц при запуске
-    - закрытие соединения при остановке
+    - создание таблиц на каждом шарде и добавление новых столбцов и индексов
+      в существующие таблицы при запуске
+    - подписка на инвалидацию кэша уведомлений
+    - запуск ретранслятора outbox (если включен `OUTBOX_RELAY_ENABLED`)
+    - остановка общей подписки на события статуса при остановке
+    - закрытие соединений всех шардов при остановке
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await upgrade_shards(shard_router)
+    background = [asyncio.create_task(notification_cache.listen(redis))]
+    if settings.OUTBOX_RELAY_ENABLED:
+        background.append(asyncio.create_task(outbox_relay.run(shard_router, redis)))
     yield
-    await engine.dispose()
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await event_hub.close()
+    await shard_router.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
+if metrics.HTTP:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(ai_router, tags=["Notifications"])
+app.include_router(metrics_router)
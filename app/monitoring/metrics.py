@@ -0,0 +1,253 @@
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from app.config.config import settings
+
+
+# Компоненты, инструментирование которых можно включать по отдельности
+COMPONENTS = ("http", "db", "cache", "broker", "tasks", "analyzer", "backlog")
+
+
+def enabled(component: str) -> bool:
+    """
+    Включены ли метрики компонента (`METRICS_ENABLED` и `METRICS_COMPONENTS`).
+    """
+    return settings.METRICS_ENABLED and component in settings.METRICS_COMPONENTS
+
+
+HTTP = enabled("http")
+DB = enabled("db")
+CACHE = enabled("cache")
+BROKER = enabled("broker")
+TASKS = enabled("tasks")
+ANALYZER = enabled("analyzer")
+BACKLOG = enabled("backlog")
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запроса",
+    ["method", "route", "status"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Длительность выполнения SQL-запроса",
+    ["engine"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Время получения соединения из пула",
+    ["engine"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Запросы, не дождавшиеся соединения из пула",
+    ["engine"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Число выданных соединений пула",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity",
+    "Размер пула с переполнением",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+LIST_CACHE_REQUESTS = Counter(
+    "list_cache_requests_total",
+    "Обращения к кэшу страниц списка уведомлений по результату",
+    ["outcome"],
+)
+LIST_CACHE_REDIS_SECONDS = Histogram(
+    "list_cache_redis_duration_seconds",
+    "Длительность операций Redis кэша страниц списка",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+BROKER_PUBLISH_SECONDS = Histogram(
+    "broker_publish_duration_seconds",
+    "Длительность публикации задачи в брокер",
+    ["task"],
+    buckets=FAST_BUCKETS,
+)
+OUTBOX_PUBLISH_LAG_SECONDS = Histogram(
+    "outbox_publish_lag_seconds",
+    "Задержка от записи сообщения outbox до его публикации в брокер",
+    buckets=SLOW_BUCKETS,
+)
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Время от публикации задачи до начала ее выполнения",
+    ["task"],
+    buckets=SLOW_BUCKETS,
+)
+TASK_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Длительность выполнения задачи Celery",
+    ["task", "state"],
+    buckets=SLOW_BUCKETS,
+)
+ANALYZER_SECONDS = Histogram(
+    "analyzer_duration_seconds",
+    "Длительность вызова движка анализа",
+    ["outcome"],
+    buckets=SLOW_BUCKETS,
+)
+ANALYZER_EVENTS = Counter(
+    "analyzer_resilience_events_total",
+    "События обертки движка анализа (calls, failures, timeouts, retries, hedged, ...)",
+    ["event"],
+)
+ANALYSIS_RESULTS = Counter(
+    "analysis_results_total",
+    "Завершенные обработки уведомлений по статусу и категории",
+    ["status", "category"],
+)
+PENDING_OLDEST_AGE = Gauge(
+    "notifications_oldest_pending_age_seconds",
+    "Возраст самого старого уведомления в статусе pending",
+    multiprocess_mode="livemostrecent",
+)
+OUTBOX_PENDING = Gauge(
+    "outbox_pending_messages",
+    "Число неотправленных сообщений outbox",
+    multiprocess_mode="livemostrecent",
+)
+OUTBOX_OLDEST_AGE = Gauge(
+    "outbox_oldest_pending_age_seconds",
+    "Возраст самого старого неотправленного сообщения outbox",
+    multiprocess_mode="livemostrecent",
+)
+
+
+def registry() -> CollectorRegistry:
+    """
+    Получить реестр для выдачи метрик.
+
+    Если задан `PROMETHEUS_MULTIPROC_DIR` (несколько процессов uvicorn или
+    prefork-воркер Celery), метрики собираются из файлов всех процессов.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return REGISTRY
+
+
+def render() -> tuple:
+    """
+    Сформировать ответ в текстовом формате Prometheus.
+
+    Возвращаемое значение:
+        tuple: (тело ответа, Content-Type).
+    """
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
+
+
+def instrument_engine(name: str, engine, capacity: int = 0):
+    """
+    Подключить замеры SQL-запросов и пула соединений к движку.
+
+    Аргументы:
+        name (str): Имя движка (шард или реплика) для метки `engine`.
+        engine (AsyncEngine): Движок.
+        capacity (int): Размер пула с переполнением.
+
+    Возвращаемое значение:
+        None
+    """
+    if not DB:
+        return
+    sync_engine = engine.sync_engine
+    queries = DB_QUERY_SECONDS.labels(name)
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+    DB_POOL_CAPACITY.labels(name).set(capacity)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("metrics_started")
+        if started:
+            queries.observe(time.perf_counter() - started.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        started = (
+            context.connection.info.get("metrics_started")
+            if context.connection
+            else None
+        )
+        if started:
+            started.pop()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, record, proxy):
+        checked_out.inc()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_connection, record):
+        checked_out.dec()
+
+    stats = getattr(engine.pool, "stats", None)
+    if stats is not None:
+        stats.on_wait = DB_POOL_WAIT_SECONDS.labels(name).observe
+        stats.on_timeout = DB_POOL_TIMEOUTS.labels(name).inc
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, замеряющее длительность HTTP-запросов по шаблону маршрута.
+
+    Метка `route` — шаблон пути маршрута FastAPI (например,
+    "/notification{notification_id}"), а не фактический путь, поэтому число
+    рядов метрики не зависит от ID в запросах. Для потоковых ответов
+    замеряется время до конца потока.
+    """
+
+    EXCLUDED = ("/metrics",)
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            if path not in self.EXCLUDED:
+                HTTP_REQUEST_SECONDS.labels(scope["method"], path, str(status)).observe(
+                    time.perf_counter() - started
+                )
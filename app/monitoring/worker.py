@@ -0,0 +1,88 @@
+import os
+import time
+from celery.signals import (
+    after_task_publish,
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+)
+from prometheus_client import multiprocess, start_http_server
+from app.config.config import settings
+from app.monitoring import metrics
+
+
+# Время начала публикации и выполнения задач по ID задачи
+_publishing = {}
+_running = {}
+
+
+@before_task_publish.connect
+def _before_publish(sender=None, headers=None, **kwargs):
+    """
+    Отметить время публикации задачи в заголовке сообщения и начать замер публикации.
+    """
+    if headers is None:
+        return
+    if metrics.TASKS:
+        headers.setdefault("enqueued_at", time.time())
+    if metrics.BROKER and "id" in headers:
+        _publishing[headers["id"]] = time.perf_counter()
+
+
+@after_task_publish.connect
+def _after_publish(sender=None, headers=None, **kwargs):
+    """
+    Учесть длительность публикации задачи в брокер.
+    """
+    started = _publishing.pop((headers or {}).get("id"), None)
+    if started is not None:
+        metrics.BROKER_PUBLISH_SECONDS.labels(sender).observe(
+            time.perf_counter() - started
+        )
+
+
+@task_prerun.connect
+def _task_started(task_id=None, task=None, **kwargs):
+    """
+    Учесть время ожидания задачи в очереди и начать замер выполнения.
+    """
+    if not metrics.TASKS:
+        return
+    enqueued_at = getattr(task.request, "enqueued_at", None)
+    if enqueued_at is not None:
+        metrics.TASK_QUEUE_WAIT_SECONDS.labels(task.name).observe(
+            max(time.time() - enqueued_at, 0.0)
+        )
+    _running[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    """
+    Учесть длительность выполнения задачи с итоговым состоянием.
+    """
+    started = _running.pop(task_id, None)
+    if started is not None:
+        metrics.TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+
+
+@worker_init.connect
+def _start_exporter(**kwargs):
+    """
+    Запустить HTTP-сервер метрик воркера на `METRICS_WORKER_PORT`.
+    """
+    if settings.METRICS_ENABLED and settings.METRICS_WORKER_PORT:
+        start_http_server(settings.METRICS_WORKER_PORT, registry=metrics.registry())
+
+
+@worker_process_shutdown.connect
+def _mark_process_dead(**kwargs):
+    """
+    Удалить файлы метрик завершившегося процесса в многопроцессном режиме.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
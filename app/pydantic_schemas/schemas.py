@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
+from app.config.config import settings
 
 
 class NotificationCreate(BaseModel):
@@ -57,3 +58,226 @@ class NotificationRead(BaseModel):
         """
 
         from_attributes = True
+
+
+class AnalysisCacheStats(BaseModel):
+    """
+    Модель статистики кэша результатов AI-анализа.
+
+    Атрибуты:
+    - hits (int): Количество результатов, найденных в кэше.
+    - misses (int): Количество вызовов анализатора.
+    - deduplicated (int): Количество запросов, дождавшихся уже выполняющегося анализа того же текста.
+    - entries (int): Текущее количество записей в кэше.
+    - hit_ratio (float): Доля запросов, обслуженных без вызова анализатора.
+    """
+
+    hits: int
+    misses: int
+    deduplicated: int
+    entries: int
+    hit_ratio: float
+
+
+class NotificationCacheStats(BaseModel):
+    """
+    Модель статистики двухуровневого кэша уведомлений в текущем процессе API.
+
+    Атрибуты:
+    - local_hits (int): Попадания в кэш в памяти процесса.
+    - local_misses (int): Промахи кэша в памяти процесса.
+    - redis_hits (int): Попадания в кэш Redis.
+    - redis_misses (int): Промахи кэша Redis (запросы к базе данных).
+    - local_hit_ratio (float): Доля попаданий в кэш в памяти процесса.
+    - redis_hit_ratio (float): Доля попаданий в кэш Redis среди промахов первого уровня.
+    - local_size (int): Текущее число записей в кэше в памяти процесса.
+    """
+
+    local_hits: int
+    local_misses: int
+    redis_hits: int
+    redis_misses: int
+    local_hit_ratio: float
+    redis_hit_ratio: float
+    local_size: int
+
+
+class BulkItemResult(BaseModel):
+    """
+    Результат обработки одного элемента пакетной загрузки.
+
+    Атрибуты:
+    - index (int): Порядковый номер элемента во входных данных (с нуля).
+    - id (Optional[UUID]): ID созданного уведомления. Пустой, если элемент не сохранен.
+    - error (Optional[str]): Описание ошибки. Пустое, если элемент сохранен.
+    """
+
+    index: int
+    id: Optional[UUID] = None
+    error: Optional[str] = None
+
+
+class BulkCreateResult(BaseModel):
+    """
+    Модель ответа пакетной загрузки уведомлений.
+
+    Атрибуты:
+    - created (int): Количество созданных уведомлений.
+    - failed (int): Количество элементов, которые не удалось сохранить.
+    - items (List[BulkItemResult]): Результат по каждому элементу в порядке входных данных.
+    """
+
+    created: int
+    failed: int
+    items: List[BulkItemResult]
+
+
+class BulkMarkRead(BaseModel):
+    """
+    Модель запроса пакетной пометки уведомлений как прочитанных.
+
+    Нужно указать список ID, ID пользователя или оба параметра сразу
+    (тогда помечаются только уведомления этого пользователя из списка).
+    Список ID ограничен размером порции пакетной загрузки
+    (`BULK_INSERT_CHUNK_SIZE`).
+
+    Атрибуты:
+    - ids (Optional[List[UUID]]): ID уведомлений для пометки.
+    - user_id (Optional[UUID]): ID пользователя, все уведомления которого нужно пометить.
+    - created_before (Optional[datetime]): Помечать только уведомления, созданные раньше этого момента.
+    """
+
+    ids: Optional[List[UUID]] = Field(None, max_length=settings.BULK_INSERT_CHUNK_SIZE)
+    user_id: Optional[UUID] = None
+    created_before: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_filter(self):
+        """
+        Проверить, что задан список ID или пользователь.
+        """
+        if not self.ids and self.user_id is None:
+            raise ValueError("Either ids or user_id must be provided")
+        return self
+
+
+class BulkMarkReadResult(BaseModel):
+    """
+    Модель ответа пакетной пометки уведомлений как прочитанных.
+
+    Атрибуты:
+    - updated (int): Количество уведомлений, помеченных прочитанными.
+    - ids (List[UUID]): ID помеченных уведомлений. Уже прочитанные уведомления не входят в список.
+    """
+
+    updated: int
+    ids: List[UUID]
+
+
+class NotificationCounts(BaseModel):
+    """
+    Модель счетчиков уведомлений пользователя.
+
+    Атрибуты:
+    - total (int): Общее количество уведомлений.
+    - unread (int): Количество непрочитанных уведомлений.
+    - by_category (Dict[str, int]): Количество уведомлений по категориям.
+    - unread_by_category (Dict[str, int]): Количество непрочитанных уведомлений по категориям.
+    - by_status (Dict[str, int]): Количество уведомлений по статусам обработки.
+    """
+
+    total: int
+    unread: int
+    by_category: Dict[str, int]
+    unread_by_category: Dict[str, int]
+    by_status: Dict[str, int]
+
+
+class DigestBucket(BaseModel):
+    """
+    Модель агрегатов уведомлений пользователя за один интервал.
+
+    Атрибуты:
+    - start (datetime): Начало интервала (UTC).
+    - total (int): Количество уведомлений, созданных в интервале.
+    - read (int): Сколько из них прочитано.
+    - read_rate (float): Доля прочитанных уведомлений.
+    - by_category (Dict[str, int]): Количество уведомлений по категориям.
+    - avg_confidence (Optional[float]): Средняя уверенность анализа. Пусто, если проанализированных нет.
+    """
+
+    start: datetime
+    total: int
+    read: int
+    read_rate: float
+    by_category: Dict[str, int]
+    avg_confidence: Optional[float]
+
+
+class NotificationDigest(BaseModel):
+    """
+    Модель сводки уведомлений пользователя за период.
+
+    Атрибуты:
+    - user_id (UUID): ID пользователя.
+    - granularity (str): Детализация интервалов ("hour" или "day").
+    - buckets (List[DigestBucket]): Агрегаты по интервалам в хронологическом порядке.
+    """
+
+    user_id: UUID
+    granularity: str
+    buckets: List[DigestBucket]
+
+
+class OutboxStats(BaseModel):
+    """
+    Модель статистики outbox запросов на анализ.
+
+    Атрибуты:
+    - pending (int): Число неотправленных сообщений.
+    - oldest_pending_age (float): Возраст самого старого неотправленного сообщения в секундах.
+    - published (int): Всего опубликовано сообщений.
+    - batches (int): Всего опубликовано пачек.
+    - avg_lag (float): Средняя задержка от записи сообщения до публикации в секундах.
+    - last_lag (float): Максимальная задержка в последней пачке в секундах.
+    """
+
+    pending: int
+    oldest_pending_age: float
+    published: int
+    batches: int
+    avg_lag: float
+    last_lag: float
+
+
+class DatabasePoolStats(BaseModel):
+    """
+    Модель статистики пула соединений одной базы данных.
+
+    Атрибуты:
+    - name (str): Имя шарда или реплики ("shard/replica1").
+    - role (str): "primary" или "replica".
+    - size (int): Размер пула.
+    - max_overflow (int): Сколько соединений можно открыть сверх размера пула.
+    - checked_out (int): Число выданных сейчас соединений.
+    - utilization (float): Доля занятых соединений от размера пула с переполнением.
+    - peak_checked_out (int): Максимальное число одновременно выданных соединений.
+    - checkouts (int): Всего выдано соединений.
+    - timeouts (int): Число запросов, не дождавшихся соединения.
+    - wait_avg (float): Среднее время ожидания соединения в секундах.
+    - wait_p95 (float): 95-й перцентиль времени ожидания по последним выдачам в секундах.
+    - wait_max (float): Максимальное время ожидания соединения в секундах.
+    """
+
+    name: str
+    role: str
+    size: int
+    max_overflow: int
+    checked_out: int
+    utilization: float
+    peak_checked_out: int
+    checkouts: int
+    timeouts: int
+    wait_avg: float
+    wait_p95: float
+    wait_max: float
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Optional
+from redis.asyncio import Redis
+from app.config.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "notifications:events:{user_id}"
+CHANNEL = "notifications:events"
+
+
+def _parse_id(event_id: str) -> tuple:
+    milliseconds, _, sequence = event_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+async def publish_status_events(redis: Redis, events: list):
+    """
+    Опубликовать изменения статуса обработки уведомлений.
+
+    Каждое событие записывается в поток Redis пользователя
+    `notifications:events:{user_id}` (ограниченной длины, для возобновления по
+    Last-Event-ID) и публикуется в общий канал `notifications:events` вместе с
+    присвоенным потоком ID.
+
+    Аргументы:
+        redis (Redis): Асинхронный клиент Redis.
+        events (list): Словари с полями notification_id, user_id,
+            processing_status и category.
+
+    Возвращаемое значение:
+        None
+    """
+    if not events:
+        return
+    payloads = [
+        json.dumps({key: value and str(value) for key, value in event.items()})
+        for event in events
+    ]
+    async with redis.pipeline(transaction=False) as pipe:
+        for event, payload in zip(events, payloads):
+            key = STREAM_KEY.format(user_id=event["user_id"])
+            pipe.xadd(
+                key,
+                {"data": payload},
+                maxlen=settings.EVENTS_STREAM_MAXLEN,
+                approximate=True,
+            )
+            pipe.expire(key, settings.EVENTS_STREAM_TTL)
+        ids = (await pipe.execute())[::2]
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for event, payload, event_id in zip(events, payloads, ids):
+            pipe.publish(
+                CHANNEL,
+                json.dumps(
+                    {"id": event_id, "user_id": str(event["user_id"]), "data": payload}
+                ),
+            )
+        await pipe.execute()
+
+
+class Subscription:
+    """
+    Подписка одного клиента на события пользователя.
+
+    Атрибуты:
+        queue (asyncio.Queue): Очередь событий (пары ID события и данные).
+        overflowed (bool): Клиент не успевал читать события, и часть из них
+            была пропущена; соединение нужно закрыть, чтобы клиент
+            переподключился с Last-Event-ID.
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+
+class EventHub:
+    """
+    Раздача событий статуса подключенным клиентам в пределах процесса API.
+
+    На процесс открывается одна подписка на канал `notifications:events`
+    (лениво, при подключении первого клиента), и каждое сообщение
+    раскладывается по очередям клиентов соответствующего пользователя.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._task = None
+
+    def subscribe(self, redis: Redis, user_id) -> Subscription:
+        """
+        Зарегистрировать клиента и при необходимости запустить общую подписку.
+
+        Аргументы:
+            redis (Redis): Асинхронный клиент Redis.
+            user_id (UUID): ID пользователя, события которого нужны клиенту.
+
+        Возвращаемое значение:
+            Subscription: Подписка клиента.
+        """
+        subscription = Subscription(self.queue_size)
+        self._subscribers[str(user_id)].add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen(redis))
+        return subscription
+
+    def unsubscribe(self, user_id, subscription: Subscription):
+        """
+        Отписать клиента.
+        """
+        subscribers = self._subscribers.get(str(user_id))
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[str(user_id)]
+
+    async def _listen(self, redis: Redis):
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event hub subscription failed")
+                await asyncio.sleep(1)
+
+    def _dispatch(self, message: dict):
+        for subscription in self._subscribers.get(message["user_id"], ()):
+            try:
+                subscription.queue.put_nowait((message["id"], message["data"]))
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+
+    async def close(self):
+        """
+        Остановить общую подписку процесса.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def read_missed(redis: Redis, user_id, last_event_id: str) -> list:
+    """
+    Прочитать из потока пользователя события, пропущенные после `last_event_id`.
+
+    Аргументы:
+        redis (Redis): Асинхронный клиент Redis.
+        user_id (UUID): ID пользователя.
+        last_event_id (str): ID последнего полученного клиентом события.
+
+    Возвращаемое значение:
+        list: Пары (ID события, данные) в порядке публикации.
+    """
+    entries = await redis.xrange(
+        STREAM_KEY.format(user_id=user_id),
+        min=f"({last_event_id}",
+        count=settings.EVENTS_STREAM_MAXLEN,
+    )
+    return [(event_id, fields["data"]) for event_id, fields in entries]
+
+
+def format_sse(event_id: str, data: str) -> str:
+    """
+    Сформировать событие в формате Server-Sent Events.
+    """
+    return f"id: {event_id}\nevent: status\ndata: {data}\n\n"
+
+
+def is_newer(event_id: str, last_event_id: Optional[str]) -> bool:
+    """
+    Проверить, что событие опубликовано позже `last_event_id`.
+    """
+    return last_event_id is None or _parse_id(event_id) > _parse_id(last_event_id)
+
+
+event_hub = EventHub(queue_size=settings.EVENTS_QUEUE_SIZE)
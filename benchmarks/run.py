@@ -0,0 +1,570 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from benchmarks.stats import compare, summarize
+
+
+API_SCENARIOS = (
+    "create",
+    "list_hit",
+    "list_miss",
+    "list_deep_cursor",
+    "list_deep_offset",
+    "get_hit",
+    "get_miss",
+    "mark_read",
+)
+WORKER_SCENARIOS = ("worker", "worker_batch")
+SCENARIOS = API_SCENARIOS + WORKER_SCENARIOS
+
+COMPARABLE_PARAMETERS = (
+    "operations",
+    "users",
+    "depth",
+    "page_size",
+    "deep_page",
+    "analyze_latency",
+    "analysis_cache",
+    "seed",
+)
+
+WORDS = (
+    "error payment failed server timeout invoice order shipped meeting "
+    "reminder password reset discount offer report weekly update alert"
+).split()
+
+
+def configure_environment(args):
+    """
+    Настроить окружение приложения до его импорта.
+
+    По умолчанию база данных — новый файл SQLite во временном каталоге, Redis
+    заменяется на fakeredis в памяти процесса, а ретранслятор outbox
+    выключен, чтобы замеры не зависели от внешних сервисов.
+
+    Аргументы:
+        args (argparse.Namespace): Параметры запуска.
+
+    Возвращаемое значение:
+        None
+    """
+    database_url = args.database_url or (
+        "sqlite+aiosqlite:///"
+        + os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.sqlite3")
+    )
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("DATABASE_SHARDS", None)
+    os.environ.pop("DATABASE_REPLICAS", None)
+    os.environ["OUTBOX_RELAY_ENABLED"] = "false"
+    os.environ["AI_LATENCY_MIN"] = os.environ["AI_LATENCY_MAX"] = str(
+        args.analyze_latency
+    )
+    os.environ["ANALYSIS_CACHE_ENABLED"] = "true" if args.analysis_cache else "false"
+    if args.redis == "fake":
+        os.environ.setdefault("REDIS_URL", "redis://fake")
+        os.environ.setdefault("REDIS_BACKEND", "redis://fake")
+        _use_fake_redis()
+    else:
+        os.environ["REDIS_URL"] = os.environ["REDIS_BACKEND"] = args.redis
+
+
+def _use_fake_redis():
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit(
+            "fakeredis is not installed: pip install -r requirements.txt or pass --redis URL"
+        )
+    import redis
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+    redis.asyncio.Redis.from_url = classmethod(
+        lambda cls, url, **kwargs: fakeredis.FakeAsyncRedis(server=server, **kwargs)
+    )
+    redis.Redis.from_url = classmethod(
+        lambda cls, url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)
+    )
+
+
+def _text(rng: random.Random, index: int) -> str:
+    return " ".join(rng.choices(WORDS, k=8)) + f" #{index}"
+
+
+async def run_scenario(operations: int, concurrency: int, operation) -> dict:
+    """
+    Выполнить операцию сценария `operations` раз с заданной конкурентностью.
+
+    Аргументы:
+        operations (int): Общее число операций.
+        concurrency (int): Число одновременно выполняемых операций.
+        operation: Корутина `operation(index)`, возвращающая длительность
+            замеряемой части в секундах; исключение считается ошибкой.
+
+    Возвращаемое значение:
+        dict: Результат `summarize`.
+    """
+    latencies, errors = [], 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while True:
+            index = next(counter)
+            if index >= operations:
+                return
+            try:
+                latencies.append(await operation(index))
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(
+        latencies, time.perf_counter() - started, errors, concurrency=concurrency
+    )
+
+
+async def _timed(request) -> float:
+    started = time.perf_counter()
+    response = await request
+    elapsed = time.perf_counter() - started
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    return elapsed
+
+
+async def seed(shards, users: list, depth: int, rng: random.Random) -> dict:
+    """
+    Заполнить базу уведомлениями пользователей для сценариев чтения.
+
+    Аргументы:
+        shards (ShardRouter): Маршрутизатор шардов.
+        users (list): ID пользователей.
+        depth (int): Число уведомлений у каждого пользователя.
+        rng (random.Random): Генератор случайных чисел.
+
+    Возвращаемое значение:
+        dict: ID уведомлений по пользователям, от новых к старым.
+    """
+    from sqlalchemy import insert
+    from app.db.models import Notification
+    from app.db.sharding import new_notification_id
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    ids = {}
+    for user_id in users:
+        rows = [
+            {
+                "id": new_notification_id(user_id),
+                "user_id": user_id,
+                "title": f"Notification {index}",
+                "text": _text(rng, index),
+                "created_at": now - timedelta(seconds=index),
+                "category": rng.choice(("critical", "info", "spam")),
+                "confidence": rng.random(),
+                "processing_status": "completed",
+            }
+            for index in range(depth)
+        ]
+        async with shards.session_for_user(user_id) as session:
+            await session.execute(insert(Notification), rows)
+            await session.commit()
+        ids[user_id] = [row["id"] for row in rows]
+    return ids
+
+
+async def _create_pending(shards, count: int, rng: random.Random) -> list:
+    from sqlalchemy import insert
+    from app.db.models import Notification
+    from app.db.sharding import new_notification_id
+    from uuid import uuid4
+
+    user_id = uuid4()
+    rows = [
+        {
+            "id": new_notification_id(user_id),
+            "user_id": user_id,
+            "title": f"Pending {index}",
+            "text": _text(rng, index),
+        }
+        for index in range(count)
+    ]
+    async with shards.session_for_user(user_id) as session:
+        await session.execute(insert(Notification), rows)
+        await session.commit()
+    return [(row["id"], row["text"]) for row in rows]
+
+
+async def run_api(args, scenario: str, concurrency: int, client, redis, data) -> dict:
+    """
+    Выполнить сценарий обработчиков API.
+
+    Аргументы:
+        args (argparse.Namespace): Параметры запуска.
+        scenario (str): Имя сценария из `API_SCENARIOS`.
+        concurrency (int): Число одновременных запросов.
+        client (AsyncClient): HTTP-клиент приложения.
+        redis (Redis): Клиент Redis приложения.
+        data (dict): Данные, подготовленные `seed`.
+
+    Возвращаемое значение:
+        dict: Результат `summarize`.
+    """
+    from app.cache.item_cache import notification_cache
+    from app.cache.list_cache import list_cache
+
+    rng = random.Random(args.seed)
+    users = list(data)
+    params = {"limit": args.page_size}
+    operations = args.operations
+
+    if scenario == "create":
+
+        async def operation(index):
+            payload = {
+                "user_id": str(users[index % len(users)]),
+                "title": f"Created {index}",
+                "text": _text(rng, index),
+            }
+            return await _timed(client.post("/create_notification", json=payload))
+
+    elif scenario in ("list_hit", "list_miss"):
+        if scenario == "list_hit":
+            for user_id in users:
+                await client.get(
+                    "/notification_list", params={**params, "user_id": str(user_id)}
+                )
+
+        async def operation(index):
+            user_id = users[index % len(users)]
+            if scenario == "list_miss":
+                await list_cache.bump(redis, user_id)
+            return await _timed(
+                client.get(
+                    "/notification_list", params={**params, "user_id": str(user_id)}
+                )
+            )
+
+    elif scenario == "list_deep_cursor":
+        cursors = {}
+        for user_id in users:
+            cursor = None
+            for _ in range(args.deep_page):
+                response = await client.get(
+                    "/notification_list",
+                    params=(
+                        {**params, "user_id": str(user_id), "cursor": cursor}
+                        if cursor
+                        else {**params, "user_id": str(user_id)}
+                    ),
+                )
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            cursors[user_id] = cursor
+
+        async def operation(index):
+            user_id = users[index % len(users)]
+            await list_cache.bump(redis, user_id)
+            query = {**params, "user_id": str(user_id)}
+            if cursors[user_id]:
+                query["cursor"] = cursors[user_id]
+            return await _timed(client.get("/notification_list", params=query))
+
+    elif scenario == "list_deep_offset":
+
+        async def operation(index):
+            user_id = users[index % len(users)]
+            await list_cache.bump(redis, user_id)
+            query = {
+                **params,
+                "user_id": str(user_id),
+                "skip": args.deep_page * args.page_size,
+            }
+            return await _timed(client.get("/notification_list", params=query))
+
+    elif scenario in ("get_hit", "get_miss"):
+        ids = [
+            notification_id
+            for user_ids in data.values()
+            for notification_id in user_ids
+        ]
+        rng.shuffle(ids)
+        ids = ids[: max(1, min(len(ids), operations))]
+        if scenario == "get_hit":
+            for notification_id in ids:
+                await client.get(f"/notification{notification_id}")
+
+        async def operation(index):
+            notification_id = ids[index % len(ids)]
+            if scenario == "get_miss":
+                await notification_cache.invalidate(redis, notification_id)
+            return await _timed(client.get(f"/notification{notification_id}"))
+
+    elif scenario == "mark_read":
+        # Каждое уведомление помечается один раз
+        ids = [
+            notification_id
+            for user_ids in data.values()
+            for notification_id in user_ids
+        ]
+        rng.shuffle(ids)
+        operations = min(operations, len(ids))
+
+        async def operation(index):
+            return await _timed(client.post(f"/notification{ids[index]}/mark_read"))
+
+    else:
+        raise ValueError(f"Unknown API scenario: {scenario}")
+
+    return await run_scenario(operations, concurrency, operation)
+
+
+async def run_worker(args, scenario: str, concurrency: int, shards) -> dict:
+    """
+    Выполнить сценарий обработки уведомлений воркером.
+
+    Сценарий "worker" вызывает обработку одного уведомления
+    (`analyze_notification`), "worker_batch" — обработку пакетов по
+    `ANALYSIS_BATCH_SIZE` (`flush_analysis_batch`). Корутины задач выполняются
+    в одном event loop, как в режиме `WORKER_ASYNC_RUNTIME`.
+
+    Аргументы:
+        args (argparse.Namespace): Параметры запуска.
+        scenario (str): "worker" или "worker_batch".
+        concurrency (int): Число одновременно обрабатываемых задач.
+        shards (ShardRouter): Маршрутизатор шардов.
+
+    Возвращаемое значение:
+        dict: Результат `summarize` и jobs_per_second.
+    """
+    from app.celery import tasks
+    from app.config.config import settings
+
+    rng = random.Random(args.seed)
+    jobs = await _create_pending(shards, args.operations, rng)
+
+    if scenario == "worker":
+        batches = [[job] for job in jobs]
+
+        async def operation(index):
+            notification_id, text = jobs[index]
+            started = time.perf_counter()
+            await tasks._process(str(notification_id), text)
+            return time.perf_counter() - started
+
+    else:
+        size = settings.ANALYSIS_BATCH_SIZE
+        batches = [jobs[start : start + size] for start in range(0, len(jobs), size)]
+
+        async def operation(index):
+            started = time.perf_counter()
+            await tasks._process_batch(
+                [str(notification_id) for notification_id, _ in batches[index]]
+            )
+            return time.perf_counter() - started
+
+    result = await run_scenario(len(batches), concurrency, operation)
+    result["jobs_per_second"] = (
+        round(len(jobs) / result["duration"], 3) if result["duration"] else 0.0
+    )
+    return result
+
+
+def _metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": "sqlite (temporary)" if not args.database_url else "custom",
+        "redis": "fakeredis" if args.redis == "fake" else "custom",
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("database_url", "redis", "output", "baseline")
+        },
+    }
+
+
+async def run(args) -> dict:
+    """
+    Подготовить данные и выполнить выбранные сценарии.
+
+    Аргументы:
+        args (argparse.Namespace): Параметры запуска.
+
+    Возвращаемое значение:
+        dict: Отчет с meta, results и, если задана базовая линия, comparison.
+    """
+    from uuid import uuid4
+    from httpx import AsyncClient
+    from app.celery.tasks import celery
+    from app.config.redis_conf import redis
+    from app.db.database import shard_router
+    from app.db.models import Base
+    from app.main import app
+
+    # Задачи Celery остаются в брокере в памяти и не уходят во внешний сервис
+    celery.conf.broker_url = "memory://"
+    celery.conf.result_backend = "cache+memory://"
+    random.seed(args.seed)
+
+    for engine in shard_router.engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    report = {"meta": _metadata(args), "results": {}}
+    rng = random.Random(args.seed)
+    try:
+        async with AsyncClient(app=app, base_url="http://benchmark") as client:
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    if scenario in API_SCENARIOS:
+                        users = [uuid4() for _ in range(args.users)]
+                        data = await seed(shard_router, users, args.depth, rng)
+                        result = await run_api(
+                            args, scenario, concurrency, client, redis, data
+                        )
+                    else:
+                        result = await run_worker(
+                            args, scenario, concurrency, shard_router
+                        )
+                    key = f"{scenario}@{concurrency}"
+                    report["results"][key] = result
+                    latency = result["latency_ms"]
+                    print(
+                        f"{key:<24} {result['throughput']:>10.1f} op/s  "
+                        f"p50 {latency['p50']:>8.2f} ms  p95 {latency['p95']:>8.2f} ms  "
+                        f"p99 {latency['p99']:>8.2f} ms  errors {result['errors']}",
+                        file=sys.stderr,
+                    )
+    finally:
+        await shard_router.dispose()
+    return report
+
+
+def _csv(cast):
+    return lambda value: [cast(item) for item in value.split(",") if item]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Нагрузочные замеры обработчиков API и воркера анализа"
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=_csv(str),
+        default=list(SCENARIOS),
+        help="Сценарии через запятую: " + ", ".join(SCENARIOS),
+    )
+    parser.add_argument("--operations", type=int, default=500)
+    parser.add_argument(
+        "--concurrency", type=_csv(int), default=[10], help="Например, 1,10,50"
+    )
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument(
+        "--depth", type=int, default=200, help="Уведомлений на пользователя"
+    )
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument(
+        "--deep-page", type=int, default=10, help="Номер страницы в глубоких сценариях"
+    )
+    parser.add_argument(
+        "--analyze-latency",
+        type=float,
+        default=0.0,
+        help="Имитируемая задержка движка анализа на вызов в секундах",
+    )
+    parser.add_argument("--analysis-cache", action="store_true")
+    parser.add_argument(
+        "--database-url",
+        help="Отдельная база для замеров; по умолчанию временный SQLite",
+    )
+    parser.add_argument(
+        "--redis", default="fake", help='URL Redis или "fake" для fakeredis в памяти'
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Файл для JSON-отчета; по умолчанию stdout")
+    parser.add_argument(
+        "--baseline", help="JSON-отчет предыдущего запуска для сравнения"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Допустимое ухудшение метрики относительно базовой линии в процентах",
+    )
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error("unknown scenarios: " + ", ".join(sorted(unknown)))
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    report = asyncio.run(run(args))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        # Сравнение осмысленно только при одинаковых объемах данных и задержке анализа
+        differing = sorted(
+            key
+            for key in COMPARABLE_PARAMETERS
+            if baseline.get("meta", {}).get("parameters", {}).get(key)
+            != report["meta"]["parameters"].get(key)
+        )
+        if differing:
+            print(
+                "WARNING baseline was run with different parameters: "
+                + ", ".join(differing),
+                file=sys.stderr,
+            )
+        report["comparison"] = compare(
+            report["results"], baseline.get("results", {}), args.threshold
+        )
+        for scenario, metrics in report["comparison"].items():
+            for metric, values in metrics.items():
+                if values["regression"]:
+                    regressions.append(scenario)
+                    print(
+                        f"REGRESSION {scenario} {metric}: {values['baseline']} -> "
+                        f"{values['current']} ({values['change']:+.1f}%)",
+                        file=sys.stderr,
+                    )
+
+    body = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(body + "\n")
+    else:
+        print(body)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
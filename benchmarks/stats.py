@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """
+    Получить перцентиль по отсортированным замерам (линейная интерполяция).
+
+    Аргументы:
+        ordered (List[float]): Замеры по возрастанию.
+        q (float): Перцентиль от 0 до 100.
+
+    Возвращаемое значение:
+        float: Значение перцентиля или 0.0, если замеров нет.
+    """
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(
+    latencies: List[float], duration: float, errors: int = 0, **extra
+) -> Dict[str, object]:
+    """
+    Свести замеры сценария в результат для JSON-отчета.
+
+    Аргументы:
+        latencies (List[float]): Длительности операций в секундах.
+        duration (float): Общее время сценария в секундах.
+        errors (int): Число неуспешных операций.
+        **extra: Дополнительные поля результата (например, concurrency).
+
+    Возвращаемое значение:
+        dict: operations, errors, duration, throughput (операций в секунду) и
+        latency_ms с p50, p95, p99, mean и max.
+    """
+    ordered = sorted(latencies)
+    return {
+        **extra,
+        "operations": len(ordered),
+        "errors": errors,
+        "duration": round(duration, 6),
+        "throughput": round(len(ordered) / duration, 3) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 3),
+            "p95": round(percentile(ordered, 95) * 1000, 3),
+            "p99": round(percentile(ordered, 99) * 1000, 3),
+            "mean": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+            "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        },
+    }
+
+
+# Метрики сравнения с базовой линией: путь в результате и направление
+# (1 — рост значения означает ухудшение, -1 — улучшение)
+METRICS = {
+    "p50": (("latency_ms", "p50"), 1),
+    "p95": (("latency_ms", "p95"), 1),
+    "p99": (("latency_ms", "p99"), 1),
+    "throughput": (("throughput",), -1),
+}
+
+
+def _get(result: dict, path: tuple) -> Optional[float]:
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> Dict[str, dict]:
+    """
+    Сравнить результаты сценариев с сохраненной базовой линией.
+
+    Аргументы:
+        current (dict): Результаты текущего запуска по сценариям.
+        baseline (dict): Результаты базовой линии по сценариям.
+        threshold (float): Допустимое ухудшение метрики в процентах.
+
+    Возвращаемое значение:
+        Dict[str, dict]: Для каждого сценария, который есть в обоих отчетах,
+        по каждой метрике baseline, current, change (изменение в процентах) и
+        regression (ухудшение больше порога).
+    """
+    report = {}
+    for scenario, result in current.items():
+        if scenario not in baseline:
+            continue
+        metrics = {}
+        for metric, (path, direction) in METRICS.items():
+            old, new = _get(baseline[scenario], path), _get(result, path)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            metrics[metric] = {
+                "baseline": old,
+                "current": new,
+                "change": round(change, 2),
+                "regression": change * direction > threshold,
+            }
+        report[scenario] = metrics
+    return report
@@ -1,16 +1,48 @@
 import pytest_asyncio
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
+from app.config.redis_conf import redis, sync_redis
 from app.db.models import Base
 
-from app.db.database import get_session
+from app.db.database import get_shard_router
+from app.db.sharding import ShardRouter
 
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
+# Префиксы ключей Redis, которые создают приложение и тесты
+TEST_KEY_PATTERNS = (
+    "notifications:*",
+    "notification:*",
+    "analysis:*",
+    "db:pin:*",
+    "outbox:*",
+)
+
+
+def _clear_test_keys():
+    for pattern in TEST_KEY_PATTERNS:
+        keys = list(sync_redis.scan_iter(pattern))
+        if keys:
+            sync_redis.delete(*keys)
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def redis_cleanup():
+    """
+    Фикстура redis_cleanup очищает ключи приложения в Redis до и после каждого теста
+    и закрывает соединения общего асинхронного клиента Redis.
+    Соединения привязаны к event loop теста, а pytest-asyncio создает новый
+    loop для каждого теста, поэтому после теста их нельзя переиспользовать.
+    """
+    _clear_test_keys()
+    yield
+    await redis.connection_pool.disconnect()
+    _clear_test_keys()
+
 
 @pytest_asyncio.fixture()
 async def async_session():
@@ -33,14 +65,11 @@ async def client(async_session):
     """
     Фикстура client предоставляет асинхронного клиента для тестирования FastAPI-приложений.
     Этот клиент позволяет отправлять запросы к приложению в контексте теста,
-    заменяя зависимость для получения сессии базы данных на уже существующую сессию,
-    предоставляемую фикстурой async_session.
+    заменяя маршрутизатор шардов на один шард с базой фикстуры async_session.
     """
-
-    async def override_get_session():
-        yield async_session
-
-    app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_shard_router] = lambda: ShardRouter(
+        {"default": async_sessionmaker(async_session.bind, expire_on_commit=False)}
+    )
 
     async with AsyncClient(app=app, base_url="http://testserver") as client:
         yield client
@@ -0,0 +1,78 @@
+import asyncio
+from uuid import uuid4
+import pytest
+from app.ai.cache import AnalysisCache
+from app.config.redis_conf import redis
+
+
+RESULT = {"category": "info", "confidence": 0.5, "keywords": []}
+
+
+def make_cache() -> AnalysisCache:
+    return AnalysisCache(
+        ttl=60, max_entries=1000, lock_timeout=5, wait_timeout=2, poll_interval=0.01
+    )
+
+
+class SlowAnalyzer:
+    """
+    Анализатор, который запоминает переданные тексты и отвечает с задержкой.
+    """
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.texts = []
+
+    async def analyze(self, text: str) -> dict:
+        self.texts.append(text)
+        await asyncio.sleep(self.delay)
+        return RESULT
+
+    async def analyze_batch(self, texts: list) -> list:
+        self.texts.extend(texts)
+        await asyncio.sleep(self.delay)
+        return [RESULT for _ in texts]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_analyze_calls_backend_once():
+    """
+    Этот тест проверяет дедупликацию одновременных запросов на анализ одного текста.
+
+    Ожидаемое поведение:
+    Пять одновременных вызовов для одного текста (в том числе из разных экземпляров кэша, как в разных процессах) приводят к одному вызову анализатора, и все получают его результат.
+    """
+    analyzer = SlowAnalyzer()
+    text = f"same text {uuid4()}"
+    caches = [make_cache(), make_cache()]
+
+    results = await asyncio.gather(
+        *(
+            caches[index % 2].analyze(redis, text, analyzer.analyze)
+            for index in range(5)
+        )
+    )
+    assert results == [RESULT] * 5
+    assert analyzer.texts == [text]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_batches_analyze_each_text_once():
+    """
+    Этот тест проверяет дедупликацию между одновременными пакетами анализа.
+
+    Ожидаемое поведение:
+    Два пакета разных процессов с пересекающимися текстами и одиночный вызов анализируют каждый уникальный текст ровно один раз; повтор текста внутри пакета тоже анализируется один раз.
+    """
+    analyzer = SlowAnalyzer()
+    shared, first, second = (f"{name} {uuid4()}" for name in ("shared", "a", "b"))
+
+    results = await asyncio.gather(
+        make_cache().analyze_many(
+            redis, [shared, first, shared.upper()], analyzer.analyze_batch
+        ),
+        make_cache().analyze_many(redis, [second, shared], analyzer.analyze_batch),
+        make_cache().analyze(redis, first, analyzer.analyze),
+    )
+    assert results == [[RESULT] * 3, [RESULT] * 2, RESULT]
+    assert sorted(analyzer.texts) == sorted([shared, first, second])
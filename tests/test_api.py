@@ -1,8 +1,22 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
 import pytest
 from uuid import uuid4
-from app.db.models import Notification
+from app.ai.cache import analysis_cache
+from app.cache.invalidation import notifications_changed
+from app.cache.list_cache import list_cache
+from app.celery.outbox import outbox_relay
+from app.config.config import settings
+from app.config.redis_conf import redis
+from app.db.database import get_shard_router
+from app.db.models import Base, Notification, NotificationKeyword
+from app.db.sharding import ShardRouter, new_notification_id
+from app.main import app
+from app.pydantic_schemas.schemas import NotificationRead
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 
 @pytest.mark.asyncio
@@ -106,3 +120,688 @@ async def test_list_notifications(client: AsyncClient, async_session: AsyncSessi
     response = await client.get("/notification_list", params={"user_id": user_id})
     assert response.status_code == 200
     assert len(response.json()) == 3
+
+
+@pytest.mark.asyncio
+async def test_analysis_cache_stats(client: AsyncClient):
+    """
+    Этот тест проверяет эндпоинт статистики кэша AI-анализа.
+
+    Ожидаемое поведение:
+    API должен вернуть статус-код 200 OK и счетчики попаданий, промахов и долю попаданий; повторный анализ того же текста с другим регистром и пробелами учитывается как попадание.
+    """
+    response = await client.get("/analysis_cache_stats")
+    assert response.status_code == 200
+    before = response.json()
+    assert {"hits", "misses", "deduplicated", "entries", "hit_ratio"} <= before.keys()
+
+    calls = []
+
+    async def analyzer(text):
+        calls.append(text)
+        return {"category": "info", "confidence": 0.5, "keywords": []}
+
+    text = f"Cache  me {uuid4()}"
+    await analysis_cache.analyze(redis, text, analyzer)
+    await analysis_cache.analyze(redis, f"  {text.upper()} ", analyzer)
+    assert calls == [text]
+
+    after = (await client.get("/analysis_cache_stats")).json()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert after["entries"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_list_notifications_cursor(
+    client: AsyncClient, async_session: AsyncSession
+):
+    """
+    Этот тест проверяет курсорную пагинацию списка уведомлений. Он добавляет пять уведомлений и обходит список страницами по два элемента, передавая курсор из заголовка X-Next-Cursor.
+
+    Ожидаемое поведение:
+    Все уведомления возвращаются ровно один раз, от новых к старым, а у последней страницы нет курсора.
+
+    Данные:
+    user_id: UUID пользователя, для которого нужно получить список уведомлений.
+    """
+    user_id = uuid4()
+    for i in range(5):
+        async_session.add(
+            Notification(user_id=user_id, title=f"Title {i}", text="Some text")
+        )
+    await async_session.commit()
+
+    seen = []
+    params = {"user_id": user_id, "limit": 2}
+    while True:
+        response = await client.get("/notification_list", params=params)
+        assert response.status_code == 200
+        seen.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+
+    assert len({item["id"] for item in seen}) == 5
+    keys = [(item["created_at"], item["id"]) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_list_notifications_cached_response(
+    client: AsyncClient, async_session: AsyncSession
+):
+    """
+    Этот тест проверяет, что страница списка из кэша отдается теми же байтами и с тем же курсором, что и собранная из базы данных.
+
+    Ожидаемое поведение:
+    Повторный запрос возвращает идентичное тело и заголовок X-Next-Cursor, а элементы соответствуют схеме NotificationRead.
+
+    Данные:
+    user_id: UUID пользователя, для которого нужно получить список уведомлений.
+    """
+    user_id = uuid4()
+    for i in range(3):
+        async_session.add(
+            Notification(user_id=user_id, title=f"Заголовок {i}", text="Текст")
+        )
+    await async_session.commit()
+
+    params = {"user_id": user_id, "limit": 2}
+    first = await client.get("/notification_list", params=params)
+    second = await client.get("/notification_list", params=params)
+    assert first.headers["content-type"] == "application/json"
+    assert second.content == first.content
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert set(first.json()[0]) == set(NotificationRead.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_list_cache_invalidated_on_mark_read(
+    client: AsyncClient, async_session: AsyncSession
+):
+    """
+    Этот тест проверяет, что кэш списка уведомлений сбрасывается при пометке уведомления как прочитанного. Он запрашивает список (заполняя кэш), помечает уведомление прочитанным и запрашивает список повторно.
+
+    Ожидаемое поведение:
+    Повторный запрос списка возвращает уведомление с заполненным полем read_at, а не закешированную копию.
+
+    Данные:
+    user_id: UUID пользователя, которому принадлежит уведомление.
+    """
+    user_id = uuid4()
+    notif = Notification(user_id=user_id, title="Cached", text="Some text")
+    async_session.add(notif)
+    await async_session.commit()
+
+    response = await client.get("/notification_list", params={"user_id": user_id})
+    assert response.json()[0]["read_at"] is None
+
+    await client.post(f"/notification{notif.id}/mark_read")
+
+    response = await client.get("/notification_list", params={"user_id": user_id})
+    assert response.json()[0]["read_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_notification_cache_invalidated_on_mark_read(
+    client: AsyncClient, async_session: AsyncSession
+):
+    """
+    Этот тест проверяет, что кэш отдельного уведомления сбрасывается при пометке уведомления как прочитанного.
+
+    Ожидаемое поведение:
+    Первый запрос заполняет кэш, повторный запрос после пометки возвращает уведомление с заполненным полем read_at.
+
+    Данные:
+    notif.id: UUID уведомления, которое запрашивается и помечается как прочитанное.
+    """
+    notif = Notification(user_id=uuid4(), title="Poll me", text="Some text")
+    async_session.add(notif)
+    await async_session.commit()
+
+    response = await client.get(f"/notification{notif.id}")
+    assert response.json()["read_at"] is None
+
+    await client.post(f"/notification{notif.id}/mark_read")
+
+    response = await client.get(f"/notification{notif.id}")
+    assert response.json()["read_at"] is not None
+
+    response = await client.get("/notifications/cache_stats")
+    assert response.status_code == 200
+    assert response.json()["local_hits"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_notification_etag(
+    client: AsyncClient, async_session: AsyncSession, monkeypatch
+):
+    """
+    Этот тест проверяет условное получение уведомления по ETag.
+
+    Ожидаемое поведение:
+    С совпадающим If-None-Match возвращается 304 без тела; при попадании в кэш в памяти процесса ответ отдается без обращения к Redis и базе (уведомление, удаленное из базы в обход API, не читается); после пометки прочитанным ETag меняется и прежний ETag дает полный ответ; запрос несуществующего ID не создает ключей в Redis.
+    """
+    notif = Notification(user_id=uuid4(), title="Poll me", text="Some text")
+    async_session.add(notif)
+    await async_session.commit()
+
+    response = await client.get(f"/notification{notif.id}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    redis_calls = []
+    original_get = redis.get
+
+    async def counted_get(*args, **kwargs):
+        redis_calls.append(args)
+        return await original_get(*args, **kwargs)
+
+    monkeypatch.setattr(redis, "get", counted_get)
+    response = await client.get(
+        f"/notification{notif.id}", headers={"If-None-Match": f'"other", W/{etag}'}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag and response.content == b""
+    assert redis_calls == []
+    monkeypatch.undo()
+
+    keys = set(await redis.keys())
+    response = await client.get(f"/notification{uuid4()}")
+    assert response.status_code == 404
+    assert set(await redis.keys()) == keys
+
+    await client.post(f"/notification{notif.id}/mark_read")
+    response = await client.get(
+        f"/notification{notif.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["read_at"] is not None
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+
+    await async_session.delete(notif)
+    await async_session.commit()
+    response = await client.get(
+        f"/notification{notif.id}", headers={"If-None-Match": new_etag}
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_notifications_changed_uses_one_round_trip(monkeypatch):
+    """
+    Этот тест проверяет инвалидацию кэшей после изменения уведомлений.
+
+    Ожидаемое поведение:
+    Поколение кэша списков увеличивается, уведомление удаляется из кэша, и все команды отправляются в Redis одним pipeline.
+    """
+    user_id, notification_id = uuid4(), uuid4()
+    await redis.set(f"notification:{notification_id}", "cached")
+    executed = []
+    original = type(redis.pipeline()).execute
+
+    async def execute(pipe, *args, **kwargs):
+        executed.append(len(pipe))
+        return await original(pipe, *args, **kwargs)
+
+    monkeypatch.setattr(type(redis.pipeline()), "execute", execute)
+    await notifications_changed(redis, [user_id, user_id], [notification_id])
+
+    assert executed == [3]
+    assert await list_cache.get_generation(redis, user_id) == 1
+    assert not await redis.exists(f"notification:{notification_id}")
+
+
+@pytest.mark.asyncio
+async def test_list_notifications_etag(client: AsyncClient):
+    """
+    Этот тест проверяет условное получение списка уведомлений по ETag.
+
+    Ожидаемое поведение:
+    Повторный запрос с тем же ETag дает 304; у страниц с разными параметрами разные ETag; создание уведомления меняет ETag списка.
+    """
+    user_id = str(uuid4())
+    payload = {"user_id": user_id, "title": "First", "text": "text"}
+    await client.post("/create_notification", json=payload)
+
+    response = await client.get("/notification_list", params={"user_id": user_id})
+    etag = response.headers["ETag"]
+    response = await client.get(
+        "/notification_list",
+        params={"user_id": user_id},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+    response = await client.get(
+        "/notification_list",
+        params={"user_id": user_id, "limit": 5},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+    await client.post("/create_notification", json={**payload, "title": "Second"})
+    response = await client.get(
+        "/notification_list",
+        params={"user_id": user_id},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert [item["title"] for item in response.json()] == ["Second", "First"]
+
+
+@pytest.mark.asyncio
+async def test_create_notifications_bulk(client: AsyncClient):
+    """
+    Этот тест проверяет пакетное создание уведомлений в форматах JSON и NDJSON. Один из элементов JSON-массива невалиден.
+
+    Ожидаемое поведение:
+    Валидные элементы сохраняются и получают id, невалидный элемент возвращается с описанием ошибки, не прерывая загрузку.
+
+    Данные:
+    user_id: UUID пользователя, для которого создаются уведомления.
+    """
+    user_id = str(uuid4())
+    payload = [
+        {"user_id": user_id, "title": "First", "text": "error in system"},
+        {"user_id": user_id, "title": "Broken"},
+        {"user_id": user_id, "title": "Third", "text": "all good"},
+    ]
+    response = await client.post("/notifications/bulk", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 1
+    assert data["items"][1]["id"] is None
+    assert data["items"][1]["error"]
+
+    ndjson = "\n".join(json.dumps(item) for item in [payload[0], payload[2]])
+    response = await client.post(
+        "/notifications/bulk",
+        content=ndjson,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["created"] == 2
+
+    response = await client.get(
+        "/notification_list", params={"user_id": user_id, "limit": 10}
+    )
+    assert len(response.json()) == 4
+
+
+@pytest.mark.asyncio
+async def test_mark_as_read_bulk(client: AsyncClient, async_session: AsyncSession):
+    """
+    Этот тест проверяет пакетную пометку уведомлений пользователя как прочитанных. Одно из уведомлений уже прочитано заранее.
+
+    Ожидаемое поведение:
+    Помечаются только непрочитанные уведомления пользователя, уведомления другого пользователя не затрагиваются.
+
+    Данные:
+    user_id: UUID пользователя, уведомления которого помечаются.
+    """
+    user_id = uuid4()
+    other = Notification(user_id=uuid4(), title="Other", text="Some text")
+    async_session.add(other)
+    for i in range(3):
+        async_session.add(
+            Notification(user_id=user_id, title=f"Title {i}", text="Some text")
+        )
+    await async_session.commit()
+
+    response = await client.post(
+        "/notifications/bulk_mark_read", json={"user_id": str(user_id)}
+    )
+    assert response.status_code == 200
+    assert response.json()["updated"] == 3
+
+    response = await client.post(
+        "/notifications/bulk_mark_read", json={"user_id": str(user_id)}
+    )
+    assert response.json()["updated"] == 0
+
+    response = await client.post("/notifications/bulk_mark_read", json={})
+    assert response.status_code == 422
+
+    response = await client.post(
+        "/notifications/bulk_mark_read",
+        json={
+            "ids": [str(uuid4()) for _ in range(settings.BULK_INSERT_CHUNK_SIZE + 1)]
+        },
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_mark_as_read_bulk_by_ids_updates_owning_shards(
+    client: AsyncClient, tmp_path
+):
+    """
+    Этот тест проверяет пакетную пометку уведомлений по списку ID на двух шардах.
+
+    Ожидаемое поведение:
+    ID раскладываются по шардам, UPDATE выполняется только на шардах, которым принадлежат уведомления; уведомление со старым ID, лежащее не на вычисленном шарде, находится на остальных шардах.
+    """
+    shards = ShardRouter.from_urls(
+        {name: f"sqlite+aiosqlite:///{tmp_path / name}.sqlite3" for name in "ab"}
+    )
+    updates = {}
+    for name, (_, engine) in shards.named_engines().items():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        def count(conn, cursor, statement, *args, name=name):
+            if statement.startswith("UPDATE"):
+                updates[name] = updates.get(name, 0) + 1
+
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+    app.dependency_overrides[get_shard_router] = lambda: shards
+
+    ids = {name: [] for name in shards.names}
+    while not all(len(shard_ids) >= 2 for shard_ids in ids.values()):
+        user_id = uuid4()
+        name = shards.shard_for_user(user_id)
+        notification = Notification(
+            id=new_notification_id(user_id), user_id=user_id, title="T", text="x"
+        )
+        async with shards.session_maker(name)() as session:
+            session.add(notification)
+            await session.commit()
+        ids[name].append(str(notification.id))
+    legacy_id = uuid4()
+    legacy_shard = next(
+        name
+        for name in shards.names
+        if name != shards.shard_for_notification(legacy_id)
+    )
+    async with shards.session_maker(legacy_shard)() as session:
+        session.add(Notification(id=legacy_id, user_id=uuid4(), title="T", text="x"))
+        await session.commit()
+
+    try:
+        response = await client.post(
+            "/notifications/bulk_mark_read", json={"ids": ids["a"] * 2}
+        )
+        assert response.status_code == 200
+        assert sorted(response.json()["ids"]) == sorted(ids["a"])
+        assert updates == {"a": 1}
+
+        updates.clear()
+        response = await client.post(
+            "/notifications/bulk_mark_read",
+            json={"ids": ids["a"] + ids["b"] + [str(legacy_id)]},
+        )
+        assert sorted(response.json()["ids"]) == sorted(ids["b"] + [str(legacy_id)])
+        assert updates == {
+            "a": 1 + (legacy_shard == "a"),
+            "b": 1 + (legacy_shard == "b"),
+        }
+    finally:
+        await shards.dispose()
+
+
+@pytest.mark.asyncio
+async def test_notification_counts(client: AsyncClient):
+    """
+    Этот тест проверяет счетчики уведомлений пользователя. Он создает два уведомления через API и помечает одно из них как прочитанное.
+
+    Ожидаемое поведение:
+    Эндпоинт счетчиков возвращает два уведомления всего, одно непрочитанное и два в статусе pending.
+
+    Данные:
+    user_id: UUID пользователя, для которого создаются уведомления.
+    """
+    user_id = str(uuid4())
+    ids = []
+    for i in range(2):
+        response = await client.post(
+            "/create_notification",
+            json={"user_id": user_id, "title": f"Title {i}", "text": "Some text"},
+        )
+        ids.append(response.json()["id"])
+
+    await client.post(f"/notification{ids[0]}/mark_read")
+    await client.post(f"/notification{ids[0]}/mark_read")
+
+    response = await client.get("/notifications/counts", params={"user_id": user_id})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert data["unread"] == 1
+    assert data["by_status"] == {"pending": 2}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_mark_read_counts_once(client: AsyncClient):
+    """
+    Этот тест проверяет параллельную пометку одного уведомления как прочитанного.
+
+    Ожидаемое поведение:
+    Уведомление помечает только один запрос: счетчик непрочитанных уменьшается один раз, время прочтения не перезаписывается.
+    """
+    user_id = str(uuid4())
+    ids = []
+    for i in range(2):
+        response = await client.post(
+            "/create_notification",
+            json={"user_id": user_id, "title": f"Title {i}", "text": "Some text"},
+        )
+        ids.append(response.json()["id"])
+
+    responses = await asyncio.gather(
+        *(client.post(f"/notification{ids[0]}/mark_read") for _ in range(3))
+    )
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["read_at"] for response in responses}) == 1
+
+    response = await client.get("/notifications/counts", params={"user_id": user_id})
+    assert response.json()["unread"] == 1
+    assert response.json()["unread_by_category"] == {}
+
+
+@pytest.mark.asyncio
+async def test_export_notifications(client: AsyncClient, async_session: AsyncSession):
+    """
+    Этот тест проверяет потоковую выгрузку уведомлений пользователя в формате NDJSON с фильтром по состоянию прочтения.
+
+    Ожидаемое поведение:
+    Без фильтра выгружаются все уведомления пользователя, с фильтром is_read=false — только непрочитанные.
+
+    Данные:
+    user_id: UUID пользователя, уведомления которого выгружаются.
+    """
+    user_id = uuid4()
+    for i in range(3):
+        async_session.add(
+            Notification(user_id=user_id, title=f"Title {i}", text="Some text")
+        )
+    read = Notification(user_id=user_id, title="Read", text="Some text")
+    read.read_at = datetime.now(timezone.utc)
+    async_session.add(read)
+    await async_session.commit()
+
+    response = await client.get("/notifications/export", params={"user_id": user_id})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 4
+
+    response = await client.get(
+        "/notifications/export", params={"user_id": user_id, "is_read": False}
+    )
+    assert len(response.text.splitlines()) == 3
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay(client: AsyncClient, async_session: AsyncSession):
+    """
+    Этот тест проверяет, что создание уведомления записывает запрос на анализ в outbox, а ретранслятор публикует его и помечает отправленным.
+
+    Ожидаемое поведение:
+    После создания в outbox одно неотправленное сообщение; после прохода ретранслятора оно опубликовано с ID и текстом уведомления, а очередь outbox пуста.
+
+    Данные:
+    published: Список сообщений, переданных в функцию публикации.
+    """
+    payload = {"user_id": str(uuid4()), "title": "Outbox", "text": "error in system"}
+    notification_id = (await client.post("/create_notification", json=payload)).json()[
+        "id"
+    ]
+    response = await client.get("/notifications/outbox_stats")
+    assert response.json()["pending"] == 1
+
+    published = []
+    session_maker = async_sessionmaker(async_session.bind, expire_on_commit=False)
+    count = await outbox_relay.drain_once(session_maker, redis, published.extend)
+    assert count == 1
+    assert [(str(item_id), text) for item_id, text in published] == [
+        (notification_id, payload["text"])
+    ]
+
+    response = await client.get("/notifications/outbox_stats")
+    assert response.json()["pending"] == 0
+    assert response.json()["published"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_notification_digest(client: AsyncClient):
+    """
+    Этот тест проверяет сводку уведомлений пользователя по суткам. Он создает два уведомления и помечает одно как прочитанное.
+
+    Ожидаемое поведение:
+    Последний интервал сводки содержит два уведомления, одно прочитанное и долю прочитанных 0.5; неизвестная детализация отклоняется с кодом 400.
+
+    Данные:
+    user_id: UUID пользователя, для которого строится сводка.
+    """
+    user_id = str(uuid4())
+    ids = []
+    for title in ("First", "Second"):
+        response = await client.post(
+            "/create_notification",
+            json={"user_id": user_id, "title": title, "text": "all good"},
+        )
+        ids.append(response.json()["id"])
+    await client.post(f"/notification{ids[0]}/mark_read")
+
+    response = await client.get(
+        "/notifications/digest", params={"user_id": user_id, "granularity": "day"}
+    )
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert len(buckets) == 7
+    assert buckets[-1]["total"] == 2
+    assert buckets[-1]["read"] == 1
+    assert buckets[-1]["read_rate"] == 0.5
+
+    response = await client.get(
+        "/notifications/digest", params={"user_id": user_id, "granularity": "week"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_notifications_filters(
+    client: AsyncClient, async_session: AsyncSession
+):
+    """
+    Этот тест проверяет фильтры списка уведомлений по категории, ключевому слову и признаку прочтения.
+
+    Ожидаемое поведение:
+    Каждый фильтр и их сочетание возвращают только подходящие уведомления пользователя; ключевое слово сравнивается без учета регистра.
+
+    Данные:
+    user_id: UUID пользователя, для которого нужно получить список уведомлений.
+    """
+    user_id = uuid4()
+    payment = Notification(
+        user_id=user_id, title="Payment", text="Payment failed", category="critical"
+    )
+    login = Notification(
+        user_id=user_id, title="Login", text="Login failed", category="critical"
+    )
+    info = Notification(
+        user_id=user_id,
+        title="Info",
+        text="Payment received",
+        category="info",
+        read_at=datetime.now(timezone.utc),
+    )
+    async_session.add_all([payment, login, info])
+    await async_session.flush()
+    async_session.add_all(
+        [
+            NotificationKeyword(
+                keyword=keyword, user_id=user_id, notification_id=notification.id
+            )
+            for notification, keyword in (
+                (payment, "payment"),
+                (payment, "failed"),
+                (login, "failed"),
+                (info, "payment"),
+            )
+        ]
+    )
+    await async_session.commit()
+
+    async def titles(**filters):
+        response = await client.get(
+            "/notification_list", params={"user_id": user_id, **filters}
+        )
+        assert response.status_code == 200
+        return sorted(item["title"] for item in response.json())
+
+    assert await titles(category="critical") == ["Login", "Payment"]
+    assert await titles(keyword="PAYMENT") == ["Info", "Payment"]
+    assert await titles(category="critical", keyword="payment") == ["Payment"]
+    assert await titles(is_read="false") == ["Login", "Payment"]
+    assert await titles(is_read="true") == ["Info"]
+
+
+@pytest.mark.asyncio
+async def test_metrics(client: AsyncClient, async_session: AsyncSession):
+    """
+    Этот тест проверяет выдачу метрик Prometheus.
+
+    Ожидаемое поведение:
+    В метриках есть длительность запросов по шаблону маршрута, промахи и попадания кэша списка и возраст самого старого ожидающего уведомления.
+    """
+    user_id = uuid4()
+    async_session.add(
+        Notification(
+            user_id=user_id,
+            title="Old",
+            text="x",
+            created_at=datetime.now(timezone.utc).replace(tzinfo=None)
+            - timedelta(hours=1),
+        )
+    )
+    await async_session.commit()
+    for _ in range(2):
+        response = await client.get(
+            "/notification_list", params={"user_id": str(user_id)}
+        )
+        assert response.status_code == 200
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    samples = {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in response.text.splitlines()
+        if line and not line.startswith("#")
+    }
+    assert (
+        samples[
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/notification_list",status="200"}'
+        ]
+        >= 2
+    )
+    assert samples['list_cache_requests_total{outcome="hit"}'] >= 1
+    assert samples['list_cache_requests_total{outcome="miss"}'] >= 1
+    assert samples["notifications_oldest_pending_age_seconds"] >= 3600
+    assert not any('route="/metrics"' in sample for sample in samples)
@@ -0,0 +1,54 @@
+import pytest
+from benchmarks.stats import compare, percentile, summarize
+
+
+def test_summarize_percentiles():
+    """
+    Этот тест проверяет сводку замеров сценария нагрузочного теста.
+
+    Ожидаемое поведение:
+    Перцентили считаются с интерполяцией по отсортированным замерам, пропускная способность — по общему времени сценария.
+    """
+    assert percentile([], 50) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == pytest.approx(2.5)
+
+    result = summarize(
+        [i / 1000 for i in range(100, 0, -1)], duration=2.0, errors=1, concurrency=4
+    )
+    assert result["operations"] == 100
+    assert result["errors"] == 1
+    assert result["concurrency"] == 4
+    assert result["throughput"] == 50.0
+    assert result["latency_ms"]["p50"] == pytest.approx(50.5)
+    assert result["latency_ms"]["p99"] == pytest.approx(99.01)
+    assert result["latency_ms"]["max"] == 100.0
+
+
+def test_compare_with_baseline():
+    """
+    Этот тест проверяет сравнение результатов с базовой линией.
+
+    Ожидаемое поведение:
+    Рост задержки и падение пропускной способности больше порога отмечаются как регрессия; сценарии, которых нет в базовой линии, не сравниваются.
+    """
+    baseline = {
+        "list@10": {
+            "throughput": 100.0,
+            "latency_ms": {"p50": 10, "p95": 20, "p99": 30},
+        }
+    }
+    current = {
+        "list@10": {
+            "throughput": 80.0,
+            "latency_ms": {"p50": 10.5, "p95": 25, "p99": 30},
+        },
+        "get@10": {"throughput": 1.0, "latency_ms": {"p50": 1, "p95": 1, "p99": 1}},
+    }
+    report = compare(current, baseline, threshold=10)
+    assert list(report) == ["list@10"]
+    metrics = report["list@10"]
+    assert metrics["p50"]["change"] == 5.0 and not metrics["p50"]["regression"]
+    assert metrics["p95"]["regression"]
+    assert not metrics["p99"]["regression"]
+    assert metrics["throughput"]["change"] == -20.0
+    assert metrics["throughput"]["regression"]
@@ -0,0 +1,75 @@
+import pytest
+from app.ai.classifier import KeywordClassifier
+
+
+RULES = [
+    {
+        "category": "critical",
+        "keywords": ["error", "failed"],
+        "confidence": [0.7, 0.95],
+    },
+    {"category": "warning", "keywords": ["warning"], "confidence": [0.6, 0.9]},
+]
+DEFAULT = {"category": "info", "confidence": [0.8, 0.99]}
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_categories():
+    """
+    Этот тест проверяет пакетную классификацию текстов по ключевым словам.
+
+    Ожидаемое поведение:
+    Результаты возвращаются в порядке входных текстов; ключевые слова ищутся без учета регистра,
+    а при совпадении нескольких категорий выбирается более приоритетная (critical раньше warning).
+    """
+    classifier = KeywordClassifier(RULES, DEFAULT)
+    results = await classifier.analyze_batch(
+        [
+            "Disk ERROR on node",
+            "Warning: low memory",
+            "warning, job failed",
+            "All systems nominal",
+        ]
+    )
+    assert [result["category"] for result in results] == [
+        "critical",
+        "warning",
+        "critical",
+        "info",
+    ]
+    assert 0.7 <= results[0]["confidence"] <= 0.95
+
+
+@pytest.mark.asyncio
+async def test_overlapping_keywords_keep_priority():
+    """
+    Этот тест проверяет выбор категории, когда ключевые слова разных правил пересекаются в тексте.
+
+    Ожидаемое поведение:
+    Совпадение менее приоритетного слова не скрывает пересекающееся с ним более приоритетное: категория та же, что при поиске каждого правила по отдельности.
+    """
+    rules = [
+        {"category": "critical", "keywords": ["error"], "confidence": [0.7, 0.95]},
+        {"category": "warning", "keywords": ["xerr"], "confidence": [0.6, 0.9]},
+    ]
+    classifier = KeywordClassifier(rules, DEFAULT)
+    results = await classifier.analyze_batch(["xerror", "xerr", "XERROR!"])
+    assert [result["category"] for result in results] == [
+        "critical",
+        "warning",
+        "critical",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_analyze_keywords_from_tokens():
+    """
+    Этот тест проверяет, что ключевые слова результата выбираются из слов текста.
+
+    Ожидаемое поведение:
+    Для текста из двух слов возвращаются оба слова, для пустого текста — пустой список.
+    """
+    classifier = KeywordClassifier(RULES, DEFAULT)
+    result = await classifier.analyze("hello world")
+    assert sorted(result["keywords"]) == ["hello", "world"]
+    assert (await classifier.analyze(""))["keywords"] == []
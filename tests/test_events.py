@@ -0,0 +1,140 @@
+import asyncio
+import json
+from uuid import uuid4
+import pytest
+from starlette.requests import Request
+from app.api.routes import notification_events
+from app.config.redis_conf import redis
+from app.realtime.events import (
+    CHANNEL,
+    EventHub,
+    event_hub,
+    publish_status_events,
+    read_missed,
+)
+
+
+def _event(user_id, status: str) -> dict:
+    return {
+        "notification_id": uuid4(),
+        "user_id": user_id,
+        "processing_status": status,
+        "category": None,
+    }
+
+
+async def _wait_subscribed(count: int):
+    for _ in range(100):
+        if dict(await redis.pubsub_numsub(CHANNEL)).get(CHANNEL, 0) >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("event hub did not subscribe")
+
+
+async def _subscribers() -> int:
+    return dict(await redis.pubsub_numsub(CHANNEL)).get(CHANNEL, 0)
+
+
+@pytest.mark.asyncio
+async def test_event_hub_fans_out_over_one_subscription():
+    """
+    Этот тест проверяет раздачу событий клиентам через одну подписку процесса.
+
+    Ожидаемое поведение:
+    Несколько клиентов разных пользователей используют одну подписку на канал; каждый клиент получает события только своего пользователя.
+    """
+    hub = EventHub(queue_size=10)
+    first_user, second_user = uuid4(), uuid4()
+    before = await _subscribers()
+    try:
+        first = hub.subscribe(redis, first_user)
+        task = hub._task
+        second = hub.subscribe(redis, first_user)
+        other = hub.subscribe(redis, second_user)
+        assert hub._task is task
+        await _wait_subscribed(before + 1)
+        assert await _subscribers() == before + 1
+
+        await publish_status_events(
+            redis,
+            [_event(first_user, "processing"), _event(second_user, "completed")],
+        )
+        for subscription, status in (
+            (first, "processing"),
+            (second, "processing"),
+            (other, "completed"),
+        ):
+            _, data = await asyncio.wait_for(subscription.queue.get(), 1)
+            assert json.loads(data)["processing_status"] == status
+            assert subscription.queue.empty()
+
+        hub.unsubscribe(first_user, first)
+        hub.unsubscribe(first_user, second)
+        assert str(first_user) not in hub._subscribers
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_event_hub_marks_slow_subscription_overflowed():
+    """
+    Этот тест проверяет переполнение очереди клиента, который не успевает читать события.
+
+    Ожидаемое поведение:
+    Событие сверх размера очереди отбрасывается, а подписка помечается переполненной, чтобы клиент переподключился с Last-Event-ID; клиент, который читает вовремя, получает все события.
+    """
+    hub = EventHub(queue_size=1)
+    user_id = uuid4()
+    try:
+        slow = hub.subscribe(redis, user_id)
+        fast = hub.subscribe(redis, user_id)
+        received = []
+        for event_id in ("1-0", "2-0"):
+            hub._dispatch({"id": event_id, "user_id": str(user_id), "data": "{}"})
+            received.append(fast.queue.get_nowait()[0])
+
+        assert received == ["1-0", "2-0"] and not fast.overflowed
+        assert slow.overflowed
+        assert slow.queue.get_nowait()[0] == "1-0" and slow.queue.empty()
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_notification_events_resume_from_last_event_id():
+    """
+    Этот тест проверяет возобновление потока SSE по Last-Event-ID.
+
+    Ожидаемое поведение:
+    read_missed возвращает события строго после переданного ID; поток сначала отдает пропущенные события, затем новые из общей подписки, без повторов.
+    """
+    user_id = uuid4()
+    before = await _subscribers()
+    await publish_status_events(
+        redis,
+        [_event(user_id, status) for status in ("pending", "processing", "completed")],
+    )
+    missed = await read_missed(redis, user_id, "0-0")
+    ids = [event_id for event_id, _ in missed]
+    assert len(ids) == 3
+    assert [event_id for event_id, _ in await read_missed(redis, user_id, ids[0])] == (
+        ids[1:]
+    )
+
+    request = Request({"type": "http", "method": "GET", "headers": []})
+    response = await notification_events(request, user_id, ids[0], None, redis)
+    stream = response.body_iterator
+    try:
+        assert [await stream.__anext__() for _ in range(2)] == [
+            f"id: {event_id}\nevent: status\ndata: {data}\n\n"
+            for event_id, data in missed[1:]
+        ]
+        await _wait_subscribed(before + 1)
+        await publish_status_events(redis, [_event(user_id, "failed")])
+        chunk = await asyncio.wait_for(stream.__anext__(), 1)
+        assert '"processing_status": "failed"' in chunk
+        assert chunk.startswith("id: ") and ids[-1] not in chunk
+    finally:
+        await stream.aclose()
+        await event_hub.close()
+    assert str(user_id) not in event_hub._subscribers
@@ -0,0 +1,61 @@
+import uuid
+import pytest
+from sqlalchemy import inspect, text
+from app.db.migrations import upgrade_shards
+from app.db.models import Notification
+from app.db.sharding import ShardRouter
+
+
+@pytest.mark.asyncio
+async def test_upgrade_adds_columns_and_indexes(tmp_path):
+    """
+    Этот тест проверяет обновление схемы базы, созданной до появления новых столбцов и индексов.
+
+    Ожидаемое поведение:
+    В существующую таблицу уведомлений добавляются attempts (0 для старых строк) и last_attempt_at, создаются все индексы модели, замененный индекс удаляется; повторный запуск ничего не меняет.
+    """
+    shards = ShardRouter.from_urls(
+        {"default": f"sqlite+aiosqlite:///{tmp_path / 'old.sqlite3'}"}
+    )
+    engine = shards.engines[0]
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE notifications (id CHAR(32) PRIMARY KEY, "
+                "user_id CHAR(32) NOT NULL, title VARCHAR NOT NULL, "
+                "text VARCHAR NOT NULL, created_at DATETIME, read_at DATETIME, "
+                "category VARCHAR, confidence FLOAT, processing_status VARCHAR)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE INDEX ix_notifications_user_created_id "
+                "ON notifications (user_id, created_at DESC, id)"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO notifications (id, user_id, title, text) "
+                "VALUES (:id, :user_id, 'Old', 'text')"
+            ),
+            {"id": uuid.uuid4().hex, "user_id": uuid.uuid4().hex},
+        )
+
+    def schema(conn):
+        inspector = inspect(conn)
+        return (
+            {column["name"] for column in inspector.get_columns("notifications")},
+            {index["name"] for index in inspector.get_indexes("notifications")},
+        )
+
+    try:
+        for _ in range(2):
+            await upgrade_shards(shards)
+            async with engine.connect() as conn:
+                columns, indexes = await conn.run_sync(schema)
+                attempts = await conn.scalar(text("SELECT attempts FROM notifications"))
+            assert {"attempts", "last_attempt_at"} <= columns
+            assert indexes == {index.name for index in Notification.__table__.indexes}
+            assert attempts == 0
+    finally:
+        await shards.dispose()
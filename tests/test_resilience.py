@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from app.ai.classifier import AnalyzerBackend
+from app.ai.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ResilientAnalyzer,
+)
+
+
+RESULT = {"category": "info", "confidence": 0.9, "keywords": []}
+
+
+class ScriptedBackend(AnalyzerBackend):
+    """
+    Движок анализа, который на каждый вызов берет следующую задержку из сценария;
+    None в сценарии означает ошибку.
+    """
+
+    def __init__(self, delays: list):
+        self.delays = list(delays)
+        self.calls = 0
+
+    async def analyze_batch(self, texts):
+        self.calls += 1
+        delay = self.delays.pop(0) if self.delays else 0
+        if delay is None:
+            raise RuntimeError("analyzer failed")
+        await asyncio.sleep(delay)
+        return [RESULT for _ in texts]
+
+
+def make_analyzer(backend, hedge_percentile=0, threshold=5, min_samples=1):
+    return ResilientAnalyzer(
+        backend,
+        timeout=0.2,
+        retries=2,
+        backoff=0.001,
+        backoff_max=0.001,
+        hedge_percentile=hedge_percentile,
+        breaker=CircuitBreaker(threshold, reset_timeout=60),
+        latency=LatencyTracker(window=10, min_samples=min_samples),
+    )
+
+
+@pytest.mark.asyncio
+async def test_retries_after_failure_and_timeout():
+    """
+    Этот тест проверяет, что ошибка и превышение дедлайна повторяются, пока вызов не завершится успешно.
+
+    Ожидаемое поведение:
+    Третий вызов движка возвращает результат; счетчики учитывают таймаут и два повтора.
+    """
+    backend = ScriptedBackend([None, 1, 0])
+    analyzer = make_analyzer(backend)
+
+    assert await analyzer.analyze("text") == RESULT
+    assert backend.calls == 3
+    assert analyzer.stats["timeouts"] == 1
+    assert analyzer.stats["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_uses_faster_result():
+    """
+    Этот тест проверяет, что медленный вызов дублируется после наблюдаемого перцентиля длительности.
+
+    Ожидаемое поведение:
+    Дублирующий вызов завершается раньше исходного, и его результат возвращается до дедлайна.
+    """
+    backend = ScriptedBackend([0.01, 0.15, 0])
+    analyzer = make_analyzer(backend, hedge_percentile=50)
+
+    await analyzer.analyze("warm up")
+    assert await analyzer.analyze("text") == RESULT
+    assert analyzer.stats["hedged"] == 1
+    assert analyzer.stats["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens():
+    """
+    Этот тест проверяет, что после серии ошибок автомат защиты размыкается и вызовы движка прекращаются.
+
+    Ожидаемое поведение:
+    Первый вызов исчерпывает повторы, второй отклоняется без обращения к движку.
+    """
+    backend = ScriptedBackend([None] * 10)
+    analyzer = make_analyzer(backend, threshold=3)
+
+    with pytest.raises(RuntimeError):
+        await analyzer.analyze("text")
+    with pytest.raises(CircuitOpenError):
+        await analyzer.analyze("text")
+    assert backend.calls == 3
+    assert analyzer.stats["short_circuited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_does_not_block_breaker():
+    """
+    Этот тест проверяет, что прерванный пробный вызов не оставляет автомат защиты полуоткрытым.
+
+    Ожидаемое поведение:
+    После отмены пробного вызова следующий вызов снова доходит до движка и замыкает автомат; зависший пробный вызов не блокирует новый дольше `reset_timeout`.
+    """
+    backend = ScriptedBackend([None, None, 10, 0])
+    analyzer = make_analyzer(backend, threshold=2)
+    analyzer.retries = 1
+    analyzer.breaker.reset_timeout = 0.05
+
+    with pytest.raises(RuntimeError):
+        await analyzer.analyze("text")
+    assert analyzer.breaker.state == "open"
+    await asyncio.sleep(0.06)
+
+    probe = asyncio.create_task(analyzer.analyze("text"))
+    await asyncio.sleep(0.01)
+    assert analyzer.breaker.state == "half_open"
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert analyzer.breaker.state == "open"
+
+    assert await analyzer.analyze("text") == RESULT
+    assert analyzer.breaker.state == "closed"
+    assert backend.calls == 4
+
+    breaker = CircuitBreaker(1, reset_timeout=0.05)
+    breaker.record_failure()
+    await asyncio.sleep(0.06)
+    assert breaker.allow() and not breaker.allow()
+    await asyncio.sleep(0.06)
+    assert breaker.allow()
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import pytest
+from app.celery import tasks
+from app.celery.runtime import AsyncRuntime, get_redis, get_shard_router
+
+
+@pytest.fixture
+def runtime():
+    runtime = AsyncRuntime(max_in_flight=2)
+    runtime.start()
+    yield runtime
+    runtime.stop()
+
+
+def _spy(monkeypatch, calls: list, target, name: str):
+    original = getattr(target, name)
+
+    async def spy(*args, **kwargs):
+        calls.append(name)
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(target, name, spy)
+
+
+def test_submit_respects_max_in_flight(runtime):
+    """
+    Этот тест проверяет выполнение корутин в loop рантайма с ограничением числа одновременных.
+
+    Ожидаемое поведение:
+    Корутины выполняются в потоке рантайма с его клиентами; одновременно выполняется не больше max_in_flight; ошибка корутины не занимает слот навсегда.
+    """
+    assert runtime.running
+    assert get_shard_router(runtime) is runtime.shards
+    assert get_redis(runtime) is runtime.redis
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    assert isinstance(runtime.submit(fail).exception(timeout=5), RuntimeError)
+
+    active, peak, threads = 0, 0, set()
+
+    async def work():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        threads.add(threading.current_thread().name)
+        await asyncio.sleep(0.02)
+        active -= 1
+
+    futures = [runtime.submit(work) for _ in range(6)]
+    for future in futures:
+        future.result(timeout=5)
+    assert peak == 2
+    assert threads == {"async-runtime"}
+
+
+def test_stop_waits_for_tasks_and_closes_clients(monkeypatch):
+    """
+    Этот тест проверяет остановку рантайма.
+
+    Ожидаемое поведение:
+    stop дожидается выполняющейся корутины, закрывает движки шардов и клиент Redis и останавливает поток loop.
+    """
+    runtime = AsyncRuntime(max_in_flight=2)
+    runtime.start()
+    thread = runtime._thread
+    closed = []
+    _spy(monkeypatch, closed, runtime.shards, "dispose")
+    _spy(monkeypatch, closed, runtime.redis, "aclose")
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        finished.append(True)
+
+    runtime.submit(slow)
+    runtime.stop()
+
+    assert finished == [True]
+    assert sorted(closed) == ["aclose", "dispose"]
+    assert not runtime.running and not thread.is_alive()
+    runtime.stop()
+
+
+def test_run_without_runtime_disposes_shared_clients(monkeypatch):
+    """
+    Этот тест проверяет выполнение задачи без рантайма и с ним.
+
+    Ожидаемое поведение:
+    Без рантайма корутина выполняется через asyncio.run, после чего закрываются пулы общего маршрутизатора шардов и клиента Redis; с запущенным рантаймом корутина отправляется в его loop.
+    """
+    closed = []
+    _spy(monkeypatch, closed, tasks.shard_router, "dispose")
+    _spy(monkeypatch, closed, tasks.redis.connection_pool, "disconnect")
+    calls = []
+
+    async def process(value):
+        calls.append((value, threading.current_thread().name))
+
+    tasks._run(process, 1)
+    assert calls == [(1, threading.current_thread().name)]
+    assert sorted(closed) == ["disconnect", "dispose"]
+
+    runtime = AsyncRuntime(max_in_flight=1)
+    runtime.start()
+    monkeypatch.setattr(tasks, "runtime", runtime)
+    try:
+        tasks._run(process, 2)
+    finally:
+        runtime.stop()
+    assert calls[1] == (2, "async-runtime")
+    assert len(closed) == 2
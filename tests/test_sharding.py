@@ -0,0 +1,256 @@
+from collections import Counter
+from uuid import uuid4
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, text
+from app.cache.read_your_writes import ReadYourWrites
+from app.config.config import settings
+from app.config.redis_conf import redis
+from app.db.database import pool_options
+from app.db.models import Base, Notification, NotificationKeyword, OutboxMessage
+from app.db.pool import create_engine, pool_stats
+from app.db.rebalance import rebalance
+from app.db.sharding import ShardRouter, new_notification_id
+
+
+async def _router(tmp_path, names) -> ShardRouter:
+    shards = ShardRouter.from_urls(
+        {name: f"sqlite+aiosqlite:///{tmp_path / name}.sqlite3" for name in names}
+    )
+    for engine in shards.engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    return shards
+
+
+@pytest_asyncio.fixture
+async def shard_files(tmp_path):
+    routers = []
+
+    async def create(names):
+        shards = await _router(tmp_path, names)
+        routers.append(shards)
+        return shards
+
+    yield create
+    for shards in routers:
+        await shards.dispose()
+
+
+async def _count(shards: ShardRouter, name: str, model) -> int:
+    async with shards.session_maker(name)() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+def test_ring_distributes_users_and_routes_notification_ids():
+    """
+    Этот тест проверяет распределение пользователей по шардам и поиск шарда по ID уведомления.
+
+    Ожидаемое поведение:
+    Пользователи распределяются по трем шардам примерно поровну; шард, вычисленный по ID уведомления, совпадает с шардом пользователя; при добавлении четвертого шарда переезжает около четверти пользователей, и только на новый шард.
+    """
+    shards = ShardRouter({name: None for name in ("a", "b", "c")})
+    users = [uuid4() for _ in range(3000)]
+    placement = {user_id: shards.shard_for_user(user_id) for user_id in users}
+
+    assert all(700 < count < 1300 for count in Counter(placement.values()).values())
+    for user_id in users[:100]:
+        assert shards.shard_for_notification(new_notification_id(user_id)) == (
+            placement[user_id]
+        )
+
+    grown = ShardRouter({name: None for name in ("a", "b", "c", "d")})
+    moved = {
+        user_id: grown.shard_for_user(user_id)
+        for user_id in users
+        if grown.shard_for_user(user_id) != placement[user_id]
+    }
+    assert set(moved.values()) == {"d"}
+    assert 400 < len(moved) < 1100
+
+
+@pytest.mark.asyncio
+async def test_notification_session_falls_back_to_other_shards(shard_files):
+    """
+    Этот тест проверяет поиск уведомления с ID, созданным до шардирования.
+
+    Ожидаемое поведение:
+    Уведомление со случайным UUID находится перебором шардов; отсутствующий ID дает None.
+    """
+    shards = await shard_files(["a", "b"])
+    legacy_id = uuid4()
+    name = shards.candidates(legacy_id)[-1]
+    async with shards.session_maker(name)() as session:
+        session.add(Notification(id=legacy_id, user_id=uuid4(), title="t", text="x"))
+        await session.commit()
+
+    async with shards.notification_session(Notification, legacy_id) as (_, found):
+        assert found is not None and found.id == legacy_id
+    async with shards.notification_session(Notification, uuid4()) as (_, missing):
+        assert missing is None
+
+
+@pytest.mark.asyncio
+async def test_rebalance_moves_users_to_new_shard(shard_files):
+    """
+    Этот тест проверяет перенос уведомлений после добавления шарда.
+
+    Ожидаемое поведение:
+    Уведомления пользователей, которых новое кольцо назначает на новый шард, переносятся вместе с ключевыми словами и outbox; остальные остаются на месте; повторный запуск ничего не переносит.
+    """
+    before = await shard_files(["a", "b"])
+    users = [uuid4() for _ in range(40)]
+    for user_id in users:
+        async with before.session_for_user(user_id) as session:
+            for index in range(3):
+                notification = Notification(
+                    user_id=user_id, title=f"t{index}", text="x"
+                )
+                session.add(notification)
+                await session.flush()
+                session.add(
+                    NotificationKeyword(
+                        keyword="x",
+                        user_id=user_id,
+                        notification_id=notification.id,
+                    )
+                )
+                session.add(OutboxMessage(notification_id=notification.id, text="x"))
+            await session.commit()
+    await before.dispose()
+
+    after = await shard_files(["a", "b", "c"])
+    expected = Counter(after.shard_for_user(user_id) for user_id in users)
+    assert expected["c"] > 0
+
+    assert await rebalance(after, dry_run=True) == await rebalance(after, batch_size=2)
+    assert await rebalance(after) == Counter()
+
+    for name in after.names:
+        for model in (Notification, NotificationKeyword, OutboxMessage):
+            assert await _count(after, name, model) == expected[name] * 3
+    for user_id in users:
+        async with after.session_for_user(user_id) as session:
+            ids = (
+                await session.scalars(
+                    select(Notification.id).where(Notification.user_id == user_id)
+                )
+            ).all()
+        assert len(ids) == 3
+        assert {after.shard_for_notification(id) for id in ids} == {
+            after.shard_for_user(user_id)
+        }
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_fall_back_to_primary(shard_files):
+    """
+    Этот тест проверяет выбор реплики для чтения и чтение с основной базы.
+
+    Ожидаемое поведение:
+    Чтение идет с реплик по кругу, а при primary=True — с основной базы; уведомление, которого еще нет на реплике, находится на основной базе; при least_connections выбирается реплика с меньшим числом выданных соединений.
+    """
+    files = await shard_files(["primary", "replica1", "replica2"])
+    primary, replica1, replica2 = (files.session_maker(name) for name in files.names)
+    shards = ShardRouter({"a": primary}, replica_makers={"a": [replica1, replica2]})
+
+    assert [shards.read_session_maker("a") for _ in range(3)] == [
+        replica1,
+        replica2,
+        replica1,
+    ]
+    assert shards.read_session_maker("a", primary=True) is primary
+
+    user_id = uuid4()
+    async with shards.session_for_user(user_id) as session:
+        notification = Notification(user_id=user_id, title="t", text="x")
+        session.add(notification)
+        await session.commit()
+    async with shards.read_session_for_user(user_id) as session:
+        assert await session.get(Notification, notification.id) is None
+    async with shards.notification_session(
+        Notification, notification.id, read_only=True
+    ) as (_, found):
+        assert found is not None
+
+    shards = ShardRouter(
+        {"a": primary},
+        replica_makers={"a": [replica1, replica2]},
+        strategy="least_connections",
+    )
+    async with replica1.kw["bind"].connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert {shards.read_session_maker("a") for _ in range(4)} == {replica2}
+
+
+@pytest.mark.asyncio
+async def test_pool_stats(tmp_path):
+    """
+    Этот тест проверяет статистику пула соединений движка.
+
+    Ожидаемое поведение:
+    Учитываются выданные соединения, пиковая занятость и настройки пула; движок SQLite в памяти не отслеживается.
+    """
+    engine = create_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.sqlite3'}",
+        {"pool_size": 2, "max_overflow": 1, "pool_pre_ping": True},
+    )
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            for conn in (first, second):
+                await conn.execute(text("SELECT 1"))
+            stats = pool_stats(engine)
+            assert stats["checked_out"] == 2
+            assert stats["utilization"] == pytest.approx(2 / 3)
+        stats = pool_stats(engine)
+        assert stats["size"] == 2 and stats["max_overflow"] == 1
+        assert stats["checkouts"] == 2 and stats["peak_checked_out"] == 2
+        assert stats["checked_out"] == 0 and stats["wait_max"] >= stats["wait_avg"]
+    finally:
+        await engine.dispose()
+    assert pool_stats(create_engine("sqlite+aiosqlite:///:memory:", {})) is None
+
+
+def test_pool_options_from_settings(monkeypatch):
+    """
+    Этот тест проверяет выбор параметров пула движка из настроек.
+
+    Ожидаемое поведение:
+    Общие параметры `DB_*` переопределяются параметрами реплик `DB_REPLICA_*`, а те — параметрами движка `DB_<ИМЯ>_*`.
+    """
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(
+        settings,
+        "DB_POOL_OVERRIDES",
+        {
+            "REPLICA": {"POOL_SIZE": 3, "POOL_PRE_PING": False},
+            "A_REPLICA2": {"POOL_SIZE": 1},
+        },
+    )
+    assert pool_options("a")["pool_size"] == 7
+    assert pool_options("a/replica1", "replica")["pool_size"] == 3
+    replica = pool_options("a/replica2", "replica")
+    assert replica["pool_size"] == 1 and replica["pool_pre_ping"] is False
+    assert replica["pool_timeout"] == settings.DB_POOL_TIMEOUT
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes_pins():
+    """
+    Этот тест проверяет отметки о недавних записях для чтения с основной базы.
+
+    Ожидаемое поведение:
+    После записи данные пользователя и уведомления читаются с основной базы; без реплик отметки не ставятся.
+    """
+    user_id, notification_id = uuid4(), uuid4()
+    pins = ReadYourWrites(ttl=5, enabled=True)
+    assert not await pins.pinned(redis, user_id=user_id)
+
+    await pins.pin(redis, [user_id], [notification_id])
+    assert await pins.pinned(redis, user_id=user_id)
+    assert await pins.pinned(redis, notification_id=notification_id)
+    assert not await pins.pinned(redis, user_id=uuid4())
+
+    disabled = ReadYourWrites(ttl=5, enabled=False)
+    await disabled.pin(redis, [uuid4()])
+    assert not await disabled.pinned(redis, user_id=user_id)
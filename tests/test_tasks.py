@@ -0,0 +1,344 @@
+import asyncio
+from collections import Counter
+from datetime import timedelta
+from uuid import uuid4
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.ai.resilience import CircuitOpenError
+from app.celery import tasks
+from app.config.redis_conf import sync_redis
+from app.db.models import Base, Notification
+from app.db.sharding import ShardRouter
+
+
+@pytest.mark.asyncio
+async def test_reap_stuck_notifications(async_session: AsyncSession, monkeypatch):
+    """
+    Этот тест проверяет, что зависшие уведомления повторно ставятся в очередь, а исчерпавшие попытки получают статус failed.
+
+    Ожидаемое поведение:
+    Старые уведомления в статусах pending/processing с оставшимися попытками возвращаются в pending и публикуются; уведомление с исчерпанными попытками становится failed; свежие и завершенные не затрагиваются.
+
+    Данные:
+    old: Время создания, превышающее порог зависания.
+    """
+    old = tasks._utcnow() - timedelta(seconds=tasks.settings.STUCK_JOB_THRESHOLD + 60)
+    user_id = uuid4()
+    async_session.add_all(
+        [
+            Notification(
+                user_id=user_id,
+                title="processing",
+                text="a",
+                created_at=old,
+                processing_status="processing",
+                attempts=1,
+            ),
+            Notification(
+                user_id=user_id,
+                title="exhausted",
+                text="b",
+                created_at=old,
+                processing_status="processing",
+                attempts=tasks.settings.STUCK_JOB_MAX_ATTEMPTS,
+            ),
+            Notification(user_id=user_id, title="fresh", text="c"),
+            Notification(
+                user_id=user_id,
+                title="completed",
+                text="d",
+                created_at=old,
+                processing_status="completed",
+            ),
+        ]
+    )
+    await async_session.commit()
+
+    published = []
+    session_maker = async_sessionmaker(async_session.bind, expire_on_commit=False)
+    monkeypatch.setattr(
+        tasks,
+        "get_shard_router",
+        lambda runtime: ShardRouter({"default": session_maker}),
+    )
+    monkeypatch.setattr(tasks, "enqueue_analysis_many", published.extend)
+
+    assert await tasks._reap_stuck() == {"requeued": 1, "failed": 1}
+    assert [text for _, text in published] == ["a"]
+    assert await tasks._reap_stuck() == {"requeued": 0, "failed": 0}
+
+    async with session_maker() as session:
+        statuses = {
+            notification.title: notification.processing_status
+            for notification in await session.scalars(select(Notification))
+        }
+    assert statuses == {
+        "processing": "pending",
+        "exhausted": "failed",
+        "fresh": "pending",
+        "completed": "completed",
+    }
+
+
+@pytest_asyncio.fixture
+async def session_maker(async_session: AsyncSession, monkeypatch):
+    session_maker = async_sessionmaker(async_session.bind, expire_on_commit=False)
+    monkeypatch.setattr(
+        tasks,
+        "get_shard_router",
+        lambda runtime: ShardRouter({"default": session_maker}),
+    )
+    return session_maker
+
+
+async def _statuses(session_maker) -> dict:
+    async with session_maker() as session:
+        return {
+            notification.title: (
+                notification.processing_status,
+                notification.category,
+                notification.attempts,
+            )
+            for notification in await session.scalars(select(Notification))
+        }
+
+
+@pytest.mark.asyncio
+async def test_analyzer_outage_keeps_notifications_pending(session_maker, monkeypatch):
+    """
+    Этот тест проверяет, что временная недоступность движка анализа не делает уведомления окончательно неудачными.
+
+    Ожидаемое поведение:
+    При разомкнутом автомате защиты и истечении времени ожидания уведомление остается pending с отметкой попытки (его подберет reap_stuck_notifications), а на последней попытке и при прочих ошибках становится failed; то же в пакетном режиме.
+    """
+    last = tasks.settings.STUCK_JOB_MAX_ATTEMPTS - 1
+    async with session_maker() as session:
+        notifications = [
+            Notification(user_id=uuid4(), title=title, text=title, attempts=attempts)
+            for title, attempts in (
+                ("open", 0),
+                ("timeout", 0),
+                ("last", last),
+                ("broken", 0),
+                ("batch", 0),
+                ("batch_last", last),
+            )
+        ]
+        session.add_all(notifications)
+        await session.commit()
+    ids = {notification.title: notification.id for notification in notifications}
+
+    errors = {
+        "open": CircuitOpenError(),
+        "timeout": asyncio.TimeoutError(),
+        "last": CircuitOpenError(),
+        "broken": ValueError(),
+    }
+
+    async def analyze(text):
+        raise errors[text]
+
+    async def analyze_many(texts):
+        return [CircuitOpenError()] * len(texts)
+
+    monkeypatch.setattr(tasks, "_analyze", analyze)
+    monkeypatch.setattr(tasks, "_analyze_many", analyze_many)
+    for title in errors:
+        await tasks._process(str(ids[title]), title)
+    await tasks._process_batch([ids["batch"], ids["batch_last"]])
+
+    statuses = await _statuses(session_maker)
+    assert statuses == {
+        "open": ("pending", None, 1),
+        "timeout": ("pending", None, 1),
+        "last": ("failed", None, last + 1),
+        "broken": ("failed", None, 1),
+        "batch": ("pending", None, 1),
+        "batch_last": ("failed", None, last + 1),
+    }
+    async with session_maker() as session:
+        assert (
+            None
+            not in (await session.scalars(select(Notification.last_attempt_at))).all()
+        )
+
+
+@pytest_asyncio.fixture
+async def two_shards(tmp_path, monkeypatch):
+    shards = ShardRouter.from_urls(
+        {name: f"sqlite+aiosqlite:///{tmp_path / name}.sqlite3" for name in "ab"}
+    )
+    for engine in shards.engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(tasks, "get_shard_router", lambda runtime: shards)
+    yield shards
+    await shards.dispose()
+
+
+@pytest.mark.asyncio
+async def test_flush_analysis_batch(two_shards, monkeypatch):
+    """
+    Этот тест проверяет пакетную обработку уведомлений через очередь analysis:pending.
+
+    Ожидаемое поведение:
+    enqueue_analysis_many кладет ID в очередь и планирует сброс; flush_analysis_batch забирает пакет и обрабатывает уведомления каждого шарда одним вызовом анализа и двумя коммитами на шард; повторный ID обрабатывается один раз, завершенное уведомление не меняется.
+    """
+    monkeypatch.setattr(tasks.settings, "ANALYSIS_BATCH_MODE", True)
+    monkeypatch.setattr(tasks.settings, "ANALYSIS_BATCH_SIZE", 10)
+    sync_redis.delete(tasks.PENDING_QUEUE_KEY)
+
+    users = {}
+    for index in range(40):
+        user_id = uuid4()
+        users.setdefault(two_shards.shard_for_user(user_id), []).append(user_id)
+    notifications = []
+    for name in two_shards.names:
+        async with two_shards.session_maker(name)() as session:
+            for index, user_id in enumerate(users[name][:2]):
+                notifications.append(
+                    Notification(user_id=user_id, title=f"{name}{index}", text=name)
+                )
+                session.add(notifications[-1])
+            session.add(
+                Notification(
+                    user_id=users[name][2],
+                    title=f"{name}-done",
+                    text=name,
+                    processing_status="completed",
+                    category="info",
+                )
+            )
+            await session.commit()
+    async with two_shards.session_maker("a")() as session:
+        done = await session.scalar(
+            select(Notification.id).where(Notification.title == "a-done")
+        )
+
+    scheduled, runs, batches, commits = [], [], [], Counter()
+    monkeypatch.setattr(
+        tasks.flush_analysis_batch, "apply_async", lambda **kw: scheduled.append(kw)
+    )
+    monkeypatch.setattr(
+        tasks.flush_analysis_batch, "delay", lambda: scheduled.append({})
+    )
+    monkeypatch.setattr(tasks, "_run", lambda coro_fn, *args: runs.append(args))
+
+    async def analyze_many(texts):
+        batches.append(texts)
+        return [
+            {"category": "critical", "confidence": 0.5, "keywords": ["x"]}
+            for _ in texts
+        ]
+
+    monkeypatch.setattr(tasks, "_analyze_many", analyze_many)
+    for name, (_, engine) in two_shards.named_engines().items():
+        event.listen(
+            engine.sync_engine,
+            "commit",
+            lambda conn, name=name: commits.update([name]),
+        )
+
+    items = [(notification.id, notification.text) for notification in notifications]
+    tasks.enqueue_analysis_many(items + [items[0], (done, "a")])
+    assert sync_redis.llen(tasks.PENDING_QUEUE_KEY) == 6
+    assert scheduled == [{"countdown": tasks.settings.ANALYSIS_BATCH_WINDOW}]
+
+    tasks.flush_analysis_batch()
+    assert sync_redis.llen(tasks.PENDING_QUEUE_KEY) == 0
+    assert len(scheduled) == 1
+    (ids,) = runs[0]
+    await tasks._process_batch(ids)
+
+    assert sorted(batches) == [["a", "a"], ["b", "b"]]
+    assert commits == {"a": 2, "b": 2}
+    for name in two_shards.names:
+        statuses = await _statuses(two_shards.session_maker(name))
+        assert statuses == {
+            f"{name}0": ("completed", "critical", 1),
+            f"{name}1": ("completed", "critical", 1),
+            f"{name}-done": ("completed", "info", 0),
+        }
+
+
+def test_enqueue_analysis_many_schedules_full_batches(monkeypatch):
+    """
+    Этот тест проверяет планирование сброса пакетов при пакетной постановке в очередь.
+
+    Ожидаемое поведение:
+    На каждый набранный полный пакет планируется немедленный сброс; сброс, после которого в очереди остается полный пакет, планирует следующий.
+    """
+    monkeypatch.setattr(tasks.settings, "ANALYSIS_BATCH_MODE", True)
+    monkeypatch.setattr(tasks.settings, "ANALYSIS_BATCH_SIZE", 2)
+    sync_redis.delete(tasks.PENDING_QUEUE_KEY)
+    scheduled, runs = [], []
+    monkeypatch.setattr(
+        tasks.flush_analysis_batch, "apply_async", lambda **kw: scheduled.append(kw)
+    )
+    monkeypatch.setattr(
+        tasks.flush_analysis_batch, "delay", lambda: scheduled.append({})
+    )
+    monkeypatch.setattr(tasks, "_run", lambda coro_fn, *args: runs.append(args))
+
+    tasks.enqueue_analysis_many([(str(uuid4()), "x") for _ in range(5)])
+    assert scheduled == [{}, {}]
+
+    tasks.flush_analysis_batch()
+    assert len(runs[0][0]) == 2
+    assert scheduled == [{}, {}, {}]
+    assert sync_redis.llen(tasks.PENDING_QUEUE_KEY) == 3
+    sync_redis.delete(tasks.PENDING_QUEUE_KEY)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_counters_replaces_and_prunes(two_shards, monkeypatch):
+    """
+    Этот тест проверяет сверку счетчиков уведомлений с базой данных на двух шардах.
+
+    Ожидаемое поведение:
+    Счетчики каждого пользователя пересчитываются из базы и заменяют прежний хэш целиком (устаревшие поля исчезают); счетчики пользователя без уведомлений удаляются; временные ключи не остаются.
+    """
+    monkeypatch.setattr(tasks.notification_counters, "REBUILD_CHUNK_SIZE", 2)
+    users = [uuid4() for _ in range(5)]
+    for index, user_id in enumerate(users):
+        async with two_shards.session_for_user(user_id) as session:
+            session.add_all(
+                [
+                    Notification(
+                        user_id=user_id,
+                        title="read",
+                        text="a",
+                        category="info",
+                        processing_status="completed",
+                        read_at=tasks._utcnow(),
+                    ),
+                    *(
+                        Notification(user_id=user_id, title="unread", text="b")
+                        for _ in range(index)
+                    ),
+                ]
+            )
+            await session.commit()
+    gone = uuid4()
+    redis = tasks.redis
+    await redis.hset(
+        f"notifications:counts:{users[0]}", mapping={"total": 99, "category:old": 5}
+    )
+    await redis.hset(f"notifications:counts:{gone}", mapping={"total": 3})
+
+    await tasks._reconcile_counters()
+
+    for index, user_id in enumerate(users):
+        assert await tasks.notification_counters.get(redis, user_id) == {
+            "total": index + 1,
+            "unread": index,
+            "by_category": {"info": 1},
+            "unread_by_category": {},
+            "by_status": (
+                {"completed": 1, "pending": index} if index else {"completed": 1}
+            ),
+        }
+    assert not await redis.exists(f"notifications:counts:{gone}")
+    assert await redis.keys("notifications:counts_rebuild:*") == []